@@ -0,0 +1,72 @@
+"""資格スコアを、資格ごとにキーワード検索する場合と資格の登録簿（certification_registry）で表引きする場合で比べるベンチマーク
+
+資格名の種類が少ない社員集合で、旧実装（資格1件ごとに3つのキーワード群を部分一致で検索）と
+登録簿による採点の結果が一致することを確かめてから、ループ版・列版の資格スコアの時間を比べる。
+
+    uv run python bench/bench_certification_registry.py [社員数]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import RankingEngine, VectorRankingEngine, certification_registry, np  # noqa: E402
+
+CERTIFICATIONS = ['AWS SAA', 'AWS SAP', 'Google Cloud ACE', 'Azure Fundamentals', 'ネットワークスペシャリスト',
+                  'データベーススペシャリスト', 'PMP Professional', '応用情報技術者', '基本情報技術者',
+                  '情報セキュリティマネジメント', 'TOEIC', '簿記検定', 'Scrum Master認定', '普通自動車免許']
+
+
+def legacy_points(cert):
+    """旧実装の資格1件の加点"""
+    if any(keyword in cert for keyword in ['AWS', 'Google', 'Azure', 'GCP']):
+        return 0.2
+    elif any(keyword in cert for keyword in ['スペシャリスト', '高度', 'Expert', 'Professional']):
+        return 0.15
+    elif any(keyword in cert for keyword in ['応用', '基本', '情報', '検定', '認定']):
+        return 0.1
+    else:
+        return 0.05
+
+
+def legacy_score(certifications):
+    cert_score = 0.3
+    for cert in certifications[:3]:
+        cert_score += legacy_points(cert)
+    return min(cert_score, 1.0)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lambda_function.logger.disabled = True
+    rng = random.Random(0)
+    certifications_list = [rng.sample(CERTIFICATIONS, rng.randint(0, 5)) for _ in range(count)]
+
+    expected, legacy_time = timed(lambda: [legacy_score(certs) for certs in certifications_list])
+    registry, registry_time = timed(
+        lambda: [RankingEngine.certification_score(certs) for certs in certifications_list])
+    assert registry == expected
+
+    print(f"employees={count} 資格名={certification_registry.stats()['certifications']}種類")
+    print(f"keyword search        {legacy_time * 1000:8.1f} ms")
+    print(f"registry              {registry_time * 1000:8.1f} ms  x{legacy_time / registry_time:.1f}")
+
+    if np is None:
+        print("NumPyがないため列版は省略")
+        return
+    columns, columns_time = timed(lambda: VectorRankingEngine.certification_scores(certifications_list))
+    assert columns.tolist() == expected
+    print(f"registry (列版)       {columns_time * 1000:8.1f} ms  x{legacy_time / columns_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""4次審査のリーダー相性を、1名ごとの分岐計算と相性表の表引きで比べるベンチマーク
+
+旧実装（次元ごとに分岐して計算するcalculate_mbti_compatibility）と相性表（CompatibilityTable）の
+結果が、リーダー・社員の割合の組み合わせ（整数と小数）すべてで一致することを確かめてから、
+社員数を増やして4次審査の時間を比べる。
+
+    uv run python bench/bench_compatibility_table.py [社員数]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import CompatibilityTable, RankingEngine  # noqa: E402
+
+LEADER = {'E': 70, 'N': 35, 'T': 55, 'J': 80}
+SUB_LEADER = {'E': 25, 'N': 65.5, 'T': 10, 'J': 45}
+
+
+def legacy_compatibility(mbti1, mbti2):
+    """旧実装のMBTI相性計算（total_scoreのみ）"""
+    total_score = 0
+    mbti1 = mbti1 or {}
+    mbti2 = mbti2 or {}
+
+    e1, e2 = float(mbti1.get('E', 50)), float(mbti2.get('E', 50))
+    ei_diff = abs(e1 - e2)
+    if 20 <= ei_diff <= 60:
+        ei_score = 0.25
+    elif ei_diff < 20:
+        ei_score = 0.15
+    else:
+        ei_score = 0.1
+    total_score += ei_score
+
+    n1, n2 = float(mbti1.get('N', 50)), float(mbti2.get('N', 50))
+    total_score += 0.25 * (1 - abs(n1 - n2) / 100)
+
+    t1, t2 = float(mbti1.get('T', 50)), float(mbti2.get('T', 50))
+    tf_diff = abs(t1 - t2)
+    if 20 <= tf_diff <= 60:
+        tf_score = 0.25
+    elif tf_diff < 20:
+        tf_score = 0.15
+    else:
+        tf_score = 0.1
+    total_score += tf_score
+
+    j1, j2 = float(mbti1.get('J', 50)), float(mbti2.get('J', 50))
+    total_score += 0.25 * (1 - abs(j1 - j2) / 100)
+
+    return round(min(total_score, 1.0), 3)
+
+
+def legacy_stage4(employees):
+    for emp in employees:
+        leader = legacy_compatibility(emp.get('mbti_percentages', {}), LEADER)
+        sub_leader = legacy_compatibility(emp.get('mbti_percentages', {}), SUB_LEADER)
+        emp['stage4_score'] = round((leader * 2 + sub_leader) / 3, 3)
+        emp['stage4_details'] = {'leader_compatibility': leader, 'sub_leader_compatibility': sub_leader}
+    return employees
+
+
+def table_stage4(employees):
+    """相性表による4次審査の採点（MBTIプロファイルの共有なし）"""
+    leader_table = CompatibilityTable.for_leader(LEADER)
+    sub_leader_table = CompatibilityTable.for_leader(SUB_LEADER)
+    for emp in employees:
+        leader = leader_table.total_score(emp.get('mbti_percentages', {}))
+        sub_leader = sub_leader_table.total_score(emp.get('mbti_percentages', {}))
+        emp['stage4_score'] = round((leader * 2 + sub_leader) / 3, 3)
+        emp['stage4_details'] = {'leader_compatibility': leader, 'sub_leader_compatibility': sub_leader}
+    return employees
+
+
+def check_parity():
+    values = list(range(0, 101)) + [0.5, 12.5, 49.5, 50.5, 99.5, 120, -5]
+    checked = 0
+    for leader_value in [0, 20, 35, 50, 50.5, 80, 100]:
+        leader = dict.fromkeys(CompatibilityTable.DIMENSIONS, leader_value)
+        table = CompatibilityTable.for_leader(leader)
+        for value in values:
+            for dimension in CompatibilityTable.DIMENSIONS:
+                mbti = {dimension: value}
+                assert table.total_score(mbti) == legacy_compatibility(mbti, leader), (leader_value, dimension, value)
+                checked += 1
+    rng = random.Random(1)
+    for _ in range(20000):
+        mbti = {k: rng.choice([rng.randrange(0, 101), rng.randrange(0, 201) / 2]) for k in 'ENTJ'}
+        leader = {k: rng.randrange(0, 101) for k in 'ENTJ'}
+        assert CompatibilityTable.for_leader(leader).total_score(mbti) == legacy_compatibility(mbti, leader)
+        assert RankingEngine.calculate_mbti_compatibility(mbti, leader)['total_score'] == \
+            legacy_compatibility(mbti, leader)
+        checked += 1
+    print(f"parity: {checked}通りで一致")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lambda_function.logger.disabled = True
+    check_parity()
+
+    rng = random.Random(0)
+    employees = [{'employee_id': f'EMP{i:07d}', 'mbti_percentages': {k: rng.randrange(20, 81, 5) for k in 'ENTJ'}}
+                 for i in range(count)]
+    legacy_input = [dict(emp) for emp in employees]
+    table_input = [dict(emp) for emp in employees]
+
+    start = time.perf_counter()
+    legacy = legacy_stage4(legacy_input)
+    legacy_time = time.perf_counter() - start
+    CompatibilityTable._cached.cache_clear()  # 表の作成時間も含めて計測する
+    start = time.perf_counter()
+    table = table_stage4(table_input)
+    table_time = time.perf_counter() - start
+    assert [(e['stage4_score'], e['stage4_details']) for e in legacy] == \
+        [(e['stage4_score'], e['stage4_details']) for e in table]
+
+    print(f"employees={count}")
+    print(f"branchy per call   {legacy_time * 1000:8.1f} ms")
+    print(f"lookup table       {table_time * 1000:8.1f} ms  x{legacy_time / table_time:.1f}")
+    print(f"表: 4次元×{CompatibilityTable.VALUES}通り×2名（リーダー・サブリーダー）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""0～3次審査のDecimal変換コストの比較ベンチマーク
+
+旧実装（0次・1次審査で社員ごとにdecimal_to_floatで辞書全体を再構築し、3次審査でもMBTIを変換）と、
+取得時に一度だけネイティブ数値に変換して審査では変換しない現行実装を、
+tracemallocで計測した1名あたりのピーク・保持メモリと処理時間で比べる。
+
+    uv run python bench/bench_decode.py [社員数]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import RankingEngine, decimal_to_float  # noqa: E402
+
+ROLE = 'backend'
+
+
+def make_items(count):
+    """DynamoDBリソースが返す形（数値はDecimal）の社員項目"""
+    return [
+        {
+            'employee_id': f'EMP{i:07d}',
+            'role': ROLE,
+            'time': Decimal(20 + i % 20),
+            'certifications': ['AWS SAA', '基本情報技術者'][:i % 3],
+            '勤続年数': Decimal(i % 12),
+            '経験': {'backend': Decimal(i % 7), 'infra': Decimal('1.5')},
+            'motivation_by_role': {ROLE: Decimal(2 + i % 4)},
+            'mbti_percentages': {k: Decimal(str(30 + (i * 7 + n) % 41 + 0.5))
+                                 for n, k in enumerate('EINSTFJP')},
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_stages(items):
+    """旧実装の0～3次審査（審査ごとに社員を変換し直す）"""
+    passed = []
+    for emp in items:
+        emp = decimal_to_float(emp)
+        if float(emp.get('time', 0)) >= 20.0:
+            emp['stage0_passed'] = True
+            passed.append(emp)
+    stage1 = []
+    for emp in passed:
+        emp = decimal_to_float(emp)
+        if float(emp.get('motivation_by_role', {}).get(ROLE, 0)) >= RankingEngine.MOTIVATION_THRESHOLD:
+            emp['stage1_passed'] = True
+            stage1.append(emp)
+    for emp in stage1:
+        emp['stage2_score'] = RankingEngine.calculate_employee_level(emp, ROLE)
+        mbti = decimal_to_float(emp.get('mbti_percentages', {}))
+        emp['stage3_score'] = round(float(mbti.get('N', 50)) / 100, 3)
+    return stage1
+
+
+def current_stages(employees):
+    """現行実装の0～3次審査（入力は取得時に変換済み）"""
+    passed = RankingEngine.stage0_worktime_screening(employees, 20)
+    passed = RankingEngine.stage1_motivation_screening(passed, ROLE)
+    for emp in passed:
+        emp['stage2_score'] = RankingEngine.calculate_employee_level(emp, ROLE)
+        emp['stage3_score'] = RankingEngine.mbti_fit_score(emp, '新規開発')
+    return passed
+
+
+def measure(label, func, items):
+    """処理時間（計測なし）と、tracemallocでのピーク・保持メモリ（1名あたり）"""
+    start = time.perf_counter()
+    func(items)
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    result = func(items)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(items)
+    print(f"{label:<16} {elapsed * 1000:8.1f} ms  peak {peak / count:6.0f} B/社員  "
+          f"retained {retained / count:6.0f} B/社員")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lambda_function.logger.disabled = True
+    items = make_items(count)
+    print(f"employees={count}")
+    legacy = measure('legacy stages', legacy_stages, items)
+    # 現行実装では取得時の変換（ページごとに1回）と変換済みデータでの審査に分かれる
+    employees = measure('ingest decode', decimal_to_float, items)
+    current = measure('current stages', current_stages, employees)
+    assert [e['stage3_score'] for e in legacy] == [e['stage3_score'] for e in current]
+
+
+if __name__ == '__main__':
+    main()
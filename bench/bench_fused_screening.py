@@ -0,0 +1,76 @@
+"""0～2次審査の審査ごとのリスト作成（staged）と、選択性順の融合評価（fused）の比較ベンチマーク
+
+やる気の閾値で大半が落ちる社員集合で、審査ごとにリストを作る従来の順序と、
+登録された審査をコストと観測した通過率の順に1名ずつ短絡評価する場合を比べる。
+融合評価は1回目で通過率を観測し、2回目以降はその順序で評価する。
+
+    uv run python bench/bench_fused_screening.py [社員数]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import RankingEngine, screening_stages  # noqa: E402
+
+ROLE = 'backend'
+REPEAT = 5
+PROJECT = {'worktime': 20, 'role_requirements': {ROLE: {'level': 0.5, 'level_range': 0.1}}}
+
+
+def make_employees(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'employee_id': f'EMP{i:07d}',
+            'role': ROLE,
+            'time': rng.choice([15, 20, 25, 30, 40]),
+            'motivation_by_role': {ROLE: rng.choice([1, 1, 2, 2, 2, 3, 4, 5])},
+            'certifications': rng.sample(['AWS SAA', '応用情報技術者', 'PMP Professional', 'TOEIC'],
+                                         rng.randint(0, 3)),
+            '勤続年数': rng.choice([0, 1, 3, 5, 7, 9, 12]),
+            '経験': {'backend': rng.randint(0, 8)},
+        }
+        for i in range(count)
+    ]
+
+
+def staged(employees):
+    candidates = RankingEngine.stage0_worktime_screening(employees, PROJECT['worktime'])
+    candidates = RankingEngine.stage1_motivation_screening(candidates, ROLE)
+    return RankingEngine.stage2_level_matching(candidates, PROJECT, ROLE)
+
+
+def fused(employees):
+    return screening_stages.fused_screening(employees, PROJECT, ROLE)
+
+
+def measure(func, employees):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func(employees)
+    return result, (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lambda_function.logger.disabled = True
+    employees = make_employees(count)
+
+    staged_result, staged_time = measure(staged, employees)
+    fused_result, fused_time = measure(fused, employees)
+    assert staged_result == fused_result
+
+    print(f"employees={count} survivors={len(fused_result)}")
+    print(f"staged  {staged_time * 1000:8.1f} ms")
+    print(f"fused   {fused_time * 1000:8.1f} ms  x{staged_time / fused_time:.2f}")
+    for stage in screening_stages.report():
+        print(f"  {stage['stage']:<10} cost={stage['cost']:<4} 通過率={stage['pass_rate']:.3f} "
+              f"評価={stage['evaluated']}名")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""2次審査の社員レベルを、毎回計算する場合と社員レベルのキャッシュ（employee_level_cache）を使う場合で比べるベンチマーク
+
+取り込み済みの特徴を持たない社員集合で、キャッシュなし（LEVEL_CACHE_MAX_ENTRIES=0、既定）と、
+キャッシュありの初回（全件ミス）・2回目（全件ヒット、ウォームコンテナでの再実行に相当）の
+レベルが一致することを確かめてから時間を比べる。最後に一部の社員の属性を変えて、
+変わった社員だけ計算し直されることも確かめる。
+
+    uv run python bench/bench_level_cache.py [社員数]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import RankingEngine, employee_level_cache  # noqa: E402
+
+ROLE = 'backend'
+REPEAT = 5
+CERTIFICATIONS = ['AWS SAA', 'Google Cloud ACE', 'ネットワークスペシャリスト', 'PMP Professional',
+                  '応用情報技術者', '基本情報技術者', 'TOEIC', '簿記検定']
+
+
+def make_employees(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'employee_id': f'EMP{i:07d}',
+            'role': ROLE,
+            'certifications': rng.sample(CERTIFICATIONS, rng.randint(0, 4)),
+            '勤続年数': rng.choice([0, 1, 1.5, 3, 5, 7, 9, 12]),
+            '経験': {k: rng.randint(0, 6) for k in rng.sample(['backend', 'infra', 'frontend'], rng.randint(0, 3))},
+        }
+        for i in range(count)
+    ]
+
+
+def levels(employees):
+    return [RankingEngine.employee_level(emp, ROLE) for emp in employees]
+
+
+def measure(employees):
+    """REPEAT回のうち最短の時間"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = levels(employees)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lambda_function.logger.disabled = True
+    employees = make_employees(count)
+
+    employee_level_cache.max_entries = 0
+    expected, uncached_time = measure(employees)
+
+    employee_level_cache.max_entries = count
+    employee_level_cache.invalidate()
+    start = time.perf_counter()
+    cold = levels(employees)
+    cold_time = time.perf_counter() - start
+    warm, warm_time = measure(employees)
+    assert cold == expected
+    assert warm == expected
+
+    # 属性が変わった社員は計算し直される
+    changed = [dict(emp, 勤続年数=emp['勤続年数'] + 10) if i % 10 == 0 else emp for i, emp in enumerate(employees)]
+    employee_level_cache.max_entries = 0
+    expected_changed = levels(changed)
+    employee_level_cache.max_entries = count
+    assert levels(changed) == expected_changed
+
+    print(f"employees={count}")
+    print(f"no cache              {uncached_time * 1000:8.1f} ms")
+    print(f"cache (初回)          {cold_time * 1000:8.1f} ms  x{uncached_time / cold_time:.2f}")
+    print(f"cache (2回目)         {warm_time * 1000:8.1f} ms  x{uncached_time / warm_time:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""3・4次審査のMBTI採点を、社員1名ごとに行う場合とプロファイルごとに1回だけ行う場合で比べるベンチマーク
+
+アンケート由来の粗い（10刻み・中央寄り）割合を持つ社員集合で、1名ごとに適性・相性・MBTI型を計算する
+従来の方法と、同じ割合の組の社員をプロファイル（mbti_profiles）にまとめて採点する方法の結果が
+一致することを確かめてから時間を比べる。審査関数は既定（MBTI_PROFILES=false）では社員ごとに採点し、
+有効にするとプロファイルごとに採点する。2回目はプロファイルが温まったコンテナでの再実行に相当する。
+
+    uv run python bench/bench_mbti_profiles.py [社員数]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import CompatibilityTable, RankingEngine, mbti_profiles  # noqa: E402
+
+CATEGORY = '改善・保守'
+LEADER = {'E': 70, 'N': 35, 'T': 55, 'J': 80}
+SUB_LEADER = {'E': 25, 'N': 65, 'T': 10, 'J': 45}
+
+
+def make_employees(count, seed=0):
+    """中央寄りの10刻みの割合（補数つき）を持つ社員。一部は割合なし"""
+    rng = random.Random(seed)
+    employees = []
+    for i in range(count):
+        emp = {'employee_id': f'EMP{i:07d}'}
+        if i % 50:
+            mbti = {}
+            for a, b in (('E', 'I'), ('N', 'S'), ('T', 'F'), ('J', 'P')):
+                mbti[a] = 50 + 10 * max(-4, min(4, round(rng.gauss(0, 1.5))))
+                mbti[b] = 100 - mbti[a]
+            emp['mbti_percentages'] = mbti
+        employees.append(emp)
+    return employees
+
+
+def per_employee(employees):
+    """1名ごとに採点する従来の方法"""
+    leader_table = CompatibilityTable.for_leader(LEADER)
+    sub_leader_table = CompatibilityTable.for_leader(SUB_LEADER)
+    results = []
+    for emp in employees:
+        mbti = emp.get('mbti_percentages', {})
+        leader = leader_table.total_score(mbti)
+        sub_leader = sub_leader_table.total_score(mbti)
+        results.append((RankingEngine.calculate_mbti_fit(mbti, CATEGORY), round((leader * 2 + sub_leader) / 3, 3),
+                        {'leader_compatibility': leader, 'sub_leader_compatibility': sub_leader},
+                        RankingEngine.determine_mbti_type(mbti)))
+    return results
+
+
+def per_profile(employees):
+    """審査関数で採点する方法（mbti_profiles.enabledならプロファイルごとに1回だけ採点する）"""
+    RankingEngine.stage3_mbti_scoring(employees, CATEGORY)
+    RankingEngine.stage4_compatibility_scoring(employees, LEADER, SUB_LEADER)
+    return [(emp['stage3_score'], emp['stage4_score'], emp['stage4_details'],
+             mbti_profiles.type_code(emp.get('mbti_percentages'))) for emp in employees]
+
+
+def timed(func, employees):
+    start = time.perf_counter()
+    result = func(employees)
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lambda_function.logger.disabled = True
+    employees = make_employees(count)
+    CompatibilityTable.for_leader(LEADER)
+    CompatibilityTable.for_leader(SUB_LEADER)
+
+    expected, legacy_time = timed(per_employee, employees)
+    mbti_profiles.enabled = False
+    default, default_time = timed(per_profile, [dict(emp) for emp in employees])
+    mbti_profiles.enabled = True
+    cold, cold_time = timed(per_profile, [dict(emp) for emp in employees])
+    stats = mbti_profiles.stats()
+    warm, warm_time = timed(per_profile, [dict(emp) for emp in employees])
+    assert default == expected
+    assert cold == expected
+    assert warm == expected
+
+    print(f"employees={count} profiles={stats['profiles']}")
+    print(f"per employee          {legacy_time * 1000:8.1f} ms")
+    print(f"審査関数 (既定)       {default_time * 1000:8.1f} ms  x{legacy_time / default_time:.1f}")
+    print(f"per profile (初回)    {cold_time * 1000:8.1f} ms  x{legacy_time / cold_time:.1f}")
+    print(f"per profile (2回目)   {warm_time * 1000:8.1f} ms  x{legacy_time / warm_time:.1f}")
+    print(f"初回のミス（採点した数）: {stats['misses']}件 / ヒット: {stats['hits']}回")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""社員テーブルの逐次スキャンとセグメント並列スキャンの比較ベンチマーク
+
+DynamoDBの代わりにページ単位の遅延を再現するローカルのスタンドインテーブルを使う。
+
+    uv run python bench/bench_parallel_scan.py [社員数] [ページ遅延ms]
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+
+PAGE_SIZE = 1000
+
+
+class LocalStandInTable:
+    """scan(Segment/TotalSegments/ExclusiveStartKey)だけを再現するスタンドイン"""
+
+    def __init__(self, items, page_latency):
+        self.items = items
+        self.page_latency = page_latency
+
+    def scan(self, ExclusiveStartKey=None, Segment=0, TotalSegments=1, **kwargs):
+        # DynamoDBと同様にセグメントはキー空間の分割として扱う
+        segment_items = self.items[Segment::TotalSegments]
+        start = ExclusiveStartKey['offset'] if ExclusiveStartKey else 0
+        time.sleep(self.page_latency)
+        response = {'Items': list(segment_items[start:start + PAGE_SIZE])}
+        if start + PAGE_SIZE < len(segment_items):
+            response['LastEvaluatedKey'] = {'offset': start + PAGE_SIZE}
+        return response
+
+
+class LocalStandInResource:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+def make_employees(count):
+    return [
+        {
+            'employee_id': f'EMP{i:07d}',
+            'role': ['backend', 'frontend', 'ml'][i % 3],
+            'time': Decimal(20 + i % 20),
+            'motivation_by_role': {'backend': Decimal(i % 6)},
+            'mbti_percentages': {'E': Decimal(i % 101), 'N': Decimal(50)},
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    lambda_function.dynamodb = LocalStandInResource(
+        LocalStandInTable(make_employees(count), latency))
+
+    print(f"employees={count} page_size={PAGE_SIZE} page_latency={latency * 1000:.0f}ms")
+    baseline = None
+    for segments in (1, 2, 4, 8, 16):
+        start = time.perf_counter()
+        employees = lambda_function.DatabaseManager.fetch_employees(segments)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        assert len(employees) == count
+        print(f"segments={segments:>2}  {elapsed * 1000:8.1f} ms  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
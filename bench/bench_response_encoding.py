@@ -0,0 +1,78 @@
+"""recomendの応答形式（json / columnar / columnar+gzip）の本文サイズとシリアライズ時間の比較ベンチマーク
+
+4次審査まで通過した社員を合成し、最終候補者リストの作成からJSON本文の生成までを計測する。
+
+    uv run python bench/bench_response_encoding.py [roleあたりの候補者数] [role数]
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'recomend', 'generate_candidates'))
+
+import ranking_main  # noqa: E402
+
+REPEAT = 20
+
+
+def make_survivors(count):
+    return [
+        {
+            'employee_id': f'EMP{i:07d}',
+            'name': f'社員{i}',
+            'certifications': ['AWS SAA', '基本情報技術者', 'PMP Professional'][:i % 4],
+            '勤続年数': Decimal(i % 15),
+            'mbti_percentages': {k: Decimal(30 + (i * 7 + n) % 41) for n, k in enumerate('EINSTFJP')},
+            'stage0_details': {'available_time': Decimal(20 + i % 20)},
+            'stage1_details': {'motivation_level': Decimal(3 + i % 3)},
+            'stage2_score': 0.5,
+            'stage3_score': round(0.3 + (i % 70) / 100, 3),
+            'stage4_score': round(0.4 + (i % 50) / 100, 3),
+        }
+        for i in range(count)
+    ]
+
+
+def build_results(survivors_by_role, columnar):
+    results = {'roles': {}}
+    for role, survivors in survivors_by_role.items():
+        candidates = ranking_main.calculate_final_scores([dict(emp) for emp in survivors])
+        if columnar:
+            results['roles'][role] = ranking_main.create_final_candidate_columns(candidates, role, 5)
+        else:
+            results['roles'][role] = ranking_main.create_final_candidate_list(candidates, role, 5)
+    return results
+
+
+def encode(survivors_by_role, response_format):
+    """lambda_handlerと同じ手順で本文を作る"""
+    if response_format == 'json':
+        results = build_results(survivors_by_role, columnar=False)
+        return ranking_main.json.dumps(ranking_main.decimal_to_float(results), ensure_ascii=False)
+    results = build_results(survivors_by_role, columnar=True)
+    body, _ = ranking_main.encode_compact_body(results, compress=response_format == 'columnar+gzip')
+    return body
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    roles = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    ranking_main.logger.disabled = True
+    survivors_by_role = {f'role{r}': make_survivors(count) for r in range(roles)}
+
+    print(f"candidates/role={count} roles={roles}")
+    baseline = None
+    for response_format in ranking_main.RESPONSE_FORMATS:
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            body = encode(survivors_by_role, response_format)
+        elapsed = (time.perf_counter() - start) / REPEAT
+        size = len(body.encode('utf-8'))
+        baseline = baseline or (elapsed, size)
+        print(f"{response_format:<14} {elapsed * 1000:8.2f} ms  {size / 1024:9.1f} KiB  "
+              f"(時間 x{elapsed / baseline[0]:.2f}, サイズ x{size / baseline[1]:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""上位k件の選出（全件ソート vs top_k / top_k_indices）の比較ベンチマーク
+
+3次審査のスコアのように同点の多い（小数3桁に丸めた）スコアを持つ生存者から上位k件を選び、
+全件を安定ソートして先頭k件を取る従来の方法と結果が一致することを確かめてから時間を比べる。
+
+    uv run python bench/bench_top_k.py [生存者数] [k]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import np, top_k, top_k_indices  # noqa: E402
+
+REPEAT = 20
+
+
+def score(emp):
+    return emp['stage3_score']
+
+
+def measure(func):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func()
+    return result, (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    lambda_function.logger.disabled = True
+    rng = random.Random(0)
+    survivors = [{'employee_id': f'EMP{i:07d}', 'stage3_score': round(rng.randrange(20, 81, 5) / 100, 3)}
+                 for i in range(count)]
+
+    expected, sort_time = measure(lambda: sorted(survivors, key=score, reverse=True)[:k])
+    heap, heap_time = measure(lambda: top_k(survivors, k, key=score))
+    assert heap == expected
+    print(f"survivors={count} k={k}")
+    print(f"sorted()[:k]       {sort_time * 1000:8.2f} ms")
+    print(f"top_k (heap)       {heap_time * 1000:8.2f} ms  x{sort_time / heap_time:.1f}")
+
+    if np is None:
+        print("NumPyがないため配列版は省略")
+        return
+    scores = np.array([emp['stage3_score'] for emp in survivors])
+    expected_indices, argsort_time = measure(lambda: np.argsort(-scores, kind='stable')[:k])
+    indices, partition_time = measure(lambda: top_k_indices(scores, k))
+    assert indices.tolist() == expected_indices.tolist()
+    assert [survivors[i] for i in indices] == expected
+    print(f"argsort()[:k]      {argsort_time * 1000:8.2f} ms")
+    print(f"top_k_indices      {partition_time * 1000:8.2f} ms  x{argsort_time / partition_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
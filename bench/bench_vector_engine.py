@@ -0,0 +1,130 @@
+"""ループ版（RankingEngine）とNumPy版（VectorRankingEngine）の審査エンジンの一致確認と比較ベンチマーク
+
+まず小さめの社員集合で、カテゴリ・稼働時間・要求レベル・リーダーMBTI・募集人数を変えた各条件について
+両エンジンの最終候補者リストが完全に一致することを確認する。その後、1roleの社員数を増やして
+0～4次審査から最終候補者リスト作成までの時間を比べる。NumPy版は社員dictから列を作る場合と、
+列指向スナップショットの列をそのまま使う場合の両方を計測する。
+
+    uv run python bench/bench_vector_engine.py [社員数]
+"""
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import (EmployeeFeatures, EmployeeSnapshotFile, RankingEngine,  # noqa: E402
+                             VectorRankingEngine, process_role_screening)
+
+ROLE = 'backend'
+CERTIFICATIONS = ['AWS SAA', 'Google Cloud ACE', 'ネットワークスペシャリスト', 'PMP Professional',
+                  '応用情報技術者', '基本情報技術者', 'TOEIC', '簿記検定']
+
+
+def make_employees(count, seed=0):
+    """アンケート由来の粗い整数のMBTIを持つ社員（一部は取り込み済みの特徴つき）"""
+    rng = random.Random(seed)
+    employees = []
+    for i in range(count):
+        emp = {
+            'employee_id': f'EMP{i:07d}',
+            'name': f'社員{i}',
+            'role': ROLE,
+            'time': rng.choice([10, 15, 20, 25, 30, 35, 40]),
+            'motivation_by_role': {ROLE: rng.randint(1, 6)},
+            'certifications': rng.sample(CERTIFICATIONS, rng.randint(0, 4)),
+            '勤続年数': rng.choice([0, 1, 1.5, 3, 5, 7, 9, 12]),
+            '経験': {k: rng.randint(0, 6) for k in rng.sample(['backend', 'infra', 'frontend'], rng.randint(0, 3))},
+            'mbti_percentages': {k: rng.randrange(20, 81, 5) for k in 'ENTJ'},
+        }
+        for a, b in (('E', 'I'), ('N', 'S'), ('T', 'F'), ('J', 'P')):
+            emp['mbti_percentages'][b] = 100 - emp['mbti_percentages'][a]
+        if i % 3 == 0:
+            emp['features'] = EmployeeFeatures.compute(emp)
+        employees.append(emp)
+    return employees
+
+
+def project(category, worktime, level, leader, sub_leader):
+    return {
+        'category': category,
+        'worktime': worktime,
+        'role_requirements': {ROLE: {'level': level, 'level_range': 0.1}},
+        'leader_mbti': {'percentages': leader},
+        'sub_leader_mbti': {'percentages': sub_leader},
+    }
+
+
+def run(engine, employees, project_data, required_count):
+    lambda_function.RANKING_ENGINE = engine
+    return process_role_screening(
+        employees, ROLE, required_count, project_data, project_data['category'],
+        project_data['leader_mbti']['percentages'], project_data['sub_leader_mbti']['percentages'])
+
+
+def check_parity(employees):
+    leaders = [{}, {'E': 70, 'N': 35, 'T': 55, 'J': 80}, {'E': 25, 'N': 65, 'T': 10, 'J': 45}]
+    cases = 0
+    for category, worktime, level, (leader, sub_leader), required_count in itertools.product(
+            ['新規開発', '改善・保守', 'クライアント対応', 'その他'], [20, 30], [0.4, 0.5, 0.6],
+            itertools.permutations(leaders, 2), [1, 3]):
+        project_data = project(category, worktime, level, leader, sub_leader)
+        expected = run('loop', employees, project_data, required_count)
+        actual = run('numpy', employees, project_data, required_count)
+        assert json.dumps(expected, sort_keys=True) == json.dumps(actual, sort_keys=True), \
+            (category, worktime, level, leader, sub_leader, required_count)
+        cases += 1
+    print(f"parity: {cases}条件で一致")
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lambda_function.logger.disabled = True
+    check_parity(make_employees(3000, seed=1))
+
+    employees = make_employees(count)
+    project_data = project('新規開発', 20, 0.5, {'E': 70, 'N': 35, 'T': 55, 'J': 80},
+                           {'E': 25, 'N': 65, 'T': 10, 'J': 45})
+    leader = project_data['leader_mbti']['percentages']
+    sub_leader = project_data['sub_leader_mbti']['percentages']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'employees.snapshot')
+        EmployeeSnapshotFile.write(path, employees)
+        snapshot = EmployeeSnapshotFile(path)
+
+        def snapshot_engine():
+            columns = VectorRankingEngine.load_snapshot_columns(snapshot, ROLE, '新規開発')
+            candidates = VectorRankingEngine.screen_role(
+                columns, ROLE, 4, project_data, '新規開発', leader, sub_leader)
+            candidates = RankingEngine.calculate_final_scores(candidates)
+            return RankingEngine.create_final_candidate_list(candidates, ROLE, 4)
+
+        # スナップショットから復元した社員（特徴つき）でのループ版と結果を比べる
+        snapshot_employees = snapshot.role_employees(ROLE)
+        loop, loop_time = timed(lambda: run('loop', employees, project_data, 4))
+        vector, vector_time = timed(lambda: run('numpy', employees, project_data, 4))
+        from_snapshot, snapshot_time = timed(snapshot_engine)
+        assert loop == vector
+        assert from_snapshot == run('loop', snapshot_employees, project_data, 4)
+        snapshot.close()
+
+    print(f"employees={count} role={ROLE}")
+    print(f"loop engine           {loop_time * 1000:9.1f} ms")
+    print(f"numpy (社員dictから)  {vector_time * 1000:9.1f} ms  x{loop_time / vector_time:.1f}")
+    print(f"numpy (スナップショット) {snapshot_time * 1000:7.1f} ms  x{loop_time / snapshot_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
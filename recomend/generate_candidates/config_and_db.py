@@ -1,17 +1,30 @@
 """基本設定とデータベース操作"""
+import copy
 import json
-import boto3
 from decimal import Decimal
 import logging
 from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
+import time
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
+# データ保存先: 'dynamodb' / 'local'（LOCAL_DATA_DIRのJSONLファイル）
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dynamodb')
+LOCAL_DATA_DIR = os.environ.get('LOCAL_DATA_DIR', 'data')
+repository = None
+
+dynamodb = None
 EMPLOYEES_TABLE = os.environ.get('EMPLOYEES_TABLE', 'Employees')
 PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'Projects')
+EMPLOYEES_SCAN_SEGMENTS = int(os.environ.get('EMPLOYEES_SCAN_SEGMENTS', '1'))
+SCAN_MAX_WORKERS = int(os.environ.get('SCAN_MAX_WORKERS', '8'))
+EMPLOYEE_FETCH_MODE = os.environ.get('EMPLOYEE_FETCH_MODE', 'scan')
+EMPLOYEES_ROLE_INDEX = os.environ.get('EMPLOYEES_ROLE_INDEX', 'role-index')
+BATCH_GET_LIMIT = 100
 
 def decimal_to_float(obj):
     if isinstance(obj, list):
@@ -23,25 +36,179 @@ def decimal_to_float(obj):
     else:
         return obj
 
-def fetch_employees_from_dynamodb():
-    try:
-        table = dynamodb.Table(EMPLOYEES_TABLE)
-        response = table.scan()
-        employees = response.get('Items', [])
+def get_dynamodb():
+    global dynamodb
+    if dynamodb is None:
+        import boto3
+        dynamodb = boto3.resource('dynamodb')
+    return dynamodb
+
+class EmployeeRepository:
+    """社員・プロジェクトデータ取得のインターフェース"""
+
+    def fetch_employees(self, segments=None):
+        raise NotImplementedError
+
+    def fetch_employees_by_roles(self, roles):
+        raise NotImplementedError
+
+    def batch_get_employees(self, employee_ids):
+        raise NotImplementedError
+
+    def fetch_project(self, project_id):
+        raise NotImplementedError
+
+class DynamoDBRepository(EmployeeRepository):
+    """DynamoDBバックエンド"""
+
+    def scan_segment(self, segment=None, total_segments=None):
+        table = get_dynamodb().Table(EMPLOYEES_TABLE)
+        scan_kwargs = {}
+        if total_segments and total_segments > 1:
+            scan_kwargs = {'Segment': segment, 'TotalSegments': total_segments}
+        response = table.scan(**scan_kwargs)
+        items = response.get('Items', [])
         while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            employees.extend(response.get('Items', []))
+            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **scan_kwargs)
+            items.extend(response.get('Items', []))
+        return items
+
+    def fetch_employees(self, segments=None):
+        segments = int(segments or EMPLOYEES_SCAN_SEGMENTS)
+        if segments <= 1:
+            return self.scan_segment()
+        workers = max(1, min(segments, SCAN_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.scan_segment, seg, segments) for seg in range(segments)]
+            employees = []
+            for future in futures:
+                employees.extend(future.result())
+        return employees
+
+    def query_employees_by_role(self, role):
+        table = get_dynamodb().Table(EMPLOYEES_TABLE)
+        query_kwargs = {
+            'IndexName': EMPLOYEES_ROLE_INDEX,
+            'KeyConditionExpression': '#role = :role',
+            'ExpressionAttributeNames': {'#role': 'role'},
+            'ExpressionAttributeValues': {':role': role},
+        }
+        response = table.query(**query_kwargs)
+        items = response.get('Items', [])
+        while 'LastEvaluatedKey' in response:
+            response = table.query(ExclusiveStartKey=response['LastEvaluatedKey'], **query_kwargs)
+            items.extend(response.get('Items', []))
+        return items
+
+    def fetch_employees_by_roles(self, roles):
+        roles = list(roles)
+        workers = max(1, min(len(roles), SCAN_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {role: executor.submit(self.query_employees_by_role, role) for role in roles}
+            return {role: future.result() for role, future in futures.items()}
+
+    def batch_get_employees(self, employee_ids):
+        unique_ids = list(dict.fromkeys(i for i in employee_ids if i is not None))
+        employees = {}
+        for start in range(0, len(unique_ids), BATCH_GET_LIMIT):
+            keys = [{'employee_id': i} for i in unique_ids[start:start + BATCH_GET_LIMIT]]
+            request = {EMPLOYEES_TABLE: {'Keys': keys}}
+            attempt = 0
+            while request:
+                response = get_dynamodb().batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(EMPLOYEES_TABLE, []):
+                    employees[item.get('employee_id')] = item
+                request = response.get('UnprocessedKeys') or {}
+                if request:
+                    attempt += 1
+                    time.sleep(min(0.05 * (2 ** attempt), 1.0))
+        return employees
+
+    def fetch_project(self, project_id):
+        table = get_dynamodb().Table(PROJECTS_TABLE)
+        response = table.get_item(Key={'project_id': project_id})
+        return response.get('Item', {})
+
+class LocalFileRepository(EmployeeRepository):
+    """LOCAL_DATA_DIRのemployees.jsonl・projects.jsonlを読むバックエンド（数値はDecimal）"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def _table(self, filename, key):
+        path = os.path.join(self.data_dir, filename)
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        with self.lock:
+            table = self.tables.get(filename)
+            if table is None or table['mtime'] != mtime:
+                items = []
+                if mtime is not None:
+                    with open(path, encoding='utf-8') as f:
+                        items = [json.loads(line, parse_float=Decimal, parse_int=Decimal)
+                                 for line in f if line.strip()]
+                table = {
+                    'mtime': mtime,
+                    'items': items,
+                    'by_key': {item.get(key): item for item in items},
+                    'by_role': group_employees_by_role(items),
+                }
+                self.tables[filename] = table
+            return table
+
+    def fetch_employees(self, segments=None):
+        return list(self._table('employees.jsonl', 'employee_id')['items'])
+
+    def fetch_employees_by_roles(self, roles):
+        by_role = self._table('employees.jsonl', 'employee_id')['by_role']
+        return {role: list(by_role.get(role, [])) for role in roles}
+
+    def batch_get_employees(self, employee_ids):
+        by_key = self._table('employees.jsonl', 'employee_id')['by_key']
+        return {i: by_key[i] for i in employee_ids if i in by_key}
+
+    def fetch_project(self, project_id):
+        item = self._table('projects.jsonl', 'project_id')['by_key'].get(project_id)
+        return copy.deepcopy(item) if item else {}
+
+def get_repository():
+    global repository
+    if repository is None:
+        if STORAGE_BACKEND == 'local':
+            repository = LocalFileRepository(LOCAL_DATA_DIR)
+        else:
+            repository = DynamoDBRepository()
+    return repository
+
+def fetch_employees(segments=None):
+    try:
+        employees = get_repository().fetch_employees(segments)
         logger.info(f"Fetched {len(employees)} employees")
         return employees
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         raise
 
-def fetch_project_from_dynamodb(project_id):
+def fetch_employees_by_roles(roles):
     try:
-        table = dynamodb.Table(PROJECTS_TABLE)
-        response = table.get_item(Key={'project_id': project_id})
-        return response.get('Item', {})
+        grouped = get_repository().fetch_employees_by_roles(roles)
+        logger.info(f"Fetched {sum(len(v) for v in grouped.values())} employees for {len(grouped)} roles")
+        return grouped
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        raise
+
+def batch_get_employees(employee_ids):
+    try:
+        return get_repository().batch_get_employees(employee_ids)
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        raise
+
+def fetch_project(project_id):
+    try:
+        return get_repository().fetch_project(project_id)
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         raise
@@ -53,4 +220,11 @@ def group_employees_by_role(employees):
         if role not in grouped:
             grouped[role] = []
         grouped[role].append(emp)
-    return grouped
\ No newline at end of file
+    return grouped
+
+def load_employees_by_role(roles):
+    """募集roleの社員をrole別に取得"""
+    if EMPLOYEE_FETCH_MODE == 'role_query':
+        grouped = fetch_employees_by_roles(roles)
+        return {role: employees for role, employees in grouped.items() if employees}
+    return group_employees_by_role(fetch_employees())
\ No newline at end of file
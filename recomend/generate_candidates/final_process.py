@@ -1,7 +1,24 @@
 """最終スコア計算と統合処理"""
+import base64
+import gzip
+import heapq
+import json
 import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
 logger = logging.getLogger()
 
+# ページ分割した候補者リストの続きを返すため、順位付け済みの社員をウォームコンテナで保持する件数と秒数
+# （保持はコンテナごとなので、別のコンテナ・破棄後に届いたカーソルはプロジェクトIDから審査し直す）
+RANKED_CACHE_MAX_ENTRIES = int(os.environ.get('RANKED_CACHE_MAX_ENTRIES', '128'))
+RANKED_CACHE_TTL = float(os.environ.get('RANKED_CACHE_TTL', '900'))
+_ranked_cache = OrderedDict()
+_ranked_cache_lock = threading.Lock()
+
 def calculate_final_scores(employees):
     scored_employees = []
     
@@ -46,40 +63,200 @@ def determine_mbti_type(mbti_percentages):
     
     return mbti_type
 
-def create_final_candidate_list(employees, role, required_count):
-    sorted_employees = sorted(employees, key=lambda x: x.get('final_score', 0), reverse=True)
+def create_candidate_info(emp, rank):
+    return {
+        'rank': rank,
+        'employee_id': emp.get('employee_id'),
+        'employee_name': emp.get('name'),
+        'final_score': emp.get('final_score', 0),
+        'grade': emp.get('final_grade', 'D'),
+        'grade_description': emp.get('grade_description', ''),
+        'mbti_type': determine_mbti_type(emp.get('mbti_percentages', {})),
+        'scores': {
+            'level': emp.get('stage2_score', 0),
+            'mbti_fitness': emp.get('stage3_score', 0),
+            'leader_compatibility': emp.get('stage4_score', 0)
+        },
+        'details': {
+            'motivation': emp.get('stage1_details', {}).get('motivation_level', 0),
+            'worktime': emp.get('stage0_details', {}).get('available_time', 0),
+            'certifications': emp.get('certifications', []),
+            'tenure_years': emp.get('勤続年数', 0)
+        }
+    }
+
+def create_final_candidate_list(employees, role, required_count, page_size=None, project_id=None):
+    """最終候補者リスト（page_size指定時は先頭ページだけを作り、続きはnext_cursorで取得）"""
+    next_cursor = None
+    if page_size and len(employees) > page_size:
+        # 先頭ページだけを選び、全体の並べ替えは続きのページが求められたときに行う
+        page = heapq.nlargest(page_size, employees, key=final_score)
+        entry_id = store_ranked_candidates(role, required_count, list(employees), page_size, project_id)
+        next_cursor = encode_cursor(entry_id, page_size, project_id, role, page_size)
+    else:
+        page = sorted(employees, key=final_score, reverse=True)
     
-    candidates = []
-    for rank, emp in enumerate(sorted_employees, 1):
-        candidate_info = {
-            'rank': rank,
-            'employee_id': emp.get('employee_id'),
-            'employee_name': emp.get('name'),
-            'final_score': emp.get('final_score', 0),
-            'grade': emp.get('final_grade', 'D'),
-            'grade_description': emp.get('grade_description', ''),
-            'mbti_type': determine_mbti_type(emp.get('mbti_percentages', {})),
-            'scores': {
-                'level': emp.get('stage2_score', 0),
-                'mbti_fitness': emp.get('stage3_score', 0),
-                'leader_compatibility': emp.get('stage4_score', 0)
-            },
-            'details': {
-                'motivation': emp.get('stage1_details', {}).get('motivation_level', 0),
-                'worktime': emp.get('stage0_details', {}).get('available_time', 0),
-                'certifications': emp.get('certifications', []),
-                'tenure_years': emp.get('勤続年数', 0)
-            }
+    result = {
+        'role': role,
+        'required_count': required_count,
+        'total_candidates': len(employees),
+        'candidates': [create_candidate_info(emp, rank) for rank, emp in enumerate(page, 1)]
+    }
+    if page_size:
+        result['next_cursor'] = next_cursor
+    return result
+
+def final_score(emp):
+    return emp.get('final_score', 0)
+
+def store_ranked_candidates(role, required_count, employees, page_size, project_id=None):
+    """最終候補者（並べ替え前）を保持してエントリIDを返す（古いものから上限件数まで）"""
+    entry_id = uuid.uuid4().hex
+    with _ranked_cache_lock:
+        _ranked_cache[entry_id] = {
+            'project_id': project_id,
+            'role': role,
+            'required_count': required_count,
+            'employees': employees,
+            'ranked': False,
+            'page_size': page_size,
+            'loaded_at': time.monotonic()
         }
-        candidates.append(candidate_info)
+        while len(_ranked_cache) > RANKED_CACHE_MAX_ENTRIES:
+            _ranked_cache.popitem(last=False)
+    return entry_id
+
+def encode_cursor(entry_id, offset, project_id, role, page_size):
+    raw = json.dumps({
+        'id': entry_id,
+        'offset': offset,
+        'project_id': project_id,
+        'role': role,
+        'page_size': page_size
+    }, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    """{'id', 'offset', 'project_id', 'role', 'page_size'}（壊れたカーソル・負のオフセットならNone）"""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        result = {
+            'id': str(decoded['id']),
+            'offset': int(decoded['offset']),
+            'project_id': decoded.get('project_id'),
+            'role': decoded.get('role'),
+            'page_size': int(decoded['page_size']) if decoded.get('page_size') is not None else None
+        }
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    if result['offset'] < 0 or (result['page_size'] is not None and result['page_size'] <= 0):
+        return None
+    return result
+
+def get_ranked_entry(entry_id):
+    """保持中のエントリ（順位順に並べ替え済み）。ない・期限切れならNone"""
+    with _ranked_cache_lock:
+        entry = _ranked_cache.get(entry_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['loaded_at'] > RANKED_CACHE_TTL:
+            del _ranked_cache[entry_id]
+            return None
+        _ranked_cache.move_to_end(entry_id)
+        # 最初に続きのページが求められたときに1回だけ並べ替える
+        if not entry['ranked']:
+            entry['employees'] = sorted(entry['employees'], key=final_score, reverse=True)
+            entry['ranked'] = True
+        return entry
+
+def create_candidate_page(cursor, rerank=None):
+    """カーソルが指す続きのページ（不正なカーソル・審査し直せないカーソルならNone）
+    
+    エントリがこのコンテナにない場合、rerank(project_id, page_size)で全roleの審査をやり直して
+    登録し直したエントリから同じオフセットのページを返す。
+    """
+    decoded = decode_cursor(cursor)
+    if decoded is None:
+        return None
+    entry_id = decoded['id']
+    entry = get_ranked_entry(entry_id)
+    if entry is None:
+        if rerank is None or not decoded['project_id'] or decoded['role'] is None or not decoded['page_size']:
+            return None
+        logger.info(f"カーソルのエントリがないため再審査: {decoded['project_id']} / {decoded['role']}")
+        role_result = rerank(decoded['project_id'], decoded['page_size']).get('roles', {}).get(decoded['role'])
+        if role_result is None:
+            return None
+        next_decoded = decode_cursor(role_result.get('next_cursor') or '')
+        entry_id = next_decoded['id'] if next_decoded else None
+        entry = get_ranked_entry(entry_id) if entry_id else None
+        if entry is None:
+            # 審査し直した結果が先頭ページに収まる場合、続きのページは空
+            return {
+                'role': role_result['role'],
+                'required_count': role_result['required_count'],
+                'total_candidates': role_result['total_candidates'],
+                'candidates': [],
+                'next_cursor': None
+            }
+    
+    offset = decoded['offset']
+    employees = entry['employees']
+    end = offset + entry['page_size']
+    return {
+        'role': entry['role'],
+        'required_count': entry['required_count'],
+        'total_candidates': len(employees),
+        'candidates': [create_candidate_info(emp, rank)
+                       for rank, emp in enumerate(employees[offset:end], offset + 1)],
+        'next_cursor': encode_cursor(entry_id, end, entry['project_id'], entry['role'], entry['page_size'])
+                       if end < len(employees) else None
+    }
+
+def create_final_candidate_columns(employees, role, required_count):
+    """create_final_candidate_listの列指向版（候補者ごとのdictを作らず、項目ごとの配列で返す）"""
+    sorted_employees = sorted(employees, key=lambda x: x.get('final_score', 0), reverse=True)
+    
+    columns = {
+        'rank': list(range(1, len(sorted_employees) + 1)),
+        'employee_id': [emp.get('employee_id') for emp in sorted_employees],
+        'employee_name': [emp.get('name') for emp in sorted_employees],
+        'final_score': [emp.get('final_score', 0) for emp in sorted_employees],
+        'grade': [emp.get('final_grade', 'D') for emp in sorted_employees],
+        'mbti_type': [determine_mbti_type(emp.get('mbti_percentages', {})) for emp in sorted_employees],
+        'level': [emp.get('stage2_score', 0) for emp in sorted_employees],
+        'mbti_fitness': [emp.get('stage3_score', 0) for emp in sorted_employees],
+        'leader_compatibility': [emp.get('stage4_score', 0) for emp in sorted_employees],
+        'motivation': [emp.get('stage1_details', {}).get('motivation_level', 0) for emp in sorted_employees],
+        'worktime': [emp.get('stage0_details', {}).get('available_time', 0) for emp in sorted_employees],
+        'certifications': [emp.get('certifications', []) for emp in sorted_employees],
+        'tenure_years': [emp.get('勤続年数', 0) for emp in sorted_employees],
+    }
     
     return {
         'role': role,
         'required_count': required_count,
         'total_candidates': len(sorted_employees),
-        'candidates': candidates
+        'format': 'columnar',
+        # グレードの説明は候補者ごとではなくグレード単位で1回だけ持つ
+        'grade_descriptions': {emp.get('final_grade', 'D'): emp.get('grade_description', '')
+                               for emp in sorted_employees},
+        'columns': columns
     }
 
+def json_number(obj):
+    """json.dumpsのdefault: DynamoDBのDecimalだけを通常の数値にする（全体を辿り直さない）"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def encode_compact_body(results, compress=False):
+    """区切りを詰めたJSON本文（compress=Trueならgzip圧縮してbase64）と、base64かどうか"""
+    body = json.dumps(results, ensure_ascii=False, separators=(',', ':'), default=json_number)
+    if not compress:
+        return body, False
+    return base64.b64encode(gzip.compress(body.encode('utf-8'))).decode('ascii'), True
+
 def create_empty_candidate_list(role, required_count):
     return {
         'role': role,
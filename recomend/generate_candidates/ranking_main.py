@@ -6,9 +6,14 @@ from stage_3 import *
 from stage_4 import *
 from final_process import *
 
+# event['response_format']で選べる応答形式
+# 'json': 候補者ごとのdict / 'columnar': 候補者を項目ごとの配列で / 'columnar+gzip': さらにgzip+base64
+RESPONSE_FORMATS = ('json', 'columnar', 'columnar+gzip')
+
 def process_role_screening(employees, role, required_count, project_data, 
-                          project_category, leader_mbti, sub_leader_mbti):
-    """特定roleの完全な審査プロセス"""
+                          project_category, leader_mbti, sub_leader_mbti, columnar=False, page_size=None,
+                          project_id=None):
+    """特定roleの完全な審査プロセス（columnar=Trueなら最終候補者リストを列指向で、page_size指定時は先頭ページだけ作成）"""
     
     logger.info(f"\n{'='*50}")
     logger.info(f"Role: {role} の審査開始（募集: {required_count}名）")
@@ -43,13 +48,15 @@ def process_role_screening(employees, role, required_count, project_data,
     candidates = calculate_final_scores(candidates)
     
     # 最終候補者リスト作成
-    return create_final_candidate_list(candidates, role, required_count)
+    if columnar:
+        return create_final_candidate_columns(candidates, role, required_count)
+    return create_final_candidate_list(candidates, role, required_count, page_size, project_id)
 
-def process_all_roles(project_id):
+def process_all_roles(project_id, columnar=False, page_size=None):
     """全roleの審査を実施"""
     
     # プロジェクトデータ取得
-    project_data = fetch_project_from_dynamodb(project_id)
+    project_data = fetch_project(project_id)
     if not project_data:
         logger.error(f"Project {project_id} not found")
         return {"error": "Project not found"}
@@ -60,9 +67,8 @@ def process_all_roles(project_id):
     leader_mbti = project_data.get('leader_mbti', {}).get('percentages', {})
     sub_leader_mbti = project_data.get('sub_leader_mbti', {}).get('percentages', {})
     
-    # 全社員データ取得とグループ化
-    all_employees = fetch_employees_from_dynamodb()
-    employees_by_role = group_employees_by_role(all_employees)
+    # 募集roleの社員データ取得（role別）
+    employees_by_role = load_employees_by_role(recruiting_roles.keys())
     
     # 結果格納
     all_results = {
@@ -95,7 +101,10 @@ def process_all_roles(project_id):
             project_data=project_data,
             project_category=project_category,
             leader_mbti=leader_mbti,
-            sub_leader_mbti=sub_leader_mbti
+            sub_leader_mbti=sub_leader_mbti,
+            columnar=columnar,
+            page_size=page_size,
+            project_id=project_id
         )
         
         all_results['roles'][role] = role_result
@@ -116,6 +125,24 @@ def process_all_roles(project_id):
 def lambda_handler(event, context):
     """AWS Lambda エントリーポイント"""
     try:
+        # 候補者リストの続きのページ（このコンテナにエントリがなければカーソルのプロジェクトを審査し直す）
+        if event.get('cursor'):
+            page = create_candidate_page(
+                event['cursor'], lambda project_id, page_size: process_all_roles(project_id, page_size=page_size))
+            if page is None:
+                return {
+                    'statusCode': 410,
+                    'body': json.dumps({'error': 'cursor is invalid or expired'})
+                }
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps(decimal_to_float(page), ensure_ascii=False)
+            }
+        
         project_id = event.get('project_id')
         
         if not project_id:
@@ -124,7 +151,24 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'project_id is required'})
             }
         
-        results = process_all_roles(project_id)
+        response_format = event.get('response_format', 'json')
+        if response_format not in RESPONSE_FORMATS:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'response_format must be one of {list(RESPONSE_FORMATS)}'})
+            }
+        
+        # page_size指定時はrole別に先頭ページだけを返す（json形式のみ）
+        page_size = event.get('page_size')
+        if page_size is not None:
+            page_size = int(page_size)
+            if page_size <= 0 or response_format != 'json':
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': 'page_size must be positive and requires response_format json'})
+                }
+        
+        results = process_all_roles(project_id, columnar=response_format != 'json', page_size=page_size)
         
         if 'error' in results:
             return {
@@ -132,6 +176,21 @@ def lambda_handler(event, context):
                 'body': json.dumps(results)
             }
         
+        if response_format != 'json':
+            body, is_base64 = encode_compact_body(results, compress=response_format == 'columnar+gzip')
+            headers = {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            }
+            if is_base64:
+                headers['Content-Encoding'] = 'gzip'
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': body,
+                'isBase64Encoded': is_base64
+            }
+        
         return {
             'statusCode': 200,
             'headers': {
@@ -1,20 +1,37 @@
 """2次審査：レベルマッチング"""
 import logging
+import os
+import threading
+from collections import OrderedDict
 logger = logging.getLogger()
 
+# (社員, role)ごとのレベルのウォームコンテナ内キャッシュの上限件数（0で無効）
+LEVEL_CACHE_MAX_ENTRIES = int(os.environ.get('LEVEL_CACHE_MAX_ENTRIES', '200000'))
+_level_cache = OrderedDict()
+_level_cache_lock = threading.Lock()
+
+# roleごとの資格の重み（表にない資格は既定の重み）。呼び出しごとに作り直さないようモジュールで保持する
+CERT_WEIGHTS = {
+    'backend': {'AWS-SAA': 0.3, 'AWS-DVA': 0.3, 'データベーススペシャリスト': 0.3},
+    'frontend': {'Google Developer': 0.3, 'React認定': 0.3},
+    'ml': {'AWS-MLS': 0.4, 'E資格': 0.3, 'G検定': 0.2}
+}
+DEFAULT_CERT_WEIGHT = 0.05
+
+# roleごとの経験の重み
+EXP_WEIGHTS = {
+    'backend': {'ソフトウェア開発': 0.4, 'API開発': 0.3},
+    'frontend': {'フロントエンド開発': 0.5},
+    'ml': {'MLOps': 0.4, '機械学習開発': 0.4}
+}
+
 def calculate_employee_level(employee, target_role):
     level = 0.0
     
     # 資格評価
-    cert_weights = {
-        'backend': {'AWS-SAA': 0.3, 'AWS-DVA': 0.3, 'データベーススペシャリスト': 0.3},
-        'frontend': {'Google Developer': 0.3, 'React認定': 0.3},
-        'ml': {'AWS-MLS': 0.4, 'E資格': 0.3, 'G検定': 0.2}
-    }
-    
     certs = employee.get('certifications', [])
-    weights = cert_weights.get(target_role, {})
-    cert_score = sum(weights.get(c, 0.05) for c in certs)
+    weights = CERT_WEIGHTS.get(target_role, {})
+    cert_score = sum(weights.get(c, DEFAULT_CERT_WEIGHT) for c in certs)
     level += min(cert_score, 1.0) * 0.5
     
     # 勤続年数
@@ -27,13 +44,7 @@ def calculate_employee_level(employee, target_role):
     level += tenure_score * 0.3
     
     # 経験
-    exp_weights = {
-        'backend': {'ソフトウェア開発': 0.4, 'API開発': 0.3},
-        'frontend': {'フロントエンド開発': 0.5},
-        'ml': {'MLOps': 0.4, '機械学習開発': 0.4}
-    }
-    
-    role_exp = exp_weights.get(target_role, {})
+    role_exp = EXP_WEIGHTS.get(target_role, {})
     exp_score = 0.0
     for exp_type, years in employee.get('経験', {}).items():
         if exp_type in role_exp:
@@ -42,6 +53,34 @@ def calculate_employee_level(employee, target_role):
     
     return round(level * 10) / 10
 
+def level_fingerprint(employee):
+    """レベルの算出に使う属性の内容（変わっていればキャッシュを使わない）"""
+    experience = employee.get('経験', {})
+    return (tuple(employee.get('certifications', [])), employee.get('勤続年数', 0),
+            tuple(experience.items()) if isinstance(experience, dict) else experience)
+
+def cached_employee_level(employee, target_role):
+    """calculate_employee_levelを(社員ID, role)ごとにキャッシュ"""
+    employee_id = employee.get('employee_id')
+    if employee_id is None or LEVEL_CACHE_MAX_ENTRIES <= 0:
+        return calculate_employee_level(employee, target_role)
+    
+    key = (employee_id, target_role)
+    fingerprint = level_fingerprint(employee)
+    with _level_cache_lock:
+        entry = _level_cache.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            _level_cache.move_to_end(key)
+            return entry[1]
+    
+    level = calculate_employee_level(employee, target_role)
+    with _level_cache_lock:
+        _level_cache[key] = (fingerprint, level)
+        _level_cache.move_to_end(key)
+        while len(_level_cache) > LEVEL_CACHE_MAX_ENTRIES:
+            _level_cache.popitem(last=False)
+    return level
+
 def stage2_level_matching(employees, project_data, target_role):
     req = project_data.get('role_requirements', {}).get(target_role, {})
     required_level = req.get('level', 0.5)
@@ -49,7 +88,7 @@ def stage2_level_matching(employees, project_data, target_role):
     
     passed = []
     for emp in employees:
-        level = calculate_employee_level(emp, target_role)
+        level = cached_employee_level(emp, target_role)
         emp['stage2_score'] = level
         
         if abs(level - required_level) <= level_range:
@@ -1,4 +1,5 @@
 """3次審査：MBTI適性"""
+import heapq
 import logging
 logger = logging.getLogger()
 
@@ -29,8 +30,8 @@ def stage3_mbti_scoring(employees, project_category):
     return scored_employees
 
 def select_top_candidates_stage3(employees, top_n):
-    sorted_emp = sorted(employees, key=lambda x: x.get('stage3_score', 0), reverse=True)
-    selected = sorted_emp[:min(top_n, len(sorted_emp))]
+    # 全件は並べ替えず上位top_n件だけを選ぶ（同点は元の順序で、安定ソートの先頭と同じ並び）
+    selected = heapq.nlargest(top_n, employees, key=lambda x: x.get('stage3_score', 0)) if top_n > 0 else []
     
     for rank, emp in enumerate(selected, 1):
         emp['stage3_rank'] = rank
@@ -1,4 +1,5 @@
 """4次審査：リーダー相性"""
+import heapq
 import logging
 logger = logging.getLogger()
 
@@ -64,8 +65,8 @@ def stage4_compatibility_scoring(employees, leader_mbti, sub_leader_mbti):
     return scored_employees
 
 def select_top_candidates_stage4(employees, top_n):
-    sorted_emp = sorted(employees, key=lambda x: x.get('stage4_score', 0), reverse=True)
-    selected = sorted_emp[:min(top_n, len(sorted_emp))]
+    # 全件は並べ替えず上位top_n件だけを選ぶ（同点は元の順序で、安定ソートの先頭と同じ並び）
+    selected = heapq.nlargest(top_n, employees, key=lambda x: x.get('stage4_score', 0)) if top_n > 0 else []
     
     for rank, emp in enumerate(selected, 1):
         emp['stage4_rank'] = rank
@@ -1,19 +1,116 @@
+import base64
+import bisect
+import copy
+import functools
+import hashlib
+import heapq
 import json
-import boto3
 import itertools
 import logging
+import mmap
+import queue
+import struct
+import sys
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
 from decimal import Decimal
 from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import os
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy未導入の環境ではループ版の審査エンジンだけを使う
+    np = None
 
 # ロギング設定
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# DynamoDB設定
-dynamodb = boto3.resource('dynamodb')
+# データ保存先: 'dynamodb' / 'local'（LOCAL_DATA_DIRのJSONLファイル、オフライン検証・プロファイル用）
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dynamodb')
+LOCAL_DATA_DIR = os.environ.get('LOCAL_DATA_DIR', 'data')
+LOCAL_PAGE_SIZE = int(os.environ.get('LOCAL_PAGE_SIZE', '1000'))
+repository = None
+
+# DynamoDB設定（リソースはget_dynamodb()で初回利用時に生成）
+dynamodb = None
 EMPLOYEES_TABLE = os.environ.get('EMPLOYEES_TABLE', 'employees')
 PROJECTS_TABLE = os.environ.get('PROJECTS_TABLE', 'projects')
+# 社員テーブルの並列スキャン設定（セグメント数1で従来の逐次スキャン）
+EMPLOYEES_SCAN_SEGMENTS = int(os.environ.get('EMPLOYEES_SCAN_SEGMENTS', '1'))
+SCAN_MAX_WORKERS = int(os.environ.get('SCAN_MAX_WORKERS', '8'))
+# 社員取得モード: 'scan'（全件スキャン後にrole別グループ化）/ 'role_query'（roleインデックスへのrole別クエリ）
+#                / 'snapshot'（列指向スナップショットファイルをmmapして読む）
+#                / 'index'（変更イベントで差分更新するメモリ上のrole別索引）
+EMPLOYEE_FETCH_MODE = os.environ.get('EMPLOYEE_FETCH_MODE', 'scan')
+EMPLOYEES_ROLE_INDEX = os.environ.get('EMPLOYEES_ROLE_INDEX', 'role-index')
+# 0次・1次審査の条件をDynamoDB側のFilterExpressionとして適用するか（既定は無効）
+# FilterExpressionはtime・motivation_by_roleを数値型として比較し、文字列で保存された値の社員は
+# 審査（float()で読む）と違ってストレージ側で黙って落ちるため、保存型を数値に揃えた環境でだけ有効にする
+EMPLOYEES_FILTER_PUSHDOWN = os.environ.get('EMPLOYEES_FILTER_PUSHDOWN', 'false').lower() == 'true'
+# 審査用属性だけを射影して取得し、表示用属性は最終候補者分だけ後から取得するか
+EMPLOYEES_PROJECTION = os.environ.get('EMPLOYEES_PROJECTION', 'true').lower() == 'true'
+
+# 0〜4次審査で参照する属性（motivation_by_roleは募集roleのキーだけを射影する）
+SCORING_ATTRIBUTES = ('employee_id', 'role', 'time', 'certifications', '勤続年数', '経験', 'mbti_percentages',
+                      'features')
+# 最終候補者リストの表示にだけ使う属性
+DISPLAY_ATTRIBUTES = ('name',)
+BATCH_GET_LIMIT = 100
+
+# ウォームコンテナ内の社員スナップショットキャッシュ（TTL秒、既定の0で無効）
+# 有効にするとrole別クエリや絞り込みのプッシュダウンより優先して全件を保持するため、
+# EMPLOYEES_META_TABLEでバージョンを判定できる環境で指定する
+EMPLOYEE_CACHE_TTL = float(os.environ.get('EMPLOYEE_CACHE_TTL', '0'))
+EMPLOYEE_CACHE_MAX_MB = float(os.environ.get('EMPLOYEE_CACHE_MAX_MB', '256'))
+# 社員テーブルのバージョン（書き込み側で更新する高水位マーク）を保持するテーブル（空ならTTLのみで判定）
+EMPLOYEES_META_TABLE = os.environ.get('EMPLOYEES_META_TABLE', '')
+EMPLOYEES_VERSION_KEY = os.environ.get('EMPLOYEES_VERSION_KEY', 'employees')
+# EMPLOYEE_FETCH_MODE='snapshot'で読む列指向スナップショットファイル（/tmpや同梱アセット）
+EMPLOYEE_SNAPSHOT_PATH = os.environ.get('EMPLOYEE_SNAPSHOT_PATH', '/tmp/employees.snapshot')
+# スナップショットを書き出し直すまでの秒数（0でTTLによる書き出し直しなし）。社員データのバージョンが
+# 書き出し時と異なる場合はTTLによらず書き出し直す（書き込めない同梱アセットなら0にする）
+EMPLOYEE_SNAPSHOT_TTL = float(os.environ.get('EMPLOYEE_SNAPSHOT_TTL', '300'))
+# 社員の変更イベント（DynamoDB Streamsのレコード形式、1行1件）を追記・追従するファイル（空なら使わない）
+EMPLOYEE_EVENTS_PATH = os.environ.get('EMPLOYEE_EVENTS_PATH', '')
+role_index_store = None
+# 審査結果を常時保持する募集中プロジェクト（カンマ区切り、register_open_projectでも追加できる）
+OPEN_PROJECT_IDS = [p for p in os.environ.get('OPEN_PROJECT_IDS', '').split(',') if p]
+standing_rankings = None
+# チーム候補セットの永続キャッシュ（プロジェクト・社員データのバージョンで判定、TTL秒0で無効）
+# DynamoDBバックエンドはRESULT_CACHE_TABLE、ローカルバックエンドはRESULT_CACHE_PATHのJSONファイルに保存
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', '3600'))
+RESULT_CACHE_TABLE = os.environ.get('RESULT_CACHE_TABLE', '')
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', '')
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', '256'))
+result_cache = None
+# 社員レベル（2次審査）のウォームコンテナ内キャッシュの上限件数（既定の0で無効）
+# 資格の加点は登録簿の表引きで安いため、キャッシュで速くなる幅は小さい（bench/bench_level_cache.pyで確認できる）
+LEVEL_CACHE_MAX_ENTRIES = int(os.environ.get('LEVEL_CACHE_MAX_ENTRIES', '0'))
+# スナップショット書き出し時に資格を資格名の代わりにファイル共通の資格ID（資格名表への添字）で保存するか
+SNAPSHOT_CERTIFICATION_IDS = os.environ.get('SNAPSHOT_CERTIFICATION_IDS', 'false').lower() == 'true'
+# 3・4次審査とMBTI型の採点を、同じ割合の組（プロファイル）ごとに共有するか（既定は社員ごとに採点）
+# 表引きの採点は安いため、共有で速くなるのは割合の種類が社員数よりずっと少ない大きな社員集合だけ
+MBTI_PROFILES = os.environ.get('MBTI_PROFILES', 'false').lower() == 'true'
+# MBTI割合のプロファイルをウォームコンテナ内で保持する上限数（採点の種類ごとのLRU）
+MBTI_PROFILE_MAX_ENTRIES = int(os.environ.get('MBTI_PROFILE_MAX_ENTRIES', '65536'))
+# 候補者リストのページ分割で、2ページ目以降のために順位付け済みリストを保持する件数と秒数
+RANKED_CACHE_MAX_ENTRIES = int(os.environ.get('RANKED_CACHE_MAX_ENTRIES', '128'))
+RANKED_CACHE_TTL = float(os.environ.get('RANKED_CACHE_TTL', '900'))
+# データのバージョンから作るETagを応答に付け、一致するIf-None-Matchには審査せずnot_modifiedを返すか
+RESPONSE_ETAGS = os.environ.get('RESPONSE_ETAGS', 'true').lower() == 'true'
+# 審査パイプライン: 'batch'（全件取得後にrole別審査）/ 'streaming'（ページ到着ごとに0～3次審査、上位のみ保持）
+RANKING_PIPELINE = os.environ.get('RANKING_PIPELINE', 'batch')
+# batchパイプラインの審査エンジン: 'loop'（社員dictごとの判定）/ 'numpy'（role単位の列をベクトル演算で審査）
+RANKING_ENGINE = os.environ.get('RANKING_ENGINE', 'loop')
+# ループ版エンジンの0～2次審査: 'fused'（登録された審査を選択性順に1名ずつ融合評価）/ 'staged'（審査ごとにリスト作成）
+SCREENING_EVALUATOR = os.environ.get('SCREENING_EVALUATOR', 'fused')
+if RANKING_ENGINE == 'numpy' and np is None:
+    logger.warning("RANKING_ENGINE=numpy ですがNumPyが見つからないため、ループ版エンジンを使います")
 
 # MBTI相性表
 MBTI_RELATIONS = {
@@ -48,179 +145,1736 @@ def decimal_to_float(obj):
         return obj
 
 
-class DatabaseManager:
-    """DynamoDB操作を管理するクラス"""
+def float_to_decimal(obj):
+    """書き込み用に数値をDynamoDBのDecimalに変換"""
+    if isinstance(obj, list):
+        return [float_to_decimal(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: float_to_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        return Decimal(str(obj))
+    else:
+        return obj
+
+
+def native_number(text):
+    """JSONの小数表記をdecimal_to_floatと同じ数値に変換（整数値はint）"""
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def deserialize_attribute(value):
+    """DynamoDB Streamsの型付き属性値（{'S': ...}、{'N': ...}等）を通常の値に変換"""
+    (kind, data), = value.items()
+    if kind == 'N':
+        return native_number(data)
+    elif kind == 'NULL':
+        return None
+    elif kind == 'M':
+        return {k: deserialize_attribute(v) for k, v in data.items()}
+    elif kind == 'L':
+        return [deserialize_attribute(v) for v in data]
+    elif kind == 'NS':
+        return [native_number(v) for v in data]
+    elif kind in ('S', 'B', 'BOOL', 'SS', 'BS'):
+        return data
+    raise ValueError(f"Unsupported attribute type: {kind}")
+
+
+def deserialize_image(image):
+    """ストリームレコードのKeys/NewImage/OldImageを社員dictに変換"""
+    return {k: deserialize_attribute(v) for k, v in (image or {}).items()}
+
+
+def approximate_size(obj):
+    """dict/listを再帰的にたどった概算メモリサイズ（バイト）"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(approximate_size(i) for i in obj)
+    return size
+
+
+class EmployeeSnapshotCache:
+    """ウォームコンテナで使い回す社員スナップショット（Decimal変換済み）のキャッシュ
+    
+    エントリはTTLを超えるか、テーブルのバージョンが変わると無効になる。
+    合計の概算サイズが上限を超えたら古いエントリから追い出す。
+    キャッシュした社員dictは共有されるため、呼び出し側で変更しないこと。
+    """
+    
+    SIZE_SAMPLE = 50
+
+    def __init__(self, ttl_seconds, max_bytes):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, version=None):
+        """有効なスナップショットを返す（なければNone）"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expired = time.monotonic() - entry['loaded_at'] > self.ttl_seconds
+            stale = version is not None and entry['version'] != version
+            if expired or stale:
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry['employees']
+
+    def put(self, key, employees, version=None):
+        """スナップショットを登録し、上限を超えた分を古い順に追い出す"""
+        sample = employees[:self.SIZE_SAMPLE]
+        per_item = sum(approximate_size(e) for e in sample) / len(sample) if sample else 0
+        size = int(per_item * len(employees)) + sys.getsizeof(employees)
+        
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                logger.warning(f"社員スナップショット({size / 1e6:.1f}MB)が上限を超えるためキャッシュしない")
+                return
+            while self.entries and self.total_bytes + size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+            self.entries[key] = {
+                'employees': employees,
+                'version': version,
+                'loaded_at': time.monotonic(),
+                'size': size,
+            }
+            self.total_bytes += size
+
+    def invalidate(self, key=None):
+        """指定キー（省略時は全エントリ）を破棄"""
+        with self.lock:
+            for k in ([key] if key is not None else list(self.entries)):
+                if k in self.entries:
+                    self._remove(k)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry['size']
+
+
+employee_snapshot_cache = EmployeeSnapshotCache(EMPLOYEE_CACHE_TTL, EMPLOYEE_CACHE_MAX_MB * 1024 * 1024)
+
+
+class EmployeeLevelCache:
+    """社員レベルのウォームコンテナ内キャッシュ
+    
+    社員IDごとに、レベルの算出に使う属性（資格・勤続年数・経験）の複製と算出結果を保持する。
+    社員の属性が変わっていれば内容が一致しないので再計算する。変更イベントでも該当社員を破棄する。
+    ヒット時は属性をそのまま比較するだけにし（タプル化・ロック・LRUの並べ替えをしない）、
+    上限を超えたら古く登録したものから破棄する。登録だけをロックで守る。
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def level(self, employee, compute):
+        """キャッシュ済みのレベル（なければcompute(employee)で算出して保持）"""
+        employee_id = employee.get('employee_id')
+        if employee_id is None or self.max_entries <= 0:
+            return compute(employee)
+        
+        get = employee.get
+        certifications = get('certifications', [])
+        tenure = get('勤続年数', 0)
+        experience = get('経験', {})
+        entry = self.entries.get(employee_id)
+        if entry is not None and entry[1] == tenure and entry[0] == certifications and entry[2] == experience:
+            return entry[3]
+        
+        level = compute(employee)
+        # 社員dictが後から書き換えられても比較が狂わないよう複製して保持する
+        entry = (copy.copy(certifications), tenure, copy.copy(experience), level)
+        with self.lock:
+            self.entries.pop(employee_id, None)
+            self.entries[employee_id] = entry
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+        return level
+
+    def invalidate(self, employee_id=None):
+        with self.lock:
+            if employee_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(employee_id, None)
+
+
+employee_level_cache = EmployeeLevelCache(LEVEL_CACHE_MAX_ENTRIES)
+
+
+class CertificationRegistry:
+    """資格名を加点区分に一度だけ分類し、以降は資格ID（登録順の連番）の表引きで加点を返す登録簿
+    
+    資格名の種類は少なく変わりにくいので、キーワードによる分類は初出の資格名だけ行う。
+    IDはプロセス内で変わらない（登録を破棄しない）ので、列の添字としてそのまま使える。
+    """
+    
+    # 加点区分（上から順に、資格名にキーワードを1つでも含む最初の区分。どれにも当たらなければDEFAULT_POINTS）
+    TIERS = (
+        (0.2, ('AWS', 'Google', 'Azure', 'GCP')),
+        (0.15, ('スペシャリスト', '高度', 'Expert', 'Professional')),
+        (0.1, ('応用', '基本', '情報', '検定', '認定')),
+    )
+    DEFAULT_POINTS = 0.05
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.points = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def classify(name):
+        """資格名の加点区分を判定"""
+        for points, keywords in CertificationRegistry.TIERS:
+            if any(keyword in name for keyword in keywords):
+                return points
+        return CertificationRegistry.DEFAULT_POINTS
+
+    def intern(self, name):
+        """資格名のID（初出なら分類して登録）"""
+        cert_id = self.ids.get(name)
+        if cert_id is None:
+            points = self.classify(name)
+            with self.lock:
+                cert_id = self.ids.get(name)
+                if cert_id is None:
+                    cert_id = len(self.names)
+                    self.names.append(name)
+                    self.points.append(points)
+                    self.ids[name] = cert_id
+        return cert_id
+
+    def points_of(self, name):
+        """資格1件の加点"""
+        cert_id = self.ids.get(name)
+        if cert_id is None:
+            cert_id = self.intern(name)
+        return self.points[cert_id]
+
+    def score(self, certifications):
+        """資格スコア（基礎点0.3、最大3つまで加点、上限1.0）"""
+        cert_score = 0.3
+        for cert in certifications[:3]:
+            cert_score += self.points_of(cert)
+        return min(cert_score, 1.0)
+
+    def stats(self):
+        return {'certifications': len(self.names)}
+
+
+certification_registry = CertificationRegistry()
+
+
+class RankedCandidateCache:
+    """ページ分割した候補者リストの順位付け済み社員を保持し、カーソルで続きを引けるようにする
+    
+    カーソルはエントリIDとオフセットに、プロジェクトID・role・ページサイズを添えて包んだ不透明な文字列。
+    エントリは最近使われていない順に上限件数まで、またTTLを過ぎると破棄される。エントリはコンテナごとの
+    メモリにあるため、別のコンテナや破棄後に届いたカーソルはプロジェクトIDから審査し直して引き継ぐ。
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def put(self, role, required_count, employees, page_size, project_id=None):
+        """最終候補者（並べ替え前）を登録してエントリIDを返す"""
+        entry_id = uuid.uuid4().hex
+        with self.lock:
+            self.entries[entry_id] = {
+                'project_id': project_id,
+                'role': role,
+                'required_count': required_count,
+                'employees': employees,
+                'ranked': False,
+                'page_size': page_size,
+                'loaded_at': time.monotonic(),
+            }
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry_id
+
+    def get(self, entry_id):
+        with self.lock:
+            entry = self.entries.get(entry_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry['loaded_at'] > self.ttl_seconds:
+                del self.entries[entry_id]
+                return None
+            self.entries.move_to_end(entry_id)
+            return entry
+
+    @staticmethod
+    def final_score(emp):
+        return emp.get('final_score', 0)
+
+    def ranked_employees(self, entry):
+        """エントリの社員を順位順で返す（最初に続きのページが求められたときに1回だけ並べ替える）"""
+        with self.lock:
+            if not entry['ranked']:
+                entry['employees'] = sorted(entry['employees'], key=self.final_score, reverse=True)
+                entry['ranked'] = True
+            return entry['employees']
+
+    @staticmethod
+    def encode_cursor(entry_id, offset, project_id, role, page_size):
+        raw = json.dumps({
+            'id': entry_id,
+            'offset': offset,
+            'project_id': project_id,
+            'role': role,
+            'page_size': page_size,
+        }, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """{'id', 'offset', 'project_id', 'role', 'page_size'}。壊れたカーソル・負のオフセットならNone"""
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            result = {
+                'id': str(decoded['id']),
+                'offset': int(decoded['offset']),
+                'project_id': decoded.get('project_id'),
+                'role': decoded.get('role'),
+                'page_size': int(decoded['page_size']) if decoded.get('page_size') is not None else None,
+            }
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        if result['offset'] < 0 or (result['page_size'] is not None and result['page_size'] <= 0):
+            return None
+        return result
+
+
+ranked_candidate_cache = RankedCandidateCache(RANKED_CACHE_MAX_ENTRIES, RANKED_CACHE_TTL)
+
+
+def get_dynamodb():
+    """DynamoDBリソースを初回利用時に生成（ローカルバックエンドではboto3を読み込まない）"""
+    global dynamodb
+    if dynamodb is None:
+        import boto3
+        dynamodb = boto3.resource('dynamodb')
+    return dynamodb
+
+
+class EmployeeRepository:
+    """社員・プロジェクトデータ取得のインターフェース
+    
+    filter_predicateはPredicateCompilerの条件木、projectionは属性パス（タプル）のリスト。
+    返す社員dictはバックエンド内で共有されることがあるため、呼び出し側で変更しないこと。
+    """
+
+    def fetch_employees(self, filter_predicate=None, projection=None, segments=None):
+        """社員を全件取得（条件・射影はストレージ側で適用）"""
+        raise NotImplementedError
+
+    def fetch_employees_by_roles(self, roles, filter_predicates=None, projections=None):
+        """role別に社員を取得（filter_predicates/projectionsはrole別、{role: 社員リスト}）"""
+        raise NotImplementedError
+
+    def batch_get_employees(self, employee_ids, attributes=None):
+        """社員IDからまとめて取得（{employee_id: 社員}、存在しないIDは含まない）"""
+        raise NotImplementedError
+
+    def fetch_project(self, project_id):
+        """プロジェクトレコードを取得（存在しなければ空dict）"""
+        raise NotImplementedError
+
+    def fetch_employees_version(self):
+        """社員データのバージョン（不明ならNone）"""
+        return None
+
+    def put_employee_features(self, features_by_id):
+        """社員ごとの審査用特徴（EmployeeFeatures.compute）を保存"""
+        raise NotImplementedError
+
+    def iter_employee_pages(self, filter_predicate=None, projection=None, segments=None):
+        """社員をページ単位で順に返す（既定は全件を1ページとして返す）"""
+        yield self.fetch_employees(filter_predicate, projection, segments)
+
+    def iter_employee_pages_by_roles(self, roles, filter_predicates=None, projections=None):
+        """募集roleの社員をページ単位で返す（既定はrole単位で1ページ）"""
+        for employees in self.fetch_employees_by_roles(roles, filter_predicates, projections).values():
+            yield employees
+
+
+def iter_concurrent_pages(producers, max_workers):
+    """複数のページ生成関数をスレッドで並行実行し、届いた順にページを返す
+    
+    受け渡しのキューはスレッド数の2倍までに抑え、消費側が遅ければ生成側が待つ（保持するページ数は
+    社員数によらない）。消費側で例外が起きたり途中で止めたりしたら、生成側は次のページの前に終わる。
+    """
+    workers = max(1, min(len(producers), max_workers))
+    pages = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    finished = object()
+    
+    def put(item):
+        # 満杯のキューで待ち続けないよう、停止の指示を確かめながら入れる
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def run(producer):
+        try:
+            for page in producer():
+                if not put(page):
+                    return
+            put(finished)
+        except Exception as e:
+            put(e)
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for producer in producers:
+                executor.submit(run, producer)
+            remaining = len(producers)
+            while remaining:
+                page = pages.get()
+                if page is finished:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            stop.set()
+
+
+class DynamoDBRepository(EmployeeRepository):
+    """DynamoDBバックエンド
     
+    読み取った項目はページ・レスポンス単位でここで一度だけネイティブ数値（int/float）に
+    変換し、以降の審査ではDecimalを扱わない。
+    """
+
     @staticmethod
-    def fetch_employees_from_dynamodb():
-        """全社員データを取得"""
+    def read_options(filter_predicate=None, projection=None):
+        """scan/query用のFilterExpression・ProjectionExpressionと属性プレースホルダーを生成"""
+        options = {}
+        if filter_predicate:
+            options = PredicateCompiler.to_dynamodb(filter_predicate)
+        if projection:
+            names = options.setdefault('ExpressionAttributeNames', {})
+            placeholders = {}
+            expressions = []
+            for path in projection:
+                parts = []
+                for part in path:
+                    if part not in placeholders:
+                        placeholders[part] = f"#p{len(placeholders)}"
+                        names[placeholders[part]] = part
+                    parts.append(placeholders[part])
+                expressions.append('.'.join(parts))
+            options['ProjectionExpression'] = ', '.join(expressions)
+        return options
+
+    def iter_segment_pages(self, segment=None, total_segments=None, scan_options=None):
+        """1セグメント分のページをLastEvaluatedKeyに沿って順に返す"""
+        table = get_dynamodb().Table(EMPLOYEES_TABLE)
+        scan_kwargs = dict(scan_options or {})
+        if total_segments and total_segments > 1:
+            scan_kwargs.update({'Segment': segment, 'TotalSegments': total_segments})
+        
+        response = table.scan(**scan_kwargs)
+        yield decimal_to_float(response.get('Items', []))
+        while 'LastEvaluatedKey' in response:
+            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **scan_kwargs)
+            yield decimal_to_float(response.get('Items', []))
+
+    def scan_segment(self, segment=None, total_segments=None, scan_options=None):
+        """1セグメント分の全ページを取得"""
+        items = []
+        for page in self.iter_segment_pages(segment, total_segments, scan_options):
+            items.extend(page)
+        return items
+
+    def fetch_employees(self, filter_predicate=None, projection=None, segments=None):
+        """全社員をスキャン（segments>1でセグメント並列スキャン）"""
         try:
-            table = dynamodb.Table(EMPLOYEES_TABLE)
-            response = table.scan()
-            employees = response.get('Items', [])
-            while 'LastEvaluatedKey' in response:
-                response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-                employees.extend(response.get('Items', []))
-            logger.info(f"Fetched {len(employees)} employees")
+            segments = int(segments or EMPLOYEES_SCAN_SEGMENTS)
+            scan_options = self.read_options(filter_predicate, projection)
+            if segments <= 1:
+                employees = self.scan_segment(scan_options=scan_options)
+            else:
+                # セグメントごとに並列スキャンし、セグメント順に結合（結果順序を安定させる）
+                workers = max(1, min(segments, SCAN_MAX_WORKERS))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(self.scan_segment, segment, segments, scan_options)
+                        for segment in range(segments)
+                    ]
+                    employees = []
+                    for future in futures:
+                        employees.extend(future.result())
+            logger.info(f"Fetched {len(employees)} employees (segments={segments})")
             return employees
         except Exception as e:
             logger.error(f"Error fetching employees: {str(e)}")
             raise
 
-    @staticmethod
-    def fetch_project_from_dynamodb(project_id):
-        """プロジェクトデータを取得"""
+    def iter_employee_pages(self, filter_predicate=None, projection=None, segments=None):
+        """スキャン結果をページ到着順に返す（segments>1では各セグメントのページが混在する）"""
+        segments = int(segments or EMPLOYEES_SCAN_SEGMENTS)
+        scan_options = self.read_options(filter_predicate, projection)
+        if segments <= 1:
+            yield from self.iter_segment_pages(scan_options=scan_options)
+            return
+        producers = [
+            functools.partial(self.iter_segment_pages, segment, segments, scan_options)
+            for segment in range(segments)
+        ]
+        yield from iter_concurrent_pages(producers, SCAN_MAX_WORKERS)
+
+    def iter_role_pages(self, role, filter_predicate=None, projection=None):
+        """roleインデックスへのクエリ結果をページ単位で返す"""
+        table = get_dynamodb().Table(EMPLOYEES_TABLE)
+        query_kwargs = self.read_options(filter_predicate, projection)
+        query_kwargs['IndexName'] = EMPLOYEES_ROLE_INDEX
+        query_kwargs['KeyConditionExpression'] = '#role = :role'
+        query_kwargs.setdefault('ExpressionAttributeNames', {})['#role'] = 'role'
+        query_kwargs.setdefault('ExpressionAttributeValues', {})[':role'] = role
+        
+        response = table.query(**query_kwargs)
+        yield decimal_to_float(response.get('Items', []))
+        while 'LastEvaluatedKey' in response:
+            response = table.query(ExclusiveStartKey=response['LastEvaluatedKey'], **query_kwargs)
+            yield decimal_to_float(response.get('Items', []))
+
+    def query_employees_by_role(self, role, filter_predicate=None, projection=None):
+        """roleインデックスから1role分の社員を取得"""
+        items = []
+        for page in self.iter_role_pages(role, filter_predicate, projection):
+            items.extend(page)
+        return items
+
+    def fetch_employees_by_roles(self, roles, filter_predicates=None, projections=None):
+        """募集roleの社員だけをrole別の並列クエリで取得"""
         try:
-            table = dynamodb.Table(PROJECTS_TABLE)
-            response = table.get_item(Key={'project_id': project_id})
-            project_data = response.get('Item', {})
-            
-            # リーダーとサブリーダーのMBTI情報を取得
-            if project_data:
-                leader_id = project_data.get('leader')
-                sub_leader_id = project_data.get('sub_leader')
-                
-                # 社員テーブルからMBTI情報を取得
-                emp_table = dynamodb.Table(EMPLOYEES_TABLE)
-                
-                if leader_id:
-                    leader_resp = emp_table.get_item(Key={'employee_id': leader_id})
-                    leader_emp = leader_resp.get('Item', {})
-                    project_data['leader_mbti'] = {
-                        'percentages': leader_emp.get('mbti_percentages', {})
-                    }
-                
-                if sub_leader_id:
-                    sub_leader_resp = emp_table.get_item(Key={'employee_id': sub_leader_id})
-                    sub_leader_emp = sub_leader_resp.get('Item', {})
-                    project_data['sub_leader_mbti'] = {
-                        'percentages': sub_leader_emp.get('mbti_percentages', {})
-                    }
+            roles = list(roles)
+            filter_predicates = filter_predicates or {}
+            projections = projections or {}
+            workers = max(1, min(len(roles), SCAN_MAX_WORKERS))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    role: executor.submit(self.query_employees_by_role,
+                                          role, filter_predicates.get(role), projections.get(role))
+                    for role in roles
+                }
+                grouped = {role: future.result() for role, future in futures.items()}
+            logger.info(f"Fetched {sum(len(v) for v in grouped.values())} employees "
+                        f"for {len(roles)} roles via {EMPLOYEES_ROLE_INDEX}")
+            return grouped
+        except Exception as e:
+            logger.error(f"Error querying employees by role: {str(e)}")
+            raise
+
+    def iter_employee_pages_by_roles(self, roles, filter_predicates=None, projections=None):
+        """role別クエリを並行実行し、ページ到着順に返す"""
+        filter_predicates = filter_predicates or {}
+        projections = projections or {}
+        producers = [
+            functools.partial(self.iter_role_pages, role, filter_predicates.get(role), projections.get(role))
+            for role in roles
+        ]
+        yield from iter_concurrent_pages(producers, SCAN_MAX_WORKERS)
+
+    def batch_get_employees(self, employee_ids, attributes=None):
+        """batch_get_itemでまとめて取得（attributesで射影、未処理キーは再試行）"""
+        try:
+            unique_ids = list(dict.fromkeys(i for i in employee_ids if i is not None))
+            request_options = {}
+            if attributes:
+                request_options = self.read_options(
+                    projection=[('employee_id',)] + [(a,) for a in attributes if a != 'employee_id'])
             
-            return project_data
+            employees = {}
+            for start in range(0, len(unique_ids), BATCH_GET_LIMIT):
+                keys = [{'employee_id': i} for i in unique_ids[start:start + BATCH_GET_LIMIT]]
+                request = {EMPLOYEES_TABLE: dict(request_options, Keys=keys)}
+                attempt = 0
+                while request:
+                    response = get_dynamodb().batch_get_item(RequestItems=request)
+                    for item in decimal_to_float(response.get('Responses', {}).get(EMPLOYEES_TABLE, [])):
+                        employees[item.get('employee_id')] = item
+                    request = response.get('UnprocessedKeys') or {}
+                    if request:
+                        attempt += 1
+                        time.sleep(min(0.05 * (2 ** attempt), 1.0))
+            return employees
         except Exception as e:
-            logger.error(f"Error fetching project: {str(e)}")
+            logger.error(f"Error batch fetching employees: {str(e)}")
             raise
 
+    def fetch_project(self, project_id):
+        table = get_dynamodb().Table(PROJECTS_TABLE)
+        response = table.get_item(Key={'project_id': project_id})
+        return decimal_to_float(response.get('Item', {}))
+
+    def put_employee_features(self, features_by_id):
+        """features属性だけを社員ごとに更新し、メタテーブルのバージョンを進める"""
+        table = get_dynamodb().Table(EMPLOYEES_TABLE)
+        
+        def update(employee_id, features):
+            table.update_item(
+                Key={'employee_id': employee_id},
+                UpdateExpression='SET #features = :features',
+                ExpressionAttributeNames={'#features': EmployeeFeatures.ATTRIBUTE},
+                ExpressionAttributeValues={':features': float_to_decimal(features)},
+            )
+        
+        try:
+            workers = max(1, min(len(features_by_id), SCAN_MAX_WORKERS))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(update, employee_id, features)
+                           for employee_id, features in features_by_id.items()]
+                for future in futures:
+                    future.result()
+            self.bump_employees_version()
+        except Exception as e:
+            logger.error(f"Error writing employee features: {str(e)}")
+            raise
+
+    def bump_employees_version(self):
+        """書き込み側としてメタテーブルのバージョンを1進める（未設定なら何もしない）"""
+        if not EMPLOYEES_META_TABLE:
+            return
+        get_dynamodb().Table(EMPLOYEES_META_TABLE).update_item(
+            Key={'meta_key': EMPLOYEES_VERSION_KEY},
+            UpdateExpression='ADD #version :one',
+            ExpressionAttributeNames={'#version': 'version'},
+            ExpressionAttributeValues={':one': Decimal(1)},
+        )
+
+    def fetch_employees_version(self):
+        """メタテーブルのバージョン項目（未設定・取得失敗時はNone）"""
+        if not EMPLOYEES_META_TABLE:
+            return None
+        try:
+            response = get_dynamodb().Table(EMPLOYEES_META_TABLE).get_item(
+                Key={'meta_key': EMPLOYEES_VERSION_KEY})
+            version = response.get('Item', {}).get('version')
+            return decimal_to_float(version) if version is not None else None
+        except Exception as e:
+            logger.warning(f"Error fetching employees version: {str(e)}")
+            return None
+
+
+class LocalFileRepository(EmployeeRepository):
+    """JSONLファイルを読むローカルバックエンド
+    
+    data_dir/employees.jsonl・projects.jsonl を1行1レコードとして読み、DynamoDBRepositoryと同じく
+    数値はint/floatで返す。条件・射影もDynamoDBと同じ意味で適用する。
+    読み込んだレコードと索引（ID・role別）はファイルが更新されるまで使い回す。
+    """
+    
+    EMPLOYEES_FILE = 'employees.jsonl'
+    PROJECTS_FILE = 'projects.jsonl'
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def _table(self, filename, key):
+        """JSONLを読み込み、{'items', 'by_key', 'by_role', 'mtime'}を返す"""
+        path = os.path.join(self.data_dir, filename)
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        with self.lock:
+            table = self.tables.get(filename)
+            if table is not None and table['mtime'] == mtime:
+                return table
+            
+            items = []
+            if mtime is not None:
+                with open(path, encoding='utf-8') as f:
+                    items = [json.loads(line, parse_float=native_number)
+                             for line in f if line.strip()]
+            table = {
+                'mtime': mtime,
+                'items': items,
+                'by_key': {item.get(key): item for item in items},
+                'by_role': DatabaseManager.group_employees_by_role(items),
+            }
+            self.tables[filename] = table
+            logger.info(f"Loaded {len(items)} records from {path}")
+            return table
+
     @staticmethod
-    def group_employees_by_role(employees):
-        """社員をロール別にグループ化"""
-        grouped = {}
-        for emp in employees:
-            role = emp.get('role', 'Unknown')
-            if role not in grouped:
-                grouped[role] = []
-            grouped[role].append(emp)
-        return grouped
+    def project_item(item, projection):
+        """ProjectionExpressionと同じく、存在する指定パスだけを残したdictを作る"""
+        projected = {}
+        for path in projection:
+            value = item
+            for part in path:
+                if not isinstance(value, dict) or part not in value:
+                    break
+                value = value[part]
+            else:
+                target = projected
+                for part in path[:-1]:
+                    target = target.setdefault(part, {})
+                target[path[-1]] = value
+        return projected
 
+    def _select(self, items, filter_predicate=None, projection=None):
+        if filter_predicate:
+            match = PredicateCompiler.to_local(filter_predicate)
+            items = [item for item in items if match(item)]
+        if projection:
+            items = [self.project_item(item, projection) for item in items]
+        return list(items)
 
-class RankingEngine:
-    """ランキング処理を行うクラス"""
+    def fetch_employees(self, filter_predicate=None, projection=None, segments=None):
+        items = self._table(self.EMPLOYEES_FILE, 'employee_id')['items']
+        employees = self._select(items, filter_predicate, projection)
+        logger.info(f"Fetched {len(employees)} employees from {self.data_dir}")
+        return employees
+
+    def fetch_employees_by_roles(self, roles, filter_predicates=None, projections=None):
+        by_role = self._table(self.EMPLOYEES_FILE, 'employee_id')['by_role']
+        filter_predicates = filter_predicates or {}
+        projections = projections or {}
+        return {
+            role: self._select(by_role.get(role, []), filter_predicates.get(role), projections.get(role))
+            for role in roles
+        }
+
+    def iter_employee_pages(self, filter_predicate=None, projection=None, segments=None):
+        """LOCAL_PAGE_SIZE件ずつ条件・射影を適用して返す"""
+        items = self._table(self.EMPLOYEES_FILE, 'employee_id')['items']
+        for start in range(0, len(items), LOCAL_PAGE_SIZE):
+            yield self._select(items[start:start + LOCAL_PAGE_SIZE], filter_predicate, projection)
+
+    def iter_employee_pages_by_roles(self, roles, filter_predicates=None, projections=None):
+        by_role = self._table(self.EMPLOYEES_FILE, 'employee_id')['by_role']
+        filter_predicates = filter_predicates or {}
+        projections = projections or {}
+        for role in roles:
+            items = by_role.get(role, [])
+            for start in range(0, len(items), LOCAL_PAGE_SIZE):
+                yield self._select(items[start:start + LOCAL_PAGE_SIZE],
+                                   filter_predicates.get(role), projections.get(role))
+
+    def batch_get_employees(self, employee_ids, attributes=None):
+        by_key = self._table(self.EMPLOYEES_FILE, 'employee_id')['by_key']
+        projection = None
+        if attributes:
+            projection = [('employee_id',)] + [(a,) for a in attributes if a != 'employee_id']
+        found = [by_key[i] for i in dict.fromkeys(employee_ids) if i in by_key]
+        return {item.get('employee_id'): item for item in self._select(found, projection=projection)}
+
+    def fetch_project(self, project_id):
+        item = self._table(self.PROJECTS_FILE, 'project_id')['by_key'].get(project_id)
+        # 呼び出し側でリーダー情報を書き足すため複製して返す
+        return copy.deepcopy(item) if item else {}
+
+    def fetch_employees_version(self):
+        """employees.jsonlの更新時刻をバージョンとして使う"""
+        return self._table(self.EMPLOYEES_FILE, 'employee_id')['mtime']
+
+    def put_employee_features(self, features_by_id):
+        """employees.jsonlの該当社員にfeaturesを書き足して置き換える
+        
+        ファイルを読み直し、特徴の算出元（source）がファイル上のレコードの内容と一致する社員にだけ書き足す
+        （変更イベントの内容がまだファイルに反映されていなければ、その社員の特徴は書かない）。
+        """
+        with self.lock:
+            self.tables.pop(self.EMPLOYEES_FILE, None)
+        items = []
+        skipped = 0
+        for item in self._table(self.EMPLOYEES_FILE, 'employee_id')['items']:
+            features = features_by_id.get(item.get('employee_id'))
+            if features is not None and features.get('source') == EmployeeFeatures.source(item):
+                item = dict(item, **{EmployeeFeatures.ATTRIBUTE: features})
+            elif features is not None:
+                skipped += 1
+            items.append(item)
+        if skipped:
+            logger.warning(f"Skipped features for {skipped} employees whose records differ from the computed source")
+        self.write_jsonl(os.path.join(self.data_dir, self.EMPLOYEES_FILE), items)
+
+    @staticmethod
+    def write_jsonl(path, items):
+        """レコードをJSONLで書き出す（一時ファイル経由で置き換え）"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for item in items:
+                f.write(json.dumps(decimal_to_float(item), ensure_ascii=False) + '\n')
+        os.replace(tmp_path, path)
+
+
+def get_repository():
+    """STORAGE_BACKENDに応じたリポジトリ（ウォームコンテナでは使い回す）"""
+    global repository
+    if repository is None:
+        if STORAGE_BACKEND == 'local':
+            repository = LocalFileRepository(LOCAL_DATA_DIR)
+        else:
+            repository = DynamoDBRepository()
+    return repository
+
+
+class ResultCache:
+    """プロジェクトのチーム候補セットを、プロジェクトと社員データのバージョンの組で保存する永続キャッシュ
     
+    エントリはプロジェクトごとに1件で、バージョンが変わったエントリは次の書き込みで置き換わる。
+    RESULT_CACHE_TTLを過ぎたエントリは無効として扱う。
+    """
+
+    def get(self, project_id, versions):
+        """バージョンが一致し期限内の結果（なければNone）"""
+        raise NotImplementedError
+
+    def put(self, project_id, versions, result):
+        raise NotImplementedError
+
+    def delete(self, project_id):
+        raise NotImplementedError
+
     @staticmethod
-    def stage0_worktime_screening(employees, required_worktime):
-        """0次審査: 稼働時間"""
-        passed = []
-        required_worktime = float(required_worktime) if required_worktime is not None else 20.0
+    def is_valid(entry, versions):
+        return (entry is not None
+                and [entry.get('project_version'), entry.get('employees_version')] == list(versions)
+                and entry.get('expires_at', 0) > time.time())
+
+
+class DynamoDBResultCache(ResultCache):
+    """RESULT_CACHE_TABLE（キー: project_id）に保存（期限切れの削除はテーブルのTTL設定でexpires_atを指定）"""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    def get(self, project_id, versions):
+        response = get_dynamodb().Table(self.table_name).get_item(Key={'project_id': project_id})
+        entry = decimal_to_float(response.get('Item'))
+        if not self.is_valid(entry, versions):
+            return None
+        return json.loads(entry['result'])
+
+    def put(self, project_id, versions, result):
+        get_dynamodb().Table(self.table_name).put_item(Item={
+            'project_id': project_id,
+            'project_version': versions[0],
+            'employees_version': versions[1],
+            'result': json.dumps(result, ensure_ascii=False),
+            'expires_at': int(time.time() + RESULT_CACHE_TTL),
+        })
+
+    def delete(self, project_id):
+        get_dynamodb().Table(self.table_name).delete_item(Key={'project_id': project_id})
+
+
+class LocalFileResultCache(ResultCache):
+    """JSONファイルに保存するローカル版（期限切れを除いた上で、最近使われていない順に上限件数まで追い出す）"""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, entries):
+        now = time.time()
+        entries = {k: v for k, v in entries.items() if v.get('expires_at', 0) > now}
+        while len(entries) > self.max_entries:
+            del entries[min(entries, key=lambda k: entries[k].get('used_at', 0))]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, project_id, versions):
+        with self.lock:
+            entries = self._load()
+            entry = entries.get(project_id)
+            if not self.is_valid(entry, versions):
+                return None
+            entry['used_at'] = time.time()
+            self._save(entries)
+            return entry['result']
+
+    def put(self, project_id, versions, result):
+        with self.lock:
+            entries = self._load()
+            now = time.time()
+            entries[project_id] = {
+                'project_version': versions[0],
+                'employees_version': versions[1],
+                'result': result,
+                'expires_at': now + RESULT_CACHE_TTL,
+                'used_at': now,
+            }
+            self._save(entries)
+
+    def delete(self, project_id):
+        with self.lock:
+            entries = self._load()
+            if entries.pop(project_id, None) is not None:
+                self._save(entries)
+
+
+def get_result_cache():
+    """設定された結果キャッシュ（無効ならNone）"""
+    global result_cache
+    if result_cache is None and RESULT_CACHE_TTL > 0:
+        if STORAGE_BACKEND == 'local' and RESULT_CACHE_PATH:
+            result_cache = LocalFileResultCache(RESULT_CACHE_PATH, RESULT_CACHE_MAX_ENTRIES)
+        elif STORAGE_BACKEND != 'local' and RESULT_CACHE_TABLE:
+            result_cache = DynamoDBResultCache(RESULT_CACHE_TABLE)
+    return result_cache
+
+
+class DatabaseManager:
+    """社員・プロジェクトデータの取得を管理するクラス（保存先はget_repository()で切替）"""
+    
+    @staticmethod
+    def scoring_projection(roles=None):
+        """審査に必要な属性パス（やる気は対象roleのキーだけ、roles未指定なら全体）"""
+        paths = [(attribute,) for attribute in SCORING_ATTRIBUTES]
+        if roles is None:
+            paths.append(('motivation_by_role',))
+        else:
+            paths.extend(('motivation_by_role', role) for role in roles)
+        return paths
+
+    @staticmethod
+    def fetch_employees(segments=None, filter_predicate=None, projection=None):
+        """全社員データを取得（filter_predicate/projectionはストレージ側で適用）"""
+        return get_repository().fetch_employees(filter_predicate, projection, segments)
+
+    @staticmethod
+    def fetch_employees_version():
+        """社員データのバージョン（不明ならNone）"""
+        return get_repository().fetch_employees_version()
+
+    @staticmethod
+    def project_version(project_data):
+        """プロジェクトレコードのバージョン（version属性、なければレコード内容のハッシュ）"""
+        if project_data.get('version') is not None:
+            return str(project_data['version'])
+        encoded = json.dumps(project_data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def fetch_versioned_project(project_id):
+        """((プロジェクトのバージョン, 社員データのバージョン), 取得したプロジェクトレコード)。分からなければ(None, None)
         
-        for emp in employees:
-            # Decimal型を確実にfloat型に変換
-            emp = decimal_to_float(emp)
-            available_time = emp.get('time', 0)
-            try:
-                available_time = max(0, float(available_time))
-            except:
-                available_time = 0.0
-            
-            if available_time >= required_worktime:
-                emp['stage0_passed'] = True
-                emp['stage0_details'] = {'available_time': available_time}
-                passed.append(emp)
+        社員データのバージョンが分からなければ（メタテーブルなしのDynamoDBなど）プロジェクトは取得しない。
+        取得したプロジェクトレコードは審査でそのまま使い、読み直さない。
+        """
+        employees_version = DatabaseManager.fetch_employees_version()
+        if employees_version is None:
+            return None, None
+        project_data = DatabaseManager.fetch_project_item(project_id)
+        if not project_data:
+            return None, None
+        return (DatabaseManager.project_version(project_data), str(employees_version)), project_data
+
+    @staticmethod
+    def data_etag(versions):
+        """データのバージョンの組から作るETag"""
+        digest = hashlib.sha1('\0'.join(versions).encode('utf-8')).hexdigest()[:20]
+        return f'"{digest}"'
+
+    @staticmethod
+    def load_employee_snapshot():
+        """全社員の審査用スナップショットをキャッシュ経由で取得"""
+        key = (STORAGE_BACKEND, EMPLOYEES_TABLE, EMPLOYEES_PROJECTION)
+        version = DatabaseManager.fetch_employees_version()
+        employees = employee_snapshot_cache.get(key, version)
+        if employees is not None:
+            logger.info(f"Employee snapshot cache hit: {len(employees)} employees (version={version})")
+            return employees
         
-        logger.info(f"【0次審査】{len(employees)}名 → {len(passed)}名")
-        return passed
+        projection = DatabaseManager.scoring_projection() if EMPLOYEES_PROJECTION else None
+        employees = DatabaseManager.fetch_employees(projection=projection)
+        employee_snapshot_cache.put(key, employees, version)
+        return employees
 
     @staticmethod
-    def stage1_motivation_screening(employees, target_role):
-        """1次審査: やる気"""
-        passed = []
-        THRESHOLD = 3
+    def select_employees_by_role(employees, roles, required_worktime=None):
+        """スナップショットから募集roleの社員を絞り込んでrole別に分ける"""
+        roles = list(roles)
+        if not roles:
+            return {}
+        if EMPLOYEES_FILTER_PUSHDOWN:
+            match = PredicateCompiler.to_local(PredicateCompiler.scan_predicate(required_worktime, roles))
+        else:
+            role_set = set(roles)
+            match = lambda emp: emp.get('role', 'Unknown') in role_set
+        return DatabaseManager.group_employees_by_role([emp for emp in employees if match(emp)])
+
+    @staticmethod
+    def export_employee_snapshot(path=None, employees_version=None):
+        """全社員の審査用属性を取得して列指向スナップショットファイルに書き出す
         
-        for emp in employees:
-            # Decimal型を確実にfloat型に変換
-            emp = decimal_to_float(emp)
-            motivation = emp.get('motivation_by_role', {}).get(target_role, 0)
+        社員データのバージョンは取得前の値を記録する（取得中に更新されても次回に書き出し直される）。
+        """
+        path = path or EMPLOYEE_SNAPSHOT_PATH
+        if employees_version is None:
+            employees_version = DatabaseManager.fetch_employees_version()
+        projection = DatabaseManager.scoring_projection() if EMPLOYEES_PROJECTION else None
+        EmployeeSnapshotFile.write(path, DatabaseManager.fetch_employees(projection=projection),
+                                   employees_version=employees_version)
+        return path
+
+    @staticmethod
+    def open_employee_snapshot(path=None):
+        """スナップショットファイルをmmapで開く（存在しないか古ければ書き出してから開く）"""
+        path = path or EMPLOYEE_SNAPSHOT_PATH
+        employees_version = DatabaseManager.fetch_employees_version()
+        if os.path.exists(path):
+            snapshot = EmployeeSnapshotFile.open_shared(path)
+            if not snapshot.is_stale(employees_version, EMPLOYEE_SNAPSHOT_TTL):
+                return snapshot
+            logger.info(f"Employee snapshot is stale (version={snapshot.directory.get('employees_version')}, "
+                        f"current={employees_version}), exporting to {path}")
             try:
-                motivation = max(0, min(5, float(motivation)))
-            except:
-                motivation = 0.0
-            
-            if motivation >= THRESHOLD:
-                emp['stage1_passed'] = True
-                emp['stage1_details'] = {'motivation_level': motivation}
-                passed.append(emp)
-        
-        logger.info(f"【1次審査】{len(employees)}名 → {len(passed)}名")
-        return passed
+                DatabaseManager.export_employee_snapshot(path, employees_version)
+            except OSError as e:
+                logger.warning(f"Failed to re-export employee snapshot, using the existing file: {str(e)}")
+                return snapshot
+        else:
+            logger.info(f"Employee snapshot not found, exporting to {path}")
+            DatabaseManager.export_employee_snapshot(path, employees_version)
+        return EmployeeSnapshotFile.open_shared(path)
 
     @staticmethod
-    def calculate_employee_level(employee, target_role):
-        """
-        改善版：一般的な社員が0.4～0.6になる計算式
-        """
+    def load_employees_by_role(roles, required_worktime=None):
+        """募集roleの社員をrole別に取得（EMPLOYEE_FETCH_MODEで取得方法を切替、roles=Noneで全role）"""
+        if roles is not None:
+            roles = list(roles)
+            if not roles:
+                return {}
         
-        # ===== 1. 資格スコア（40%）=====
-        cert_score = 0.3  # 基礎点：資格なしでも0.3
-        
-        certifications = employee.get('certifications', [])
-        cert_count = 0
-        
-        for cert in certifications[:3]:  # 最大3つまで評価
-            cert_count += 1
-            if any(keyword in cert for keyword in ['AWS', 'Google', 'Azure', 'GCP']):
-                cert_score += 0.2
-            elif any(keyword in cert for keyword in ['スペシャリスト', '高度', 'Expert', 'Professional']):
-                cert_score += 0.15
-            elif any(keyword in cert for keyword in ['応用', '基本', '情報', '検定', '認定']):
-                cert_score += 0.1
-            else:
-                cert_score += 0.05
+        if EMPLOYEE_FETCH_MODE == 'snapshot' and roles is not None:
+            # 必要なroleのパーティションだけを復元
+            snapshot = DatabaseManager.open_employee_snapshot()
+            employees = [emp for role in roles for emp in snapshot.role_employees(role)]
+            return DatabaseManager.select_employees_by_role(employees, roles, required_worktime)
         
-        cert_score = min(cert_score, 1.0)
+        if EMPLOYEE_FETCH_MODE == 'index' and roles is not None:
+            store = get_role_index_store()
+            employees = [emp for role in roles for emp in store.role_employees(role)]
+            return DatabaseManager.select_employees_by_role(employees, roles, required_worktime)
         
-        # ===== 2. 勤続年数スコア（30%）=====
-        tenure = employee.get('勤続年数', 0)
-        try:
-            tenure = float(tenure)
-        except (ValueError, TypeError):
+        if EMPLOYEE_CACHE_TTL > 0 and roles is not None:
+            return DatabaseManager.select_employees_by_role(
+                DatabaseManager.load_employee_snapshot(), roles, required_worktime)
+        
+        if EMPLOYEE_FETCH_MODE == 'role_query' and roles is not None:
+            filter_predicates, projections = DatabaseManager.role_query_options(roles, required_worktime)
+            grouped = get_repository().fetch_employees_by_roles(roles, filter_predicates, projections)
+            # 該当者のいないroleはスキャン時と同様にキー自体を持たない
+            return {role: employees for role, employees in grouped.items() if employees}
+        
+        filter_predicate, projection = DatabaseManager.scan_options(roles, required_worktime)
+        all_employees = DatabaseManager.fetch_employees(
+            filter_predicate=filter_predicate, projection=projection)
+        return DatabaseManager.group_employees_by_role(all_employees)
+
+    @staticmethod
+    def role_query_options(roles, required_worktime=None):
+        """role別クエリの絞り込み条件と射影（設定で無効ならNone）"""
+        filter_predicates, projections = None, None
+        if EMPLOYEES_FILTER_PUSHDOWN:
+            filter_predicates = {
+                role: PredicateCompiler.screening_predicate(required_worktime, role)
+                for role in roles
+            }
+        if EMPLOYEES_PROJECTION:
+            projections = {role: DatabaseManager.scoring_projection([role]) for role in roles}
+        return filter_predicates, projections
+
+    @staticmethod
+    def scan_options(roles, required_worktime=None):
+        """全件スキャンの絞り込み条件と射影（設定で無効ならNone）"""
+        filter_predicate, projection = None, None
+        if EMPLOYEES_FILTER_PUSHDOWN and roles is not None:
+            filter_predicate = PredicateCompiler.scan_predicate(required_worktime, roles)
+        if EMPLOYEES_PROJECTION:
+            projection = DatabaseManager.scoring_projection(roles)
+        return filter_predicate, projection
+
+    @staticmethod
+    def iter_employee_pages_by_role(roles, required_worktime=None):
+        """募集roleの社員をページ単位で順に返す（他roleの社員が混ざることがある）
+        
+        スナップショット・キャッシュ利用時は既にメモリ上にあるため、role別のリストを1ページとして返す。
+        """
+        roles = list(roles)
+        if not roles:
+            return
+        if EMPLOYEE_FETCH_MODE in ('snapshot', 'index') or EMPLOYEE_CACHE_TTL > 0:
+            yield from DatabaseManager.load_employees_by_role(roles, required_worktime).values()
+        elif EMPLOYEE_FETCH_MODE == 'role_query':
+            filter_predicates, projections = DatabaseManager.role_query_options(roles, required_worktime)
+            yield from get_repository().iter_employee_pages_by_roles(roles, filter_predicates, projections)
+        else:
+            filter_predicate, projection = DatabaseManager.scan_options(roles, required_worktime)
+            yield from get_repository().iter_employee_pages(filter_predicate, projection)
+
+    @staticmethod
+    def batch_get_employees(employee_ids, attributes=None):
+        """社員をIDでまとめて取得（attributesで射影）"""
+        return get_repository().batch_get_employees(employee_ids, attributes)
+
+    @staticmethod
+    def hydrate_candidates(role_results):
+        """氏名を持たない最終候補者の表示用属性を後から一括取得して埋める"""
+        candidates = [
+            candidate
+            for role_result in role_results.values()
+            for candidate in role_result.get('candidates', [])
+            if candidate.get('employee_name') is None
+        ]
+        if not candidates:
+            return
+        
+        employees = DatabaseManager.batch_get_employees(
+            [c.get('employee_id') for c in candidates], DISPLAY_ATTRIBUTES)
+        for candidate in candidates:
+            employee = employees.get(candidate.get('employee_id'), {})
+            candidate['employee_name'] = employee.get('name')
+
+    @staticmethod
+    def fetch_project_item(project_id):
+        """プロジェクトレコードのみを取得"""
+        return get_repository().fetch_project(project_id)
+
+    @staticmethod
+    def attach_leader_mbti(project_data):
+        """リーダーとサブリーダーのMBTI情報を1回のbatch_get_itemで取得して付与"""
+        leader_id = project_data.get('leader')
+        sub_leader_id = project_data.get('sub_leader')
+        if not leader_id and not sub_leader_id:
+            return project_data
+        
+        # 社員テーブルからMBTI情報を取得
+        leaders = DatabaseManager.batch_get_employees([leader_id, sub_leader_id], ('mbti_percentages',))
+        if leader_id:
+            project_data['leader_mbti'] = {
+                'percentages': leaders.get(leader_id, {}).get('mbti_percentages', {})
+            }
+        if sub_leader_id:
+            project_data['sub_leader_mbti'] = {
+                'percentages': leaders.get(sub_leader_id, {}).get('mbti_percentages', {})
+            }
+        return project_data
+
+    @staticmethod
+    def fetch_project(project_id, project_item=None):
+        """プロジェクトデータを取得（project_item指定時は取得済みのレコードを使う）"""
+        try:
+            project_data = project_item if project_item is not None else DatabaseManager.fetch_project_item(project_id)
+            
+            # リーダーとサブリーダーのMBTI情報を取得
+            if project_data:
+                DatabaseManager.attach_leader_mbti(project_data)
+            
+            return project_data
+        except Exception as e:
+            logger.error(f"Error fetching project: {str(e)}")
+            raise
+
+    @staticmethod
+    def fetch_project_and_employees(project_id, project_item=None):
+        """プロジェクト・リーダーMBTI・募集roleの社員を並行取得
+        
+        社員の取得条件がプロジェクトに依存しない場合（スナップショットキャッシュ利用時、
+        または全件スキャンかつ絞り込みなし）は
+        プロジェクト取得と同時にスキャンを開始し、それ以外はプロジェクト取得直後に
+        リーダー取得と並行して開始する。project_item指定時はプロジェクトを取得し直さない。
+        """
+        try:
+            use_snapshot = EMPLOYEE_CACHE_TTL > 0 and EMPLOYEE_FETCH_MODE not in ('snapshot', 'index')
+            speculative = EMPLOYEE_FETCH_MODE == 'scan' and not EMPLOYEES_FILTER_PUSHDOWN
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                project_future = None
+                if project_item is None:
+                    project_future = executor.submit(DatabaseManager.fetch_project_item, project_id)
+                employees_future = None
+                if use_snapshot:
+                    employees_future = executor.submit(DatabaseManager.load_employee_snapshot)
+                elif speculative:
+                    employees_future = executor.submit(DatabaseManager.load_employees_by_role, None)
+                
+                project_data = project_future.result() if project_future is not None else project_item
+                if not project_data:
+                    return {}, {}
+                
+                recruiting_roles = project_data.get('recruiting_roles', {})
+                leaders_future = executor.submit(DatabaseManager.attach_leader_mbti, project_data)
+                if employees_future is None:
+                    employees_future = executor.submit(
+                        DatabaseManager.load_employees_by_role,
+                        recruiting_roles.keys(), project_data.get('worktime', 20))
+                
+                leaders_future.result()
+                employees_by_role = employees_future.result()
+                if use_snapshot:
+                    employees_by_role = DatabaseManager.select_employees_by_role(
+                        employees_by_role, recruiting_roles.keys(), project_data.get('worktime', 20))
+                return project_data, employees_by_role
+        except Exception as e:
+            logger.error(f"Error fetching project context: {str(e)}")
+            raise
+
+    @staticmethod
+    def group_employees_by_role(employees):
+        """社員をロール別にグループ化"""
+        grouped = {}
+        for emp in employees:
+            role = emp.get('role', 'Unknown')
+            if role not in grouped:
+                grouped[role] = []
+            grouped[role].append(emp)
+        return grouped
+
+
+class PredicateCompiler:
+    """0次・1次審査の閾値をストレージ側のフィルタ条件に変換するクラス
+    
+    条件は ('cmp', 属性パス, 演算子, 値) / ('and', [...]) / ('or', [...]) の木で表し、
+    DynamoDBのFilterExpressionとローカル用の判定関数の両方にコンパイルする。
+    数値属性が数値型で保存されている前提で、RankingEngineの0次・1次審査と同じ社員を残す
+    （文字列で保存された数値はDynamoDB側では比較に一致しないため、EMPLOYEES_FILTER_PUSHDOWNは既定で無効）。
+    """
+    
+    OPERATORS = {
+        '=': lambda a, b: a == b,
+        '>=': lambda a, b: a >= b,
+    }
+
+    @staticmethod
+    def worktime_predicate(required_worktime):
+        """0次審査（time >= worktime）の条件"""
+        required_worktime = float(required_worktime) if required_worktime is not None else 20.0
+        if required_worktime <= 0:
+            # 0以下なら稼働時間の欠損・不正値の社員も通過するため絞り込まない
+            return None
+        return ('cmp', ('time',), '>=', required_worktime)
+
+    @staticmethod
+    def motivation_predicate(role):
+        """1次審査（motivation_by_role[role] >= 閾値）の条件"""
+        return ('cmp', ('motivation_by_role', role), '>=', RankingEngine.MOTIVATION_THRESHOLD)
+
+    @staticmethod
+    def screening_predicate(required_worktime, role):
+        """1role分の0次・1次審査条件"""
+        clauses = [PredicateCompiler.worktime_predicate(required_worktime),
+                   PredicateCompiler.motivation_predicate(role)]
+        return ('and', [c for c in clauses if c is not None])
+
+    @staticmethod
+    def scan_predicate(required_worktime, roles):
+        """全件スキャン用: 0次審査 AND (募集roleのいずれかで1次審査を通過)"""
+        role_clauses = [
+            ('and', [('cmp', ('role',), '=', role), PredicateCompiler.motivation_predicate(role)])
+            for role in roles
+        ]
+        clauses = [PredicateCompiler.worktime_predicate(required_worktime), ('or', role_clauses)]
+        return ('and', [c for c in clauses if c is not None])
+
+    @staticmethod
+    def to_dynamodb(predicate):
+        """FilterExpression・ExpressionAttributeNames・ExpressionAttributeValuesを生成"""
+        names, values = {}, {}
+        
+        def name_placeholder(name):
+            for placeholder, existing in names.items():
+                if existing == name:
+                    return placeholder
+            placeholder = f"#f{len(names)}"
+            names[placeholder] = name
+            return placeholder
+        
+        def compile_node(node):
+            kind = node[0]
+            if kind == 'cmp':
+                _, path, op, value = node
+                placeholder = f":f{len(values)}"
+                values[placeholder] = Decimal(str(value)) if isinstance(value, (int, float)) else value
+                attribute = '.'.join(name_placeholder(part) for part in path)
+                return f"{attribute} {op} {placeholder}"
+            joiner = ' AND ' if kind == 'and' else ' OR '
+            return '(' + joiner.join(compile_node(child) for child in node[1]) + ')'
+        
+        return {
+            'FilterExpression': compile_node(predicate),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+        }
+
+    @staticmethod
+    def to_local(predicate):
+        """ローカルバックエンド用の判定関数（DynamoDBと同じく欠損・型違いは不一致）"""
+        kind = predicate[0]
+        if kind == 'cmp':
+            _, path, op, value = predicate
+            compare = PredicateCompiler.OPERATORS[op]
+            numeric = isinstance(value, (int, float))
+            
+            def match(item):
+                current = item
+                for part in path:
+                    if not isinstance(current, dict) or part not in current:
+                        return False
+                    current = current[part]
+                if numeric and (isinstance(current, bool) or not isinstance(current, (int, float, Decimal))):
+                    return False
+                return compare(current, value)
+            return match
+        
+        children = [PredicateCompiler.to_local(child) for child in predicate[1]]
+        if kind == 'and':
+            return lambda item: all(child(item) for child in children)
+        return lambda item: any(child(item) for child in children)
+
+
+class EmployeeSnapshotFile:
+    """審査用の社員特徴をrole別に列指向で保持するmmap可能なスナップショットファイル
+    
+    レイアウト: MAGIC(8B) + ディレクトリ長(uint32) + JSONディレクトリ + 8バイト境界に揃えた列データ。
+    各roleパーティションは数値列（float64、欠損はNaN）と、社員ID・資格名・経験カテゴリの
+    文字列辞書（オフセット列＋UTF-8本体）を持つ。読み込み時はmmapした列をmemoryviewで
+    参照するだけなので、プロジェクトが必要とするroleのページだけが読み込まれる。
+    資格ID形式（SNAPSHOT_CERTIFICATION_IDS）では、資格はroleの文字列辞書ではなくディレクトリの
+    資格名表（全role共通）への添字で保存し、読み込み時に資格名表を登録簿に一度だけ登録する。
+    """
+    
+    MAGIC = b'DMSNAP01'
+    _shared = {}
+    _shared_lock = threading.Lock()
+    # 差し替え済みでまだ閉じられていないスナップショット
+    _retired = []
+    # 列名 -> 社員dict上のキー（NaNなら属性なしとして復元）
+    NUMERIC_COLUMNS = {'time': 'time', 'tenure': '勤続年数'}
+    MBTI_KEYS = ('E', 'I', 'N', 'S', 'T', 'F', 'J', 'P')
+    # 審査用特徴の列（feature_level、feature_fit_<カテゴリ番号>）。古いファイルにはない
+    FEATURE_COLUMNS = ('feature_level',) + tuple(f'feature_fit_{i}' for i in range(3))
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError(f"Invalid employee snapshot: {path}")
+        header_length = struct.unpack_from('<I', self.mm, len(self.MAGIC))[0]
+        header_start = len(self.MAGIC) + 4
+        self.directory = json.loads(bytes(self.mm[header_start:header_start + header_length]))
+        if self.directory['byteorder'] != sys.byteorder:
+            raise ValueError(f"Employee snapshot byte order mismatch: {path}")
+        self.view = memoryview(self.mm)
+        self.string_cache = {}
+        # 資格ID形式なら資格名表（ファイルの資格ID -> 資格名）。加点区分の分類はここで一度だけ行う
+        self.certification_names = self.directory.get('certifications')
+        for name in self.certification_names or ():
+            certification_registry.intern(name)
+
+    def roles(self):
+        return list(self.directory['roles'])
+
+    def column(self, role, name):
+        """列をコピーせずにmemoryviewとして返す"""
+        spec = self.directory['roles'][role]['columns'][name]
+        return self.view[spec['offset']:spec['offset'] + spec['length']].cast(spec['typecode'])
+
+    def string(self, role, string_id):
+        """roleの文字列辞書から1件を復元（復元結果はキャッシュ）"""
+        key = (role, string_id)
+        if key not in self.string_cache:
+            offsets = self.column(role, 'string_offsets')
+            start = self.directory['roles'][role]['columns']['string_data']['offset']
+            self.string_cache[key] = bytes(
+                self.view[start + offsets[string_id]:start + offsets[string_id + 1]]).decode('utf-8')
+        return self.string_cache[key]
+
+    def role_employees(self, role):
+        """roleパーティションを審査用の社員dictのリストとして復元"""
+        if role not in self.directory['roles']:
+            return []
+        read_row = self.row_reader(role)
+        return [read_row(row) for row in range(self.directory['roles'][role]['rows'])]
+
+    def row_reader(self, role):
+        """roleパーティションの1行を社員dictに復元する関数（列の参照は1回だけ作る）"""
+        ids = self.column(role, 'employee_id')
+        numeric = {key: self.column(role, name) for name, key in self.NUMERIC_COLUMNS.items()}
+        motivation = self.column(role, 'motivation')
+        mbti = {k: self.column(role, f'mbti_{k}') for k in self.MBTI_KEYS}
+        cert_offsets, cert_ids = self.column(role, 'cert_offsets'), self.column(role, 'cert_ids')
+        cert_names = self.certification_names
+        exp_offsets, exp_keys = self.column(role, 'exp_offsets'), self.column(role, 'exp_keys')
+        exp_years = self.column(role, 'exp_years')
+        features = None
+        if self.has_features(role):
+            features = [self.column(role, name) for name in self.FEATURE_COLUMNS]
+        
+        def read_row(row):
+            emp = {'employee_id': self.string(role, ids[row]), 'role': role}
+            for key, column in numeric.items():
+                if column[row] == column[row]:  # NaN以外
+                    emp[key] = self._restore_number(column[row])
+            if motivation[row] == motivation[row]:
+                emp['motivation_by_role'] = {role: self._restore_number(motivation[row])}
+            if cert_names is not None:
+                emp['certifications'] = [cert_names[cert_ids[i]]
+                                         for i in range(cert_offsets[row], cert_offsets[row + 1])]
+            else:
+                emp['certifications'] = [
+                    self.string(role, cert_ids[i]) for i in range(cert_offsets[row], cert_offsets[row + 1])
+                ]
+            emp['経験'] = {
+                self.string(role, exp_keys[i]): self._restore_number(exp_years[i])
+                for i in range(exp_offsets[row], exp_offsets[row + 1])
+            }
+            percentages = {
+                k: self._restore_number(column[row]) for k, column in mbti.items() if column[row] == column[row]
+            }
+            if percentages:
+                emp['mbti_percentages'] = percentages
+            if features:
+                # 特徴の列は書き出し時にこの行の内容から計算したものなので、復元した内容を算出元とする
+                emp[EmployeeFeatures.ATTRIBUTE] = {
+                    'version': EmployeeFeatures.VERSION,
+                    'source': EmployeeFeatures.source(emp),
+                    'level': features[0][row],
+                    'mbti_fit': {category: features[i + 1][row]
+                                 for i, category in enumerate(EmployeeFeatures.CATEGORIES)},
+                }
+            return emp
+        return read_row
+
+    def is_stale(self, employees_version, ttl):
+        """社員データのバージョンが書き出し時と異なるか、書き出しからttl秒を過ぎていればTrue
+        
+        バージョンが分からなければ（None）TTLだけで判定する。書き出し時刻のない古いファイルは
+        ファイルの更新時刻を書き出し時刻とみなす。
+        """
+        if employees_version is not None and self.directory.get('employees_version') != str(employees_version):
+            return True
+        if ttl <= 0:
+            return False
+        exported_at = self.directory.get('exported_at')
+        if exported_at is None:
+            exported_at = os.stat(self.path).st_mtime
+        return time.time() - exported_at > ttl
+
+    def has_features(self, role):
+        return all(name in self.directory['roles'][role]['columns'] for name in self.FEATURE_COLUMNS)
+
+    def close(self):
+        """mmapを閉じる（閉じ済みなら何もしない）。列を参照する配列が残っていればBufferError"""
+        if self.mm.closed:
+            return
+        self.view.release()
+        self.mm.close()
+
+    @classmethod
+    def open_shared(cls, path):
+        """ウォームコンテナ内で開いたファイルを使い回す（更新されていれば開き直し、古いmmapは閉じる）"""
+        mtime = os.stat(path).st_mtime_ns
+        with cls._shared_lock:
+            cached = cls._shared.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            snapshot = cls(path)
+            cls._shared[path] = (mtime, snapshot)
+            if cached:
+                cls._retired.append(cached[1])
+            cls._close_retired()
+        return snapshot
+
+    @classmethod
+    def _close_retired(cls):
+        """差し替えた古いスナップショットを閉じる。審査中の列がまだ参照していれば次の差し替えで閉じ直す"""
+        still_open = []
+        for snapshot in cls._retired:
+            try:
+                snapshot.close()
+            except BufferError:
+                still_open.append(snapshot)
+        cls._retired = still_open
+
+    @staticmethod
+    def _restore_number(value):
+        """decimal_to_floatと同じく整数値はintに戻す"""
+        return int(value) if value.is_integer() else value
+
+    @staticmethod
+    def _to_float(value):
+        if isinstance(value, bool):
+            return float('nan')
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float('nan')
+
+    @staticmethod
+    def write(path, employees, certification_ids=None, employees_version=None):
+        """社員リストをrole別の列データに変換して書き出す（一時ファイル経由で置き換え）
+        
+        certification_idsがTrueなら資格を資格ID形式で保存する（未指定ならSNAPSHOT_CERTIFICATION_IDS）。
+        ディレクトリには書き出し時刻と、元にした社員データのバージョン（employees_version）を記録する。
+        """
+        if certification_ids is None:
+            certification_ids = SNAPSHOT_CERTIFICATION_IDS
+        employees = decimal_to_float(employees)
+        grouped = DatabaseManager.group_employees_by_role(employees)
+        to_float = EmployeeSnapshotFile._to_float
+        
+        blobs = []
+        directory = {
+            'format': 1, 'byteorder': sys.byteorder, 'roles': {}, 'exported_at': time.time(),
+            'employees_version': str(employees_version) if employees_version is not None else None,
+        }
+        certification_names = {}
+        
+        def intern_certification(value):
+            return certification_names.setdefault(str(value), len(certification_names))
+        
+        for role, role_employees in grouped.items():
+            strings = {}
+            
+            def intern(value):
+                return strings.setdefault(str(value), len(strings))
+            
+            columns = {
+                'employee_id': array('i', (intern(e.get('employee_id', '')) for e in role_employees)),
+                'motivation': array('d', (to_float(e.get('motivation_by_role', {}).get(role))
+                                          for e in role_employees)),
+            }
+            for name, key in EmployeeSnapshotFile.NUMERIC_COLUMNS.items():
+                columns[name] = array('d', (to_float(e.get(key)) for e in role_employees))
+            for k in EmployeeSnapshotFile.MBTI_KEYS:
+                columns[f'mbti_{k}'] = array('d', (to_float((e.get('mbti_percentages') or {}).get(k))
+                                                   for e in role_employees))
+            role_features = [EmployeeFeatures.of(e) or EmployeeFeatures.compute(e) for e in role_employees]
+            columns['feature_level'] = array('d', (f['level'] for f in role_features))
+            for i, category in enumerate(EmployeeFeatures.CATEGORIES):
+                columns[f'feature_fit_{i}'] = array('d', (f['mbti_fit'][category] for f in role_features))
+            
+            cert_offsets, cert_ids = array('i', [0]), array('i')
+            exp_offsets, exp_keys, exp_years = array('i', [0]), array('i'), array('d')
+            intern_cert = intern_certification if certification_ids else intern
+            for e in role_employees:
+                cert_ids.extend(intern_cert(c) for c in (e.get('certifications') or []))
+                cert_offsets.append(len(cert_ids))
+                for category, years in (e.get('経験') or {}).items():
+                    exp_keys.append(intern(category))
+                    exp_years.append(to_float(years))
+                exp_offsets.append(len(exp_keys))
+            columns.update({
+                'cert_offsets': cert_offsets, 'cert_ids': cert_ids,
+                'exp_offsets': exp_offsets, 'exp_keys': exp_keys, 'exp_years': exp_years,
+            })
+            
+            encoded = [s.encode('utf-8') for s in strings]
+            string_offsets = array('i', [0])
+            for b in encoded:
+                string_offsets.append(string_offsets[-1] + len(b))
+            columns['string_offsets'] = string_offsets
+            columns['string_data'] = b''.join(encoded)
+            
+            directory['roles'][role] = {'rows': len(role_employees), 'columns': {}}
+            for name, data in columns.items():
+                typecode = data.typecode if isinstance(data, array) else 'B'
+                raw = data.tobytes() if isinstance(data, array) else data
+                directory['roles'][role]['columns'][name] = {'typecode': typecode, 'length': len(raw)}
+                blobs.append((role, name, raw))
+        if certification_ids:
+            directory['certifications'] = list(certification_names)
+        
+        # ディレクトリ長（＝列の開始位置）が確定するまでオフセットを計算し直す
+        header_length = 0
+        while True:
+            offset = len(EmployeeSnapshotFile.MAGIC) + 4 + header_length
+            for role, name, raw in blobs:
+                offset += -offset % 8
+                directory['roles'][role]['columns'][name]['offset'] = offset
+                offset += len(raw)
+            header = json.dumps(directory, ensure_ascii=False).encode('utf-8')
+            if len(header) == header_length:
+                break
+            header_length = len(header)
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(EmployeeSnapshotFile.MAGIC + struct.pack('<I', len(header)) + header)
+            for role, name, raw in blobs:
+                f.write(b'\0' * (-f.tell() % 8))
+                f.write(raw)
+        os.replace(tmp_path, path)
+        logger.info(f"Wrote employee snapshot: {path} ({len(employees)} employees, {len(grouped)} roles)")
+
+
+class RankingEngine:
+    """ランキング処理を行うクラス"""
+    
+    MOTIVATION_THRESHOLD = 3
+    
+    @staticmethod
+    def worktime_fields(emp, required_worktime):
+        """0次審査の1名分の判定（通過なら書き込む審査結果、不通過ならNone）"""
+        available_time = emp.get('time', 0)
+        try:
+            available_time = max(0, float(available_time))
+        except:
+            available_time = 0.0
+        
+        if available_time >= required_worktime:
+            return {'stage0_passed': True, 'stage0_details': {'available_time': available_time}}
+        return None
+
+    @staticmethod
+    def screen_worktime(emp, required_worktime):
+        """0次審査の1名分の判定（通過なら審査結果を書き込む社員の複製、不通過ならNone）"""
+        fields = RankingEngine.worktime_fields(emp, required_worktime)
+        if fields is None:
+            return None
+        # 取得元（キャッシュ等）の社員を書き換えないよう、通過者だけ浅く複製する
+        emp = dict(emp)
+        emp.update(fields)
+        return emp
+
+    @staticmethod
+    def stage0_worktime_screening(employees, required_worktime):
+        """0次審査: 稼働時間"""
+        passed = []
+        required_worktime = float(required_worktime) if required_worktime is not None else 20.0
+        
+        for emp in employees:
+            emp = RankingEngine.screen_worktime(emp, required_worktime)
+            if emp is not None:
+                passed.append(emp)
+        
+        logger.info(f"【0次審査】{len(employees)}名 → {len(passed)}名")
+        return passed
+
+    @staticmethod
+    def motivation_fields(emp, target_role):
+        """1次審査の1名分の判定（通過なら書き込む審査結果、不通過ならNone）"""
+        motivation = emp.get('motivation_by_role', {}).get(target_role, 0)
+        try:
+            motivation = max(0, min(5, float(motivation)))
+        except:
+            motivation = 0.0
+        
+        if motivation >= RankingEngine.MOTIVATION_THRESHOLD:
+            return {'stage1_passed': True, 'stage1_details': {'motivation_level': motivation}}
+        return None
+
+    @staticmethod
+    def screen_motivation(emp, target_role):
+        """1次審査の1名分の判定（通過なら社員、不通過ならNone）"""
+        fields = RankingEngine.motivation_fields(emp, target_role)
+        if fields is None:
+            return None
+        emp.update(fields)
+        return emp
+
+    @staticmethod
+    def stage1_motivation_screening(employees, target_role):
+        """1次審査: やる気"""
+        passed = []
+        
+        for emp in employees:
+            emp = RankingEngine.screen_motivation(emp, target_role)
+            if emp is not None:
+                passed.append(emp)
+        
+        logger.info(f"【1次審査】{len(employees)}名 → {len(passed)}名")
+        return passed
+
+    @staticmethod
+    def certification_score(certifications):
+        """資格スコア（基礎点0.3、最大3つまで種類に応じて加点、上限1.0）"""
+        # 資格名ごとの加点区分は登録簿で一度だけ判定する
+        return certification_registry.score(certifications)
+
+    @staticmethod
+    def certification_points(cert):
+        """資格1件の加点"""
+        return certification_registry.points_of(cert)
+
+    @staticmethod
+    def tenure_score(tenure):
+        """勤続年数スコア（2年刻みの区分で0.3～0.9）"""
+        try:
+            tenure = float(tenure)
+        except (ValueError, TypeError):
             tenure = 0
         
         if tenure == 0:
-            tenure_score = 0.3  # 新人でも基礎点0.3
+            return 0.3  # 新人でも基礎点0.3
         elif tenure < 2:
-            tenure_score = 0.4
+            return 0.4
         elif tenure < 4:
-            tenure_score = 0.5
+            return 0.5
         elif tenure < 6:
-            tenure_score = 0.6
+            return 0.6
         elif tenure < 8:
-            tenure_score = 0.7
+            return 0.7
         elif tenure < 10:
-            tenure_score = 0.8
+            return 0.8
         else:
-            tenure_score = 0.9
-        
-        # ===== 3. 経験スコア（30%）=====
+            return 0.9
+
+    @staticmethod
+    def experience_score(experience):
+        """経験スコア（基礎点0.3、経験年数の合計1年ごとに+0.05、上限0.9）"""
         exp_score = 0.3  # 基礎点：経験なしでも0.3
         
-        experience = employee.get('経験', {})
         if experience:
             total_exp_years = sum(experience.values())
             # 経験年数の合計で評価（5年で+0.25、10年で+0.5）
             additional_score = min(total_exp_years * 0.05, 0.6)
             exp_score = 0.3 + additional_score
         
-        exp_score = min(exp_score, 0.9)
+        return min(exp_score, 0.9)
+
+    @staticmethod
+    def calculate_employee_level(employee, target_role):
+        """
+        改善版：一般的な社員が0.4～0.6になる計算式
+        """
+        
+        # ===== 1. 資格スコア（40%）=====
+        cert_score = RankingEngine.certification_score(employee.get('certifications', []))
+        
+        # ===== 2. 勤続年数スコア（30%）=====
+        tenure_score = RankingEngine.tenure_score(employee.get('勤続年数', 0))
+        
+        # ===== 3. 経験スコア（30%）=====
+        exp_score = RankingEngine.experience_score(employee.get('経験', {}))
         
         # ===== 最終計算 =====
         final_level = (
@@ -239,13 +1893,18 @@ class RankingEngine:
         return round(final_level * 10) / 10
 
     @staticmethod
-    def stage2_level_matching(employees, project_data, target_role):
-        """
-        2次審査: レベルマッチング
-        """
-        # プロジェクトデータのDecimal型を確実にfloat型に変換
-        project_data = decimal_to_float(project_data)
-        
+    def employee_level(employee, target_role):
+        """社員レベル（取り込み済みの特徴があればそれを使い、なければ社員ごとにキャッシュ）"""
+        features = EmployeeFeatures.of(employee)
+        if features is not None:
+            return float(features['level'])
+        # calculate_employee_levelはtarget_roleによらないため、社員単位でキャッシュする
+        return employee_level_cache.level(
+            employee, lambda emp: RankingEngine.calculate_employee_level(emp, target_role))
+
+    @staticmethod
+    def level_requirement(project_data, target_role):
+        """roleの要求レベルと許容範囲"""
         # role要件を取得（デフォルト値も改善）
         role_requirements = project_data.get('role_requirements', {}).get(target_role, {})
         required_level = float(role_requirements.get('level', 0.5))  # デフォルト0.5
@@ -255,6 +1914,43 @@ class RankingEngine:
         if level_range == 0:
             logger.warning(f"level_range=0は厳しすぎるため、0.1に自動調整")
             level_range = 0.1
+        return required_level, level_range
+
+    @staticmethod
+    def level_fields(emp, target_role, required_level, level_range):
+        """2次審査の1名分のレベルと判定詳細（通過ならstage2_passedも含む）"""
+        employee_level = RankingEngine.employee_level(emp, target_role)
+        
+        # 要求レベルとの差分
+        level_diff = abs(employee_level - required_level)
+        
+        fields = {
+            'stage2_score': employee_level,
+            'stage2_details': {
+                'employee_level': employee_level,
+                'required_level': required_level,
+                'level_range': level_range,
+                'level_diff': round(level_diff, 3),
+                'within_range': level_diff <= level_range
+            }
+        }
+        if level_diff <= level_range:
+            fields['stage2_passed'] = True
+        return fields
+
+    @staticmethod
+    def match_level(emp, target_role, required_level, level_range):
+        """2次審査の1名分の判定（レベルと判定詳細を書き込み、通過ならTrue）"""
+        fields = RankingEngine.level_fields(emp, target_role, required_level, level_range)
+        emp.update(fields)
+        return fields.get('stage2_passed', False)
+
+    @staticmethod
+    def stage2_level_matching(employees, project_data, target_role):
+        """
+        2次審査: レベルマッチング
+        """
+        required_level, level_range = RankingEngine.level_requirement(project_data, target_role)
         
         logger.info(f"【2次審査】Role: {target_role}")
         logger.info(f"  要求レベル: {required_level:.1f} (±{level_range:.1f})")
@@ -264,24 +1960,9 @@ class RankingEngine:
         level_distribution = []
         
         for emp in employees:
-            employee_level = RankingEngine.calculate_employee_level(emp, target_role)
-            level_distribution.append(employee_level)
-            
-            # 要求レベルとの差分
-            level_diff = abs(employee_level - required_level)
-            
-            emp['stage2_score'] = employee_level
-            emp['stage2_details'] = {
-                'employee_level': employee_level,
-                'required_level': required_level,
-                'level_range': level_range,
-                'level_diff': round(level_diff, 3),
-                'within_range': level_diff <= level_range
-            }
-            
-            if level_diff <= level_range:
-                emp['stage2_passed'] = True
+            if RankingEngine.match_level(emp, target_role, required_level, level_range):
                 passed.append(emp)
+            level_distribution.append(emp['stage2_score'])
         
         # 審査結果のサマリー
         total_employees = len(employees)
@@ -310,236 +1991,1417 @@ class RankingEngine:
         
         return passed
 
+    @staticmethod
+    def mbti_fit_score(emp, project_category):
+        """3次審査の1名分のMBTI適性スコア（取り込み済みの特徴があればそれを使う）"""
+        features = EmployeeFeatures.of(emp)
+        if features is not None and project_category in features['mbti_fit']:
+            return float(features['mbti_fit'][project_category])
+        # 割合がない社員は既定値50で採点される（プロファイル側で扱う）
+        return mbti_profiles.fit_score(emp.get('mbti_percentages'), project_category)
+
+    @staticmethod
+    def calculate_mbti_fit(mbti, project_category):
+        """プロジェクトカテゴリに対するMBTI適性スコア"""
+        if project_category == '新規開発':
+            score = float(mbti.get('N', 50)) / 100
+        elif project_category == '改善・保守':
+            s_percentage = float(mbti.get('S', 50))
+            i_percentage = float(mbti.get('I', 50))
+            score = (s_percentage * 2 + i_percentage) / 300
+        elif project_category == 'クライアント対応':
+            score = float(mbti.get('E', 50)) / 100
+        else:
+            score = 0.5
+        
+        return round(score, 3)
+
     @staticmethod
     def stage3_mbti_scoring(employees, project_category):
         """3次審査: MBTI適性"""
         scored_employees = []
+        computed = mbti_profiles.computed
         
         for emp in employees:
-            mbti = emp.get('mbti_percentages', {
-                'E': 50, 'I': 50, 'N': 50, 'S': 50,
-                'T': 50, 'F': 50, 'J': 50, 'P': 50
-            })
+            emp['stage3_score'] = RankingEngine.mbti_fit_score(emp, project_category)
+            scored_employees.append(emp)
+        
+        logger.info(f"【3次審査】MBTI適性評価完了 - {len(scored_employees)}名"
+                    + (f"（新規に採点したMBTIプロファイル: {mbti_profiles.computed - computed}件）"
+                       if mbti_profiles.enabled else ''))
+        return scored_employees
+
+    @staticmethod
+    def select_top_candidates_stage3(employees, top_n):
+        """3次審査の上位候補者選出（TopKBufferならバッファの中身をそのまま順位付け）"""
+        # Decimal型対応：top_nを整数に変換
+        top_n = int(float(top_n)) if top_n is not None else 0
+        if isinstance(employees, TopKBuffer):
+            selected = employees.items()[:top_n]
+        else:
+            selected = top_k(employees, top_n, key=lambda x: x.get('stage3_score', 0))
+        
+        for rank, emp in enumerate(selected, 1):
+            emp['stage3_rank'] = rank
+        
+        logger.info(f"3次審査: 上位{len(selected)}名を選出")
+        return selected
+
+    @staticmethod
+    def compatibility_dimension_score(dimension, diff):
+        """MBTI相性の1次元分のスコア（diffは2人の割合の差の絶対値）"""
+        if dimension in ('E', 'T'):
+            # E-I・T-F次元: 適度な差が理想
+            if 20 <= diff <= 60:
+                return 0.25
+            elif diff < 20:
+                return 0.15
+            else:
+                return 0.1
+        # N-S・J-P次元: 同じ方向が理想
+        return 0.25 * (1 - diff / 100)
+
+    @staticmethod
+    def calculate_mbti_compatibility(mbti1, mbti2, role_name=''):
+        """MBTI相性計算"""
+        total_score = 0
+        
+        mbti1 = mbti1 or {}
+        mbti2 = mbti2 or {}
+        
+        # E-I・N-S・T-F・J-P次元の順に加算
+        for dimension in CompatibilityTable.DIMENSIONS:
+            diff = abs(float(mbti1.get(dimension, 50)) - float(mbti2.get(dimension, 50)))
+            total_score += RankingEngine.compatibility_dimension_score(dimension, diff)
+        
+        return {'total_score': round(min(total_score, 1.0), 3)}
+
+    @staticmethod
+    def stage4_compatibility_scoring(employees, leader_mbti, sub_leader_mbti):
+        """4次審査: リーダー相性（リーダーごとの相性表を引いて採点）"""
+        scored_employees = []
+        
+        leader_table = CompatibilityTable.for_leader(leader_mbti)
+        sub_leader_table = CompatibilityTable.for_leader(sub_leader_mbti)
+        
+        computed = mbti_profiles.computed
+        
+        for emp in employees:
+            # MBTI_PROFILESが有効なら、同じ割合の組の社員はプロファイルごとに1回だけ採点する
+            leader_compat, sub_compat, weighted_score = mbti_profiles.compatibility(
+                emp.get('mbti_percentages'), leader_table, sub_leader_table)
             
-            # Decimal型を確実にfloat型に変換
-            mbti = decimal_to_float(mbti)
+            emp['stage4_score'] = weighted_score
+            emp['stage4_details'] = {
+                'leader_compatibility': leader_compat,
+                'sub_leader_compatibility': sub_compat
+            }
+            scored_employees.append(emp)
+        
+        logger.info(f"【4次審査】リーダー相性評価完了 - {len(scored_employees)}名"
+                    + (f"（新規に採点したMBTIプロファイル: {mbti_profiles.computed - computed}件）"
+                       if mbti_profiles.enabled else ''))
+        return scored_employees
+
+    @staticmethod
+    def select_top_candidates_stage4(employees, top_n):
+        """4次審査の上位候補者選出"""
+        # Decimal型対応：top_nを整数に変換
+        top_n = int(float(top_n)) if top_n is not None else 0
+        selected = top_k(employees, top_n, key=lambda x: x.get('stage4_score', 0))
+        
+        for rank, emp in enumerate(selected, 1):
+            emp['stage4_rank'] = rank
+        
+        logger.info(f"4次審査: 上位{len(selected)}名を選出")
+        return selected
+
+    @staticmethod
+    def calculate_final_scores(employees):
+        """最終スコア計算"""
+        scored_employees = []
+        
+        for emp in employees:
+            stage3_score = emp.get('stage3_score', 0)
+            stage4_score = emp.get('stage4_score', 0)
             
-            if project_category == '新規開発':
-                score = float(mbti.get('N', 50)) / 100
-            elif project_category == '改善・保守':
-                s_percentage = float(mbti.get('S', 50))
-                i_percentage = float(mbti.get('I', 50))
-                score = (s_percentage * 2 + i_percentage) / 300
-            elif project_category == 'クライアント対応':
-                score = float(mbti.get('E', 50)) / 100
+            final_score = 0.4 * stage3_score + 0.6 * stage4_score
+            emp['final_score'] = round(final_score, 4)
+            
+            # グレード判定
+            if final_score >= 0.8:
+                emp['final_grade'] = 'S'
+                emp['grade_description'] = '最優秀候補'
+            elif final_score >= 0.7:
+                emp['final_grade'] = 'A'
+                emp['grade_description'] = '優秀候補'
+            elif final_score >= 0.6:
+                emp['final_grade'] = 'B'
+                emp['grade_description'] = '良好候補'
+            elif final_score >= 0.5:
+                emp['final_grade'] = 'C'
+                emp['grade_description'] = '標準候補'
             else:
-                score = 0.5
+                emp['final_grade'] = 'D'
+                emp['grade_description'] = '要検討候補'
             
-            emp['stage3_score'] = round(score, 3)
             scored_employees.append(emp)
         
-        logger.info(f"【3次審査】MBTI適性評価完了 - {len(scored_employees)}名")
+        logger.info(f"【最終スコア計算完了】{len(scored_employees)}名")
         return scored_employees
 
     @staticmethod
-    def select_top_candidates_stage3(employees, top_n):
-        """3次審査の上位候補者選出"""
-        # Decimal型対応：top_nを整数に変換
-        top_n = int(float(top_n)) if top_n is not None else 0
-        sorted_emp = sorted(employees, key=lambda x: x.get('stage3_score', 0), reverse=True)
-        selected = sorted_emp[:min(top_n, len(sorted_emp))]
-        
-        for rank, emp in enumerate(selected, 1):
-            emp['stage3_rank'] = rank
-        
-        logger.info(f"3次審査: 上位{len(selected)}名を選出")
-        return selected
+    def determine_mbti_type(mbti_percentages):
+        """MBTI型判定"""
+        if not mbti_percentages:
+            return "Unknown"
+        
+        mbti_type = ""
+        mbti_type += 'E' if float(mbti_percentages.get('E', 50)) >= 50 else 'I'
+        mbti_type += 'N' if float(mbti_percentages.get('N', 50)) >= 50 else 'S'
+        mbti_type += 'T' if float(mbti_percentages.get('T', 50)) >= 50 else 'F'
+        mbti_type += 'J' if float(mbti_percentages.get('J', 50)) >= 50 else 'P'
+        
+        return mbti_type
+
+    @staticmethod
+    def candidate_info(emp, role, rank):
+        """最終候補者1名分の出力"""
+        return {
+            'rank': rank,
+            'employee_id': emp.get('employee_id'),
+            'employee_name': emp.get('name'),
+            'role': role,
+            'final_score': emp.get('final_score', 0),
+            'grade': emp.get('final_grade', 'D'),
+            'grade_description': emp.get('grade_description', ''),
+            'mbti_type': mbti_profiles.type_code(emp.get('mbti_percentages')),
+            'scores': {
+                'level': emp.get('stage2_score', 0),
+                'mbti_fitness': emp.get('stage3_score', 0),
+                'leader_compatibility': emp.get('stage4_score', 0)
+            },
+            'details': {
+                'motivation': emp.get('stage1_details', {}).get('motivation_level', 0),
+                'worktime': emp.get('stage0_details', {}).get('available_time', 0),
+                'certifications': list(emp.get('certifications', [])),
+                'tenure_years': emp.get('勤続年数', 0)
+            }
+        }
+
+    @staticmethod
+    def create_final_candidate_list(employees, role, required_count, page_size=None, project_id=None):
+        """最終候補者リスト作成（page_size指定時は先頭ページだけを作り、続きはnext_cursorで取得）"""
+        next_cursor = None
+        if page_size and len(employees) > page_size:
+            # 先頭ページだけを選び、全体の並べ替えは続きのページが求められたときに行う
+            page = top_k(employees, page_size, key=RankedCandidateCache.final_score)
+            entry_id = ranked_candidate_cache.put(role, required_count, list(employees), page_size, project_id)
+            next_cursor = RankedCandidateCache.encode_cursor(entry_id, page_size, project_id, role, page_size)
+        else:
+            page = sorted(employees, key=RankedCandidateCache.final_score, reverse=True)
+        
+        result = {
+            'role': role,
+            'required_count': required_count,
+            'total_candidates': len(employees),
+            'candidates': [RankingEngine.candidate_info(emp, role, rank) for rank, emp in enumerate(page, 1)]
+        }
+        if page_size:
+            result['next_cursor'] = next_cursor
+        return result
+
+    @staticmethod
+    def candidate_page(cursor):
+        """カーソルが指す続きのページ（不正なカーソル・審査し直せないカーソルならNone）"""
+        decoded = RankedCandidateCache.decode_cursor(cursor)
+        if decoded is None:
+            return None
+        
+        entry_id = decoded['id']
+        entry = ranked_candidate_cache.get(entry_id)
+        if entry is None:
+            # 別のコンテナで作られた・破棄されたエントリは、カーソルのプロジェクトを審査し直して登録し直す
+            role_result = RankingEngine.rerank_for_cursor(decoded)
+            if role_result is None:
+                return None
+            next_decoded = RankedCandidateCache.decode_cursor(role_result.get('next_cursor') or '')
+            entry_id = next_decoded['id'] if next_decoded else None
+            entry = ranked_candidate_cache.get(entry_id) if entry_id else None
+            if entry is None:
+                # 審査し直した結果が先頭ページに収まる場合、続きのページは空
+                return {
+                    'role': role_result['role'],
+                    'required_count': role_result['required_count'],
+                    'total_candidates': role_result['total_candidates'],
+                    'candidates': [],
+                    'next_cursor': None
+                }
+        
+        offset = decoded['offset']
+        employees = ranked_candidate_cache.ranked_employees(entry)
+        end = offset + entry['page_size']
+        return {
+            'role': entry['role'],
+            'required_count': entry['required_count'],
+            'total_candidates': len(employees),
+            'candidates': [
+                RankingEngine.candidate_info(emp, entry['role'], rank)
+                for rank, emp in enumerate(employees[offset:end], offset + 1)
+            ],
+            'next_cursor': RankedCandidateCache.encode_cursor(
+                entry_id, end, entry['project_id'], entry['role'], entry['page_size']) if end < len(employees) else None
+        }
+
+    @staticmethod
+    def rerank_for_cursor(decoded):
+        """カーソルのプロジェクトを同じページサイズで審査し直し、カーソルのroleの結果を返す（できなければNone）"""
+        if not decoded['project_id'] or decoded['role'] is None or not decoded['page_size']:
+            return None
+        logger.info(f"カーソルのエントリがないため再審査: {decoded['project_id']} / {decoded['role']}")
+        results = process_all_roles(decoded['project_id'], page_size=decoded['page_size'])
+        return results.get('roles', {}).get(decoded['role'])
+
+    @staticmethod
+    def create_empty_candidate_list(role, required_count):
+        """空の候補者リスト作成"""
+        return {
+            'role': role,
+            'required_count': required_count,
+            'total_candidates': 0,
+            'candidates': [],
+            'message': '審査を通過した候補者がいません'
+        }
+
+
+class CompatibilityTable:
+    """リーダー1名に対するMBTI相性の次元別スコア表
+    
+    各次元のスコアはリーダーとの割合の差の絶対値だけで決まるので、社員の割合0～100の整数ごとに
+    4次元×101通りを1回だけ計算しておき、社員は表引きで採点する（計算順も同じなので結果は
+    calculate_mbti_compatibilityと一致する）。整数でない・範囲外の割合はその都度計算する。
+    """
+    
+    DIMENSIONS = ('E', 'N', 'T', 'J')
+    VALUES = 101
+
+    def __init__(self, leader_values):
+        self.leader = dict(zip(self.DIMENSIONS, leader_values))
+        self.tables = {
+            dimension: [RankingEngine.compatibility_dimension_score(dimension, abs(float(value) - leader_value))
+                        for value in range(self.VALUES)]
+            for dimension, leader_value in self.leader.items()
+        }
+        # 割合の値で直接引く表（50と50.0は同じキーとして引ける）
+        self.lookups = tuple(dict(enumerate(self.tables[dimension])) for dimension in self.DIMENSIONS)
+        self._arrays = None
+
+    @classmethod
+    def for_leader(cls, leader_mbti):
+        """リーダーのMBTIに対する表（同じ割合のリーダーの表はウォームコンテナ内で使い回す）"""
+        leader_mbti = leader_mbti or {}
+        return cls._cached(tuple(float(leader_mbti.get(dimension, 50)) for dimension in cls.DIMENSIONS))
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _cached(cls, leader_values):
+        return cls(leader_values)
+
+    def dimension_score(self, dimension, value):
+        value = float(value)
+        if value.is_integer() and 0 <= value < self.VALUES:
+            return self.tables[dimension][int(value)]
+        return RankingEngine.compatibility_dimension_score(dimension, abs(value - self.leader[dimension]))
+
+    def total_score(self, mbti):
+        """calculate_mbti_compatibility(mbti, リーダー)['total_score']と同じ値"""
+        mbti = mbti or {}
+        e_table, n_table, t_table, j_table = self.lookups
+        e = e_table.get(mbti.get('E', 50))
+        n = n_table.get(mbti.get('N', 50))
+        t = t_table.get(mbti.get('T', 50))
+        j = j_table.get(mbti.get('J', 50))
+        if e is None or n is None or t is None or j is None:
+            # 表にない割合（小数・範囲外・文字列など）を含む社員は次元ごとに求める
+            e, n, t, j = (self.dimension_score(dimension, mbti.get(dimension, 50)) for dimension in self.DIMENSIONS)
+        return round(min(e + n + t + j, 1.0), 3)
+
+    def arrays(self):
+        """NumPy版エンジンで添字で引くための表"""
+        if self._arrays is None:
+            self._arrays = {dimension: np.array(table) for dimension, table in self.tables.items()}
+        return self._arrays
+
+
+class MbtiProfiles:
+    """社員のMBTI割合をプロファイルとしてまとめ、採点をプロファイルごとに1回だけ行う
+    
+    アンケートの割合は粗い整数なので、多くの社員が同じ割合の組を持つ。採点に使う割合
+    （E・I・N・S・T・J）の組をキーに、3次審査のスコアはカテゴリごと、4次審査のスコアは
+    リーダー・サブリーダーの組ごと、MBTI型はキーごとに、それぞれ上限件数のLRUで保持する
+    （CompatibilityTableと同じくfunctools.lru_cacheを使うので、並行して呼んでも壊れない）。
+    割合がない社員は1つのプロファイル（既定値50で採点、MBTI型はUnknown）にまとめる。
+    enabled=False（既定）ならプロファイルを使わず、社員ごとにその場で採点する。
+    """
+    
+    KEYS = ('E', 'I', 'N', 'S', 'T', 'J')
+
+    def __init__(self, max_entries, enabled=True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._fit = functools.lru_cache(maxsize=max_entries)(self._compute_fit)
+        self._compatibility = functools.lru_cache(maxsize=max_entries)(self._compute_compatibility)
+        self._type_code = functools.lru_cache(maxsize=max_entries)(self._compute_type_code)
+
+    @staticmethod
+    def key(mbti):
+        if not mbti:
+            return None
+        get = mbti.get
+        return (get('E', 50), get('I', 50), get('N', 50), get('S', 50), get('T', 50), get('J', 50))
+
+    @classmethod
+    def percentages(cls, key):
+        """キーから採点用の割合（採点はこの6つだけを既定値50で読む）"""
+        return dict(zip(cls.KEYS, key)) if key is not None else {}
+
+    @classmethod
+    def _compute_fit(cls, key, project_category):
+        return RankingEngine.calculate_mbti_fit(cls.percentages(key), project_category)
+
+    @classmethod
+    def _compute_compatibility(cls, key, leader_table, sub_leader_table):
+        mbti = cls.percentages(key)
+        leader_compat = leader_table.total_score(mbti)
+        sub_compat = sub_leader_table.total_score(mbti)
+        return leader_compat, sub_compat, round((leader_compat * 2 + sub_compat) / 3, 3)
+
+    @classmethod
+    def _compute_type_code(cls, key):
+        return RankingEngine.determine_mbti_type(cls.percentages(key))
+
+    def fit_score(self, mbti, project_category):
+        """RankingEngine.calculate_mbti_fitのプロファイル単位の結果"""
+        if not self.enabled:
+            return RankingEngine.calculate_mbti_fit(mbti or {}, project_category)
+        return self._fit(self.key(mbti), project_category)
+
+    def compatibility(self, mbti, leader_table, sub_leader_table):
+        """リーダー・サブリーダーとの相性と、4次審査の重み付きスコア"""
+        if not self.enabled:
+            leader_compat = leader_table.total_score(mbti)
+            sub_compat = sub_leader_table.total_score(mbti)
+            return leader_compat, sub_compat, round((leader_compat * 2 + sub_compat) / 3, 3)
+        return self._compatibility(self.key(mbti), leader_table, sub_leader_table)
+
+    def type_code(self, mbti):
+        """RankingEngine.determine_mbti_typeのプロファイル単位の結果"""
+        if not self.enabled:
+            return RankingEngine.determine_mbti_type(mbti)
+        return self._type_code(self.key(mbti))
+
+    @property
+    def computed(self):
+        """新規に採点した件数（LRUのミス数の合計）"""
+        return sum(cache.cache_info().misses for cache in (self._fit, self._compatibility, self._type_code))
+
+    def stats(self):
+        """有効か、保持中のプロファイル数と、採点の種類ごと・合計のヒット数とミス数（新規に採点した数）"""
+        infos = {'fit': self._fit.cache_info(), 'compatibility': self._compatibility.cache_info(),
+                 'type': self._type_code.cache_info()}
+        return {
+            'enabled': self.enabled,
+            'profiles': max(info.currsize for info in infos.values()),
+            'hits': sum(info.hits for info in infos.values()),
+            'misses': sum(info.misses for info in infos.values()),
+            'lookups': sum(info.hits + info.misses for info in infos.values()),
+            'computed': sum(info.misses for info in infos.values()),
+            'by_kind': {kind: {'hits': info.hits, 'misses': info.misses} for kind, info in infos.items()},
+        }
+
+
+mbti_profiles = MbtiProfiles(MBTI_PROFILE_MAX_ENTRIES, MBTI_PROFILES)
+
+
+class VectorRankingEngine:
+    """roleの社員を列（NumPy配列）に読み込み、0～4次審査をベクトル演算とマスクで行う審査エンジン
+    
+    審査結果はRankingEngine（社員dictごとのループ）と同じになるようにしている。
+    比較・四則演算は同じ順序で行い、round()と結果が変わりうる.5付近の値だけround()で丸め直す。
+    社員dictに審査結果を書き込むのは4次審査の上位候補者だけ。
+    """
+    
+    MBTI_KEYS = ('E', 'I', 'N', 'S', 'T', 'J')
+
+    @staticmethod
+    def to_float(value, default):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def load_columns(employees, role, project_category):
+        """社員dictのリストから審査用の列を作る"""
+        to_float = VectorRankingEngine.to_float
+        nan = float('nan')
+        levels, fits = [], []
+        for emp in employees:
+            features = EmployeeFeatures.of(emp)
+            levels.append(float(features['level']) if features is not None else nan)
+            fits.append(float(features['mbti_fit'][project_category])
+                        if features is not None and project_category in features['mbti_fit'] else nan)
+        mbti = [emp.get('mbti_percentages') or {} for emp in employees]
+        experience = [emp.get('経験', {}) for emp in employees]
+        
+        columns = {
+            'count': len(employees),
+            'time': np.array([to_float(emp.get('time', 0), 0.0) for emp in employees], dtype=float),
+            'motivation': np.array([to_float(emp.get('motivation_by_role', {}).get(role, 0), 0.0)
+                                    for emp in employees], dtype=float),
+            'level': np.array(levels, dtype=float),
+            'fit': np.array(fits, dtype=float),
+            'employee': employees.__getitem__,
+        }
+        for k in VectorRankingEngine.MBTI_KEYS:
+            columns[k] = np.array([float(m.get(k, 50)) for m in mbti], dtype=float)
+        
+        # 取り込み済みの特徴がない社員だけレベルを列から計算する
+        missing = np.isnan(columns['level'])
+        if missing.any():
+            rows = np.flatnonzero(missing)
+            level_inputs = {
+                'cert_score': VectorRankingEngine.certification_scores(
+                    [employees[i].get('certifications', []) for i in rows]),
+                'tenure': np.array([to_float(employees[i].get('勤続年数', 0), 0.0) for i in rows], dtype=float),
+                'has_experience': np.array([bool(experience[i]) for i in rows], dtype=bool),
+                'experience_years': np.array([sum(experience[i].values()) if experience[i] else 0
+                                              for i in rows], dtype=float),
+            }
+            columns['level'][rows] = VectorRankingEngine.employee_levels(level_inputs)
+        return columns
+
+    @staticmethod
+    def certification_scores(certifications_list):
+        """RankingEngine.certification_scoreの列版（資格IDの列から登録簿の加点を引く）"""
+        ids = certification_registry.ids
+        intern = certification_registry.intern
+        slots = ([], [], [])
+        for certifications in certifications_list:
+            for slot, values in enumerate(slots):  # 最大3つまで、なければID -1（加点0）
+                if len(certifications) > slot:
+                    cert = certifications[slot]
+                    cert_id = ids.get(cert)
+                    values.append(cert_id if cert_id is not None else intern(cert))
+                else:
+                    values.append(-1)
+        return VectorRankingEngine.certification_scores_by_id(slots)
+
+    @staticmethod
+    def certification_scores_by_id(slots):
+        """1～3つ目の資格IDの列（なければ-1）から資格スコアを計算"""
+        # 末尾に加点0を足して、ID -1がそれを引くようにする
+        points = np.array(certification_registry.points + [0.0], dtype=float)
+        cert_score = np.full(len(slots[0]), 0.3)
+        for cert_ids in slots:  # 1つ目から順に加点する
+            cert_score += points[np.asarray(cert_ids, dtype=np.intp)]
+        return np.minimum(cert_score, 1.0)
+
+    @staticmethod
+    def load_snapshot_columns(snapshot, role, project_category):
+        """列指向スナップショットのroleパーティションから、列をコピーせずに審査用の列を作る
+        
+        審査用特徴の列がない古いファイルや、特徴にないカテゴリならNone（load_columnsを使う）。
+        """
+        if role not in snapshot.directory['roles'] or not snapshot.has_features(role):
+            return None
+        if project_category not in EmployeeFeatures.CATEGORIES:
+            return None
+        
+        def column(name):
+            return np.frombuffer(snapshot.column(role, name), dtype=float)
+        
+        mbti = {k: column(f'mbti_{k}') for k in VectorRankingEngine.MBTI_KEYS}
+        columns = {
+            'count': snapshot.directory['roles'][role]['rows'],
+            # 欠損（NaN）は社員dictで属性がないときと同じ既定値にする
+            'time': np.nan_to_num(column('time'), nan=0.0),
+            'motivation': np.nan_to_num(column('motivation'), nan=0.0),
+            'level': column('feature_level'),
+            'fit': column(f'feature_fit_{EmployeeFeatures.CATEGORIES.index(project_category)}'),
+            'employee': snapshot.row_reader(role),
+        }
+        for k, values in mbti.items():
+            columns[k] = np.nan_to_num(values, nan=50.0)
+        return columns
+
+    @staticmethod
+    def snapshot_columns_by_role(project_data):
+        """EMPLOYEE_FETCH_MODE='snapshot'で、募集roleの列をスナップショットから直接作る
+        
+        load_employees_by_roleと同じく、絞り込み後に社員がいないroleはキー自体を持たない。
+        """
+        recruiting_roles = list(project_data.get('recruiting_roles', {}))
+        if not recruiting_roles:
+            return {}
+        project_category = project_data.get('category', '新規開発')
+        required_worktime = project_data.get('worktime', 20)
+        required_worktime = float(required_worktime) if required_worktime is not None else 20.0
+        
+        snapshot = DatabaseManager.open_employee_snapshot()
+        columns_by_role = {}
+        for role in recruiting_roles:
+            if role not in snapshot.directory['roles']:
+                continue
+            columns = VectorRankingEngine.load_snapshot_columns(snapshot, role, project_category)
+            if columns is None:
+                columns = VectorRankingEngine.load_columns(snapshot.role_employees(role), role, project_category)
+            if columns['count'] == 0:
+                continue
+            if EMPLOYEES_FILTER_PUSHDOWN and not VectorRankingEngine.screening_mask(columns, required_worktime).any():
+                continue
+            columns_by_role[role] = columns
+        return columns_by_role
+
+    @staticmethod
+    def screening_mask(columns, required_worktime):
+        """0次・1次審査をともに通過する行のマスク"""
+        return ((np.maximum(columns['time'], 0.0) >= required_worktime)
+                & (np.clip(columns['motivation'], 0.0, 5.0) >= RankingEngine.MOTIVATION_THRESHOLD))
+
+    @staticmethod
+    def round_like_python(values, digits):
+        """round(x, digits)と同じ丸め（np.roundは10**digits倍してから丸めるため、.5付近だけround()で丸め直す）"""
+        rounded = np.round(values, digits)
+        scaled = values * 10.0 ** digits
+        for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+            rounded[i] = round(float(values[i]), digits)
+        return rounded
+
+    @staticmethod
+    def employee_levels(inputs):
+        """RankingEngine.calculate_employee_levelの列版"""
+        tenure = inputs['tenure']
+        tenure_score = np.select(
+            [tenure == 0, tenure < 2, tenure < 4, tenure < 6, tenure < 8, tenure < 10],
+            [0.3, 0.4, 0.5, 0.6, 0.7, 0.8], default=0.9)
+        exp_score = np.where(inputs['has_experience'],
+                             np.minimum(0.3 + np.minimum(inputs['experience_years'] * 0.05, 0.6), 0.9), 0.3)
+        final_level = inputs['cert_score'] * 0.4 + tenure_score * 0.3 + exp_score * 0.3
+        return np.rint(final_level * 10) / 10
+
+    @staticmethod
+    def mbti_fit_scores(columns, rows, project_category):
+        """RankingEngine.calculate_mbti_fitの列版（取り込み済みの特徴があればそれを使う）"""
+        if project_category == '新規開発':
+            score = columns['N'][rows] / 100
+        elif project_category == '改善・保守':
+            score = (columns['S'][rows] * 2 + columns['I'][rows]) / 300
+        elif project_category == 'クライアント対応':
+            score = columns['E'][rows] / 100
+        else:
+            score = np.full(len(rows), 0.5)
+        fit = columns['fit'][rows]
+        return np.where(np.isnan(fit), VectorRankingEngine.round_like_python(score, 3), fit)
+
+    @staticmethod
+    def compatibility_scores(columns, rows, leader_mbti):
+        """RankingEngine.calculate_mbti_compatibilityの列版（total_scoreのみ、相性表を添字で引く）"""
+        table = CompatibilityTable.for_leader(leader_mbti)
+        arrays = table.arrays()
+        
+        def dimension_scores(k):
+            values = columns[k][rows]
+            if np.all((values == np.floor(values)) & (values >= 0) & (values < CompatibilityTable.VALUES)):
+                return arrays[k][values.astype(np.intp)]
+            diff = np.abs(values - table.leader[k])
+            if k in ('E', 'T'):  # E-I・T-F次元: 適度な差が理想
+                return np.where((20 <= diff) & (diff <= 60), 0.25, np.where(diff < 20, 0.15, 0.1))
+            return 0.25 * (1 - diff / 100)  # N-S・J-P次元: 同じ方向が理想
+        
+        total_score = dimension_scores('E') + dimension_scores('N') + dimension_scores('T') + dimension_scores('J')
+        return VectorRankingEngine.round_like_python(np.minimum(total_score, 1.0), 3)
+
+    @staticmethod
+    def screen_role(columns, role, required_count, project_data, project_category, leader_mbti, sub_leader_mbti):
+        """0～4次審査を行い、4次審査の上位候補者をRankingEngineと同じ形の社員dictで返す（0名ならNone）"""
+        required_worktime = project_data.get('worktime', 20)
+        required_worktime = float(required_worktime) if required_worktime is not None else 20.0
+        required_count_int = int(float(required_count)) if required_count is not None else 0
+        
+        # 0次審査: 稼働時間 / 1次審査: やる気
+        available_time = np.maximum(columns['time'], 0.0)
+        passed = available_time >= required_worktime
+        logger.info(f"【0次審査】{columns['count']}名 → {int(passed.sum())}名")
+        if not passed.any():
+            return None
+        motivation = np.clip(columns['motivation'], 0.0, 5.0)
+        passed &= motivation >= RankingEngine.MOTIVATION_THRESHOLD
+        logger.info(f"【1次審査】→ {int(passed.sum())}名")
+        if not passed.any():
+            return None
+        
+        # 2次審査: レベルマッチング
+        required_level, level_range = RankingEngine.level_requirement(project_data, role)
+        passed &= np.abs(columns['level'] - required_level) <= level_range
+        rows = np.flatnonzero(passed)
+        logger.info(f"【2次審査】Role: {role} 要求レベル: {required_level:.1f} (±{level_range:.1f}) → {len(rows)}名")
+        if not len(rows):
+            return None
+        
+        # 3次審査: MBTI適性の上位10×募集人数（同点は元の順序のまま）
+        stage3_scores = VectorRankingEngine.mbti_fit_scores(columns, rows, project_category)
+        order = top_k_indices(stage3_scores, 10 * required_count_int)
+        rows, stage3_scores = rows[order], stage3_scores[order]
+        logger.info(f"3次審査: 上位{len(rows)}名を選出")
+        if not len(rows):
+            return None
+        
+        # 4次審査: リーダー相性の上位5×募集人数
+        leader = VectorRankingEngine.compatibility_scores(columns, rows, leader_mbti)
+        sub_leader = VectorRankingEngine.compatibility_scores(columns, rows, sub_leader_mbti)
+        stage4_scores = VectorRankingEngine.round_like_python((leader * 2 + sub_leader) / 3, 3)
+        selected = top_k_indices(stage4_scores, 5 * required_count_int)
+        logger.info(f"4次審査: 上位{len(selected)}名を選出")
+        
+        candidates = []
+        for stage4_rank, position in enumerate(selected.tolist(), 1):
+            row = int(rows[position])
+            emp = dict(columns['employee'](row))
+            employee_level = float(columns['level'][row])
+            level_diff = abs(employee_level - required_level)
+            emp['stage0_passed'] = True
+            # 審査詳細の値はRankingEngineと同じ式で作る（上下限に当たるとintになる）
+            emp['stage0_details'] = {'available_time': max(0, float(columns['time'][row]))}
+            emp['stage1_passed'] = True
+            emp['stage1_details'] = {'motivation_level': max(0, min(5, float(columns['motivation'][row])))}
+            emp['stage2_score'] = employee_level
+            emp['stage2_details'] = {
+                'employee_level': employee_level,
+                'required_level': required_level,
+                'level_range': level_range,
+                'level_diff': round(level_diff, 3),
+                'within_range': True
+            }
+            emp['stage2_passed'] = True
+            emp['stage3_score'] = float(stage3_scores[position])
+            emp['stage3_rank'] = position + 1
+            emp['stage4_score'] = float(stage4_scores[position])
+            emp['stage4_details'] = {
+                'leader_compatibility': float(leader[position]),
+                'sub_leader_compatibility': float(sub_leader[position])
+            }
+            emp['stage4_rank'] = stage4_rank
+            candidates.append(emp)
+        return candidates
+
+
+class ScreeningStage:
+    """1名ずつ判定できる絞り込み審査（ScreeningStageRegistryに登録して融合評価で使う）
+    
+    prepare(project_data, role)でrole単位の判定条件を作り、judge(emp, params)は通過なら
+    社員に書き込む審査結果のdict、不通過ならNoneを返す。costは1名あたりの相対的な判定コスト。
+    """
+    
+    # 通過率の観測数がこれに満たないうちは事前値（0.5）を使う
+    MIN_OBSERVATIONS = 100
+    PRIOR_PASS_RATE = 0.5
+
+    def __init__(self, name, cost, prepare, judge):
+        self.name = name
+        self.cost = cost
+        self.prepare = prepare
+        self.judge = judge
+        self.evaluated = 0
+        self.passed = 0
+
+    def pass_rate(self):
+        if self.evaluated < self.MIN_OBSERVATIONS:
+            return self.PRIOR_PASS_RATE
+        return self.passed / self.evaluated
+
+    def rank(self):
+        """小さいほど先に評価する（コストあたりの除外数の逆数）"""
+        return self.cost / max(1.0 - self.pass_rate(), 0.01)
+
+
+class ScreeningStageRegistry:
+    """絞り込み審査の登録先と、選択性順に1名ずつ短絡評価する融合評価器
+    
+    審査の評価順は、宣言されたコストとウォームコンテナ内で観測した通過率から毎回決める。
+    審査結果は評価順によらず登録順に書き込むので、審査ごとにリストを作る場合と同じ社員dictになる。
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.lock = threading.Lock()
+
+    def register(self, stage):
+        self.stages.append(stage)
+        return stage
+
+    def screening_order(self):
+        return sorted(self.stages, key=lambda stage: stage.rank())
+
+    def fused_screening(self, employees, project_data, role):
+        """登録された全審査を通過した社員（複製して審査結果を書き込む、元の順序のまま）"""
+        ordered = [(stage, stage.prepare(project_data, role)) for stage in self.screening_order()]
+        rejected = {stage.name: 0 for stage, _ in ordered}
+        
+        passed = []
+        for emp in employees:
+            results = {}
+            for stage, params in ordered:
+                fields = stage.judge(emp, params)
+                if fields is None:
+                    rejected[stage.name] += 1
+                    break
+                results[stage.name] = fields
+            else:
+                # 取得元（キャッシュ等）の社員を書き換えないよう、通過者だけ浅く複製する
+                emp = dict(emp)
+                for stage in self.stages:
+                    emp.update(results[stage.name])
+                passed.append(emp)
+        
+        # 各審査まで進んだ人数は、先に評価した審査の除外数を引いて求める
+        with self.lock:
+            remaining = len(employees)
+            for stage, _ in ordered:
+                stage.evaluated += remaining
+                stage.passed += remaining - rejected[stage.name]
+                remaining -= rejected[stage.name]
+        
+        logger.info(f"【0～2次審査（融合）】Role: {role} 順序: {' → '.join(stage.name for stage, _ in ordered)} "
+                    f"除外: {rejected} / {len(employees)}名 → {len(passed)}名")
+        return passed
+
+    def report(self):
+        """審査ごとのコスト・観測した通過率と、現在の評価順"""
+        return [
+            {
+                'stage': stage.name,
+                'cost': stage.cost,
+                'evaluated': stage.evaluated,
+                'passed': stage.passed,
+                'pass_rate': round(stage.pass_rate(), 4),
+            }
+            for stage in self.screening_order()
+        ]
+
+
+def worktime_requirement(project_data, role):
+    worktime = project_data.get('worktime', 20)
+    return float(worktime) if worktime is not None else 20.0
+
+
+def level_stage_requirement(project_data, role):
+    return (role,) + RankingEngine.level_requirement(project_data, role)
+
+
+def judge_level(emp, params):
+    fields = RankingEngine.level_fields(emp, *params)
+    return fields if fields.get('stage2_passed') else None
+
+
+# 0～2次審査（登録順が審査結果の書き込み順）
+screening_stages = ScreeningStageRegistry()
+screening_stages.register(ScreeningStage('worktime', 1.0, worktime_requirement, RankingEngine.worktime_fields))
+screening_stages.register(ScreeningStage('motivation', 1.5, lambda project_data, role: role,
+                                         RankingEngine.motivation_fields))
+screening_stages.register(ScreeningStage('level', 6.0, level_stage_requirement, judge_level))
+
+
+class EmployeeFeatures:
+    """プロジェクトに依存しない社員の審査用特徴（社員の書き込み時に計算してfeatures属性に保存）
+    
+    保存した特徴はRankingEngineの2次審査（レベル）と3次審査（カテゴリ別MBTI適性）で
+    再計算の代わりに使う。算出方法を変えたらVERSIONを上げて取り込み直す。
+    特徴には算出元の属性の内容（source）を持たせ、変更イベントを経ずに社員が書き換えられて
+    内容が一致しなくなった特徴は使わない（EmployeeLevelCache.fingerprintと同じく内容そのものを比べる）。
+    """
+    
+    ATTRIBUTE = 'features'
+    VERSION = 2
+    CATEGORIES = ('新規開発', '改善・保守', 'クライアント対応')
+    # 特徴の算出に使う属性（sourceに保存して比べる）
+    SOURCE_ATTRIBUTES = ('certifications', '勤続年数', '経験', 'mbti_percentages')
+
+    @staticmethod
+    def source(employee):
+        """特徴の算出に使う属性の内容（DynamoDBに保存できるようリストで持つ）"""
+        get = employee.get
+        return [get('certifications'), get('勤続年数'), get('経験'), get('mbti_percentages')]
+
+    @staticmethod
+    def compute(employee):
+        """社員1名分の特徴を計算"""
+        tenure_score = RankingEngine.tenure_score(employee.get('勤続年数', 0))
+        mbti = employee.get('mbti_percentages', {
+            'E': 50, 'I': 50, 'N': 50, 'S': 50,
+            'T': 50, 'F': 50, 'J': 50, 'P': 50
+        })
+        return {
+            'version': EmployeeFeatures.VERSION,
+            'source': copy.deepcopy(EmployeeFeatures.source(employee)),
+            'level': RankingEngine.calculate_employee_level(employee, None),
+            'cert_score': RankingEngine.certification_score(employee.get('certifications', [])),
+            'tenure_bucket': int(round((tenure_score - 0.3) * 10)),
+            'exp_score': RankingEngine.experience_score(employee.get('経験', {})),
+            'mbti_fit': {
+                category: RankingEngine.calculate_mbti_fit(mbti, category)
+                for category in EmployeeFeatures.CATEGORIES
+            },
+        }
+
+    @staticmethod
+    def of(employee):
+        """現行バージョンの保存済み特徴（未取り込み・旧バージョン・算出元の属性が変わっていればNone）"""
+        features = employee.get(EmployeeFeatures.ATTRIBUTE)
+        if (isinstance(features, dict) and features.get('version') == EmployeeFeatures.VERSION
+                and features.get('source') == EmployeeFeatures.source(employee)):
+            return features
+        return None
 
     @staticmethod
-    def calculate_mbti_compatibility(mbti1, mbti2, role_name=''):
-        """MBTI相性計算"""
-        total_score = 0
-        details = {'role': role_name, 'dimensions': {}}
-        
-        # Decimal型を確実にfloat型に変換
-        mbti1 = decimal_to_float(mbti1) if mbti1 else {}
-        mbti2 = decimal_to_float(mbti2) if mbti2 else {}
-        
-        # E-I次元: 適度な差が理想
-        e1, e2 = float(mbti1.get('E', 50)), float(mbti2.get('E', 50))
-        ei_diff = abs(e1 - e2)
-        if 20 <= ei_diff <= 60:
-            ei_score = 0.25
-        elif ei_diff < 20:
-            ei_score = 0.15
+    def ingest(employee_ids=None):
+        """社員の特徴を計算して保存する取り込みジョブ（employee_ids未指定なら全社員）"""
+        if employee_ids is None:
+            employees = DatabaseManager.fetch_employees(projection=DatabaseManager.scoring_projection())
         else:
-            ei_score = 0.1
-        total_score += ei_score
-        
-        # N-S次元: 同じ方向が理想
-        n1, n2 = float(mbti1.get('N', 50)), float(mbti2.get('N', 50))
-        ns_diff = abs(n1 - n2)
-        ns_score = 0.25 * (1 - ns_diff / 100)
-        total_score += ns_score
-        
-        # T-F次元: 適度な差が理想
-        t1, t2 = float(mbti1.get('T', 50)), float(mbti2.get('T', 50))
-        tf_diff = abs(t1 - t2)
-        if 20 <= tf_diff <= 60:
-            tf_score = 0.25
-        elif tf_diff < 20:
-            tf_score = 0.15
-        else:
-            tf_score = 0.1
-        total_score += tf_score
-        
-        # J-P次元: 同じ方向が理想
-        j1, j2 = float(mbti1.get('J', 50)), float(mbti2.get('J', 50))
-        jp_diff = abs(j1 - j2)
-        jp_score = 0.25 * (1 - jp_diff / 100)
-        total_score += jp_score
+            employees = list(DatabaseManager.batch_get_employees(employee_ids, SCORING_ATTRIBUTES).values())
         
-        return {'total_score': round(min(total_score, 1.0), 3)}
+        features_by_id = {
+            emp.get('employee_id'): EmployeeFeatures.compute(emp)
+            for emp in employees if emp.get('employee_id') is not None
+        }
+        if features_by_id:
+            get_repository().put_employee_features(features_by_id)
+            employee_snapshot_cache.invalidate()
+        logger.info(f"Ingested features for {len(features_by_id)} employees")
+        return len(features_by_id)
 
-    @staticmethod
-    def stage4_compatibility_scoring(employees, leader_mbti, sub_leader_mbti):
-        """4次審査: リーダー相性"""
-        scored_employees = []
-        
-        # Decimal型を確実にfloat型に変換
-        leader_mbti = decimal_to_float(leader_mbti) if leader_mbti else {}
-        sub_leader_mbti = decimal_to_float(sub_leader_mbti) if sub_leader_mbti else {}
-        
-        for emp in employees:
-            emp_mbti = decimal_to_float(emp.get('mbti_percentages', {}))
-            
-            leader_compat = RankingEngine.calculate_mbti_compatibility(emp_mbti, leader_mbti, 'リーダー')
-            sub_compat = RankingEngine.calculate_mbti_compatibility(emp_mbti, sub_leader_mbti, 'サブリーダー')
-            
-            weighted_score = (leader_compat['total_score'] * 2 + sub_compat['total_score']) / 3
-            
-            emp['stage4_score'] = round(weighted_score, 3)
-            emp['stage4_details'] = {
-                'leader_compatibility': leader_compat['total_score'],
-                'sub_leader_compatibility': sub_compat['total_score']
-            }
-            scored_employees.append(emp)
-        
-        logger.info(f"【4次審査】リーダー相性評価完了 - {len(scored_employees)}名")
-        return scored_employees
 
-    @staticmethod
-    def select_top_candidates_stage4(employees, top_n):
-        """4次審査の上位候補者選出"""
-        # Decimal型対応：top_nを整数に変換
-        top_n = int(float(top_n)) if top_n is not None else 0
-        sorted_emp = sorted(employees, key=lambda x: x.get('stage4_score', 0), reverse=True)
-        selected = sorted_emp[:min(top_n, len(sorted_emp))]
-        
-        for rank, emp in enumerate(selected, 1):
-            emp['stage4_rank'] = rank
-        
-        logger.info(f"4次審査: 上位{len(selected)}名を選出")
-        return selected
+class RoleIndexStore:
+    """審査に使うrole別の社員索引（変更イベントで1件ずつ差分更新する）
+    
+    roleごとに、社員ID順に並んだ審査用属性（特徴付き）、レベルの昇順索引、
+    MBTIタイプ別の社員IDバケットを持つ。全件スキャンで一度構築した後は
+    DynamoDB Streams形式のレコードを適用するだけで最新に保つ（変更件数に比例したコスト）。
+    """
+    
+    def __init__(self):
+        self.roles = {}
+        self.role_of = {}
+        self.events_offset = 0
+        self.lock = threading.Lock()
+        # 差分更新ごとに(employee_id, 社員 or 削除時None)で呼ばれる関数
+        self.listeners = []
 
-    @staticmethod
-    def calculate_final_scores(employees):
-        """最終スコア計算"""
-        scored_employees = []
+    def build(self, employees):
+        """全件から構築し直す"""
+        with self.lock:
+            self.roles = {}
+            self.role_of = {}
+            for emp in employees:
+                self._insert(emp)
+        logger.info(f"Built role index: {len(self.role_of)} employees, {len(self.roles)} roles")
+        return self
+
+    def _partition(self, role):
+        return self.roles.setdefault(role, {'employees': {}, 'levels': [], 'mbti': {}})
+
+    def _insert(self, emp):
+        employee_id = emp.get('employee_id')
+        if employee_id is None:
+            return
+        if EmployeeFeatures.of(emp) is None:
+            emp = dict(emp, **{EmployeeFeatures.ATTRIBUTE: EmployeeFeatures.compute(emp)})
+        role = emp.get('role', 'Unknown')
+        partition = self._partition(role)
+        partition['employees'][employee_id] = emp
+        bisect.insort(partition['levels'], (emp[EmployeeFeatures.ATTRIBUTE]['level'], employee_id))
+        mbti_type = mbti_profiles.type_code(emp.get('mbti_percentages'))
+        partition['mbti'].setdefault(mbti_type, set()).add(employee_id)
+        self.role_of[employee_id] = role
+
+    def _unindex(self, partition, employee_id):
+        """レベル索引とMBTIバケットから外す（社員dictは残す）"""
+        emp = partition['employees'][employee_id]
+        levels = partition['levels']
+        i = bisect.bisect_left(levels, (emp[EmployeeFeatures.ATTRIBUTE]['level'], employee_id))
+        if i < len(levels) and levels[i][1] == employee_id:
+            del levels[i]
+        mbti_type = mbti_profiles.type_code(emp.get('mbti_percentages'))
+        partition['mbti'].get(mbti_type, set()).discard(employee_id)
+
+    def _delete(self, employee_id):
+        role = self.role_of.pop(employee_id, None)
+        if role is None:
+            return
+        self._unindex(self.roles[role], employee_id)
+        del self.roles[role]['employees'][employee_id]
+
+    def upsert(self, emp):
+        """社員1件を追加・置き換え（roleが同じなら登録順の位置を保つ）"""
+        employee_id = emp.get('employee_id')
+        with self.lock:
+            role = self.role_of.get(employee_id)
+            if role is not None and role == emp.get('role', 'Unknown'):
+                self._unindex(self.roles[role], employee_id)
+            else:
+                self._delete(employee_id)
+            self._insert(emp)
+            emp = self.roles[self.role_of[employee_id]]['employees'][employee_id] if employee_id in self.role_of else None
+        self._notify(employee_id, emp)
+
+    def remove(self, employee_id):
+        with self.lock:
+            self._delete(employee_id)
+        self._notify(employee_id, None)
+
+    def _notify(self, employee_id, emp):
+        for listener in self.listeners:
+            listener(employee_id, emp)
+
+    def apply(self, records):
+        """DynamoDB Streams形式のレコード（INSERT/MODIFY/REMOVE）を順に適用
         
-        for emp in employees:
-            stage3_score = emp.get('stage3_score', 0)
-            stage4_score = emp.get('stage4_score', 0)
-            
-            final_score = 0.4 * stage3_score + 0.6 * stage4_score
-            emp['final_score'] = round(final_score, 4)
-            
-            # グレード判定
-            if final_score >= 0.8:
-                emp['final_grade'] = 'S'
-                emp['grade_description'] = '最優秀候補'
-            elif final_score >= 0.7:
-                emp['final_grade'] = 'A'
-                emp['grade_description'] = '優秀候補'
-            elif final_score >= 0.6:
-                emp['final_grade'] = 'B'
-                emp['grade_description'] = '良好候補'
-            elif final_score >= 0.5:
-                emp['final_grade'] = 'C'
-                emp['grade_description'] = '標準候補'
+        NewImageを含まないレコード（KEYS_ONLYのストリーム）は社員を取得し直して反映する
+        （索引はプロジェクトに依らないので、やる気は全roleのキーを取得する）。
+        """
+        refetch = []
+        for record in records:
+            data = record.get('dynamodb', {})
+            employee_id = deserialize_image(data.get('Keys')).get('employee_id')
+            if record.get('eventName') == 'REMOVE':
+                self.remove(employee_id)
+            elif 'NewImage' in data:
+                self.upsert(deserialize_image(data['NewImage']))
             else:
-                emp['final_grade'] = 'D'
-                emp['grade_description'] = '要検討候補'
-            
-            scored_employees.append(emp)
+                refetch.append(employee_id)
         
-        logger.info(f"【最終スコア計算完了】{len(scored_employees)}名")
-        return scored_employees
+        if refetch:
+            employees = DatabaseManager.batch_get_employees(refetch, SCORING_ATTRIBUTES + ('motivation_by_role',))
+            for employee_id in refetch:
+                if employee_id in employees:
+                    self.upsert(employees[employee_id])
+                else:
+                    self.remove(employee_id)
+        return len(records)
 
-    @staticmethod
-    def determine_mbti_type(mbti_percentages):
-        """MBTI型判定"""
-        if not mbti_percentages:
-            return "Unknown"
-        
-        # Decimal型を確実にfloat型に変換
-        mbti_percentages = decimal_to_float(mbti_percentages)
+    def follow(self, path):
+        """イベントファイルの前回位置以降に追記されたレコードを適用"""
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            f.seek(self.events_offset)
+            lines = f.readlines()
+            # 書き込み途中の最終行は次回に回す
+            if lines and not lines[-1].endswith('\n'):
+                lines.pop()
+            self.events_offset += sum(len(line.encode('utf-8')) for line in lines)
+        applied = self.apply([json.loads(line) for line in lines if line.strip()])
+        if applied:
+            logger.info(f"Applied {applied} employee change events from {path}")
+        return applied
+
+    def role_employees(self, role):
+        """roleの社員（特徴付き）を登録順に返す"""
+        with self.lock:
+            return list(self.roles.get(role, {}).get('employees', {}).values())
+
+    def level_between(self, role, low, high):
+        """レベルがlow以上high以下の社員IDをレベル昇順に返す"""
+        with self.lock:
+            levels = self.roles.get(role, {}).get('levels', [])
+            start = bisect.bisect_left(levels, low, key=lambda entry: entry[0])
+            end = bisect.bisect_right(levels, high, key=lambda entry: entry[0])
+            return [employee_id for _, employee_id in levels[start:end]]
+
+    def mbti_bucket(self, role, mbti_type):
+        """MBTIタイプが一致する社員ID"""
+        with self.lock:
+            return set(self.roles.get(role, {}).get('mbti', {}).get(mbti_type, ()))
+
+
+def get_role_index_store():
+    """role別索引を初回に全件から構築し、以降はイベントファイルの追記分だけ適用して返す"""
+    global role_index_store
+    if role_index_store is None:
+        store = RoleIndexStore()
+        # 構築前の位置から追従する（構築中に追記されたイベントは再適用しても結果は同じ）
+        if EMPLOYEE_EVENTS_PATH and os.path.exists(EMPLOYEE_EVENTS_PATH):
+            store.events_offset = os.path.getsize(EMPLOYEE_EVENTS_PATH)
+        projection = DatabaseManager.scoring_projection() if EMPLOYEES_PROJECTION else None
+        role_index_store = store.build(DatabaseManager.fetch_employees(projection=projection))
+    role_index_store.follow(EMPLOYEE_EVENTS_PATH)
+    return role_index_store
+
+
+def request_etag(event):
+    """呼び出し側が送ってきたETag（event['if_none_match']またはIf-None-Matchヘッダー）"""
+    if event.get('if_none_match'):
+        return event['if_none_match']
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == 'if-none-match':
+            return value
+    return None
+
+
+def compute_candidate_sets(project_id, project_item=None):
+    """ランキングとチーム候補セット生成を実行（プロジェクトがなければエラーdict）"""
+    ranking_results = process_all_roles(project_id, project_item=project_item)
+    if 'error' in ranking_results:
+        return ranking_results
+    return generate_candidate_sets(ranking_results)
+
+
+def refresh_cached_candidate_sets(project_id, cache):
+    """現在のバージョンで計算し直して結果キャッシュに保存"""
+    versions, project_item = DatabaseManager.fetch_versioned_project(project_id)
+    team_sets = compute_candidate_sets(project_id, project_item)
+    if versions is not None and 'error' not in team_sets:
+        cache.put(project_id, versions, team_sets)
+    return team_sets
+
+
+def process_project_change_events(records):
+    """プロジェクトテーブルの変更イベントを処理（DynamoDB Streamsトリガー）
+    
+    変更されたプロジェクトの結果キャッシュを事前に計算し直し、常時保持中なら登録し直す。
+    削除されたプロジェクトはキャッシュ・登録から外す。
+    """
+    cache = get_result_cache()
+    project_ids = list(dict.fromkeys(
+        (deserialize_image(record.get('dynamodb', {}).get('Keys')).get('project_id'),
+         record.get('eventName') == 'REMOVE')
+        for record in records))
+    for project_id, removed in project_ids:
+        if removed:
+            if cache is not None:
+                cache.delete(project_id)
+            if standing_rankings is not None:
+                standing_rankings.unregister(project_id)
+            continue
+        if cache is not None:
+            refresh_cached_candidate_sets(project_id, cache)
+        if standing_rankings is not None and standing_rankings.has(project_id):
+            standing_rankings.register(project_id)
+    logger.info(f"Processed {len(records)} project change events")
+    return {'processed': len(records)}
+
+
+def process_employee_change_events(records):
+    """社員テーブルの変更イベントを処理（DynamoDB Streamsトリガー）
+    
+    このコンテナの索引に適用し、イベントファイルに追記して他のコンテナに伝え、
+    書き込まれた社員の特徴が古ければ取り込み直す（特徴の書き込み自体のイベントでは再計算しない）。
+    """
+    if role_index_store is not None:
+        role_index_store.apply(records)
+        if standing_rankings is not None:
+            for project_id in list(standing_rankings.projects):
+                standing_rankings.team_sets(project_id)
+    if EMPLOYEE_EVENTS_PATH:
+        with open(EMPLOYEE_EVENTS_PATH, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+    employee_snapshot_cache.invalidate()
+    for record in records:
+        employee_id = deserialize_image(record.get('dynamodb', {}).get('Keys', {})).get('employee_id')
+        if employee_id is not None:
+            employee_level_cache.invalidate(employee_id)
+    
+    stale = {}
+    for record in records:
+        if record.get('eventName') == 'REMOVE' or 'NewImage' not in record.get('dynamodb', {}):
+            continue
+        emp = deserialize_image(record['dynamodb']['NewImage'])
+        features = EmployeeFeatures.compute(emp)
+        if emp.get(EmployeeFeatures.ATTRIBUTE) != features:
+            stale[emp.get('employee_id')] = features
+    if stale:
+        get_repository().put_employee_features(stale)
+    logger.info(f"Processed {len(records)} employee change events ({len(stale)} features updated)")
+    return {'processed': len(records), 'features_updated': len(stale)}
+
+
+class StandingRankings:
+    """登録した募集中プロジェクトのrole別審査結果を保持し、社員の変更分だけ再評価する
+    
+    role別索引（RoleIndexStore）の差分更新を受けて、変更された社員だけを各プロジェクトの
+    0～3次審査にかけ直し、影響のあったroleの4次審査以降とチーム候補セットを作り直す。
+    登録済みプロジェクトの読み出しは保持済みの結果を返すだけになる。
+    プロジェクトレコード自体の変更は反映しないため、変更時は登録し直す。
+    """
+    
+    def __init__(self, store):
+        self.store = store
+        self.projects = {}
+        self.lock = threading.RLock()
+        store.listeners.append(self.on_employee_change)
+
+    def register(self, project_id):
+        """プロジェクトを登録し、索引の全社員で審査結果を作る（見つからなければFalse）"""
+        project_data = DatabaseManager.fetch_project(project_id)
+        if not project_data:
+            return False
         
-        mbti_type = ""
-        mbti_type += 'E' if float(mbti_percentages.get('E', 50)) >= 50 else 'I'
-        mbti_type += 'N' if float(mbti_percentages.get('N', 50)) >= 50 else 'S'
-        mbti_type += 'T' if float(mbti_percentages.get('T', 50)) >= 50 else 'F'
-        mbti_type += 'J' if float(mbti_percentages.get('J', 50)) >= 50 else 'P'
+        recruiting_roles = project_data.get('recruiting_roles', {})
+        pipeline = StreamingRankingPipeline(
+            project_data, recruiting_roles, project_data.get('category', '新規開発'))
+        state = {
+            'project_data': project_data,
+            'pipeline': pipeline,
+            # role -> {employee_id: 登録順}（索引の並びと同じ順序で同点を並べるため全員分持つ）
+            'order': {role: {} for role in recruiting_roles},
+            # role -> {employee_id: (登録順, 3次審査までのスコア付き社員)}
+            'survivors': {role: {} for role in recruiting_roles},
+            'seq': 0,
+            'dirty': set(recruiting_roles),
+            'role_results': {},
+            'ranking_results': None,
+            'team_sets': None,
+        }
+        for role in recruiting_roles:
+            for emp in self.store.role_employees(role):
+                self._screen(state, role, emp)
         
-        return mbti_type
+        with self.lock:
+            self.projects[project_id] = state
+            self._refresh(project_id)
+        logger.info(f"Registered open project {project_id}")
+        return True
 
-    @staticmethod
-    def create_final_candidate_list(employees, role, required_count):
-        """最終候補者リスト作成"""
-        sorted_employees = sorted(employees, key=lambda x: x.get('final_score', 0), reverse=True)
+    def unregister(self, project_id):
+        with self.lock:
+            return self.projects.pop(project_id, None) is not None
+
+    def has(self, project_id):
+        return project_id in self.projects
+
+    def _screen(self, state, role, emp):
+        """1名を0～3次審査にかけ、通過すれば保持（既にroleにいる社員は登録順を引き継ぐ）"""
+        employee_id = emp.get('employee_id')
+        order = state['order'][role]
+        if employee_id not in order:
+            order[employee_id] = state['seq']
+            state['seq'] += 1
+        _, emp = state['pipeline'].screen(emp, role)
+        if emp is not None:
+            state['survivors'][role][employee_id] = (order[employee_id], emp)
+            return True
+        return False
+
+    def on_employee_change(self, employee_id, emp):
+        """索引で社員が追加・変更・削除されたときに各プロジェクトの該当roleを再評価"""
+        role = emp.get('role', 'Unknown') if emp is not None else None
+        with self.lock:
+            for state in self.projects.values():
+                for old_role, order in state['order'].items():
+                    if old_role != role and employee_id in order:
+                        del order[employee_id]
+                        state['survivors'][old_role].pop(employee_id, None)
+                        state['dirty'].add(old_role)
+                
+                if role in state['order']:
+                    was_survivor = state['survivors'][role].pop(employee_id, None) is not None
+                    is_new = employee_id not in state['order'][role]
+                    if self._screen(state, role, emp) or was_survivor or is_new:
+                        state['dirty'].add(role)
+                
+                # リーダー・サブリーダーの変更は全roleの4次審査に影響する
+                project_data = state['project_data']
+                for key in ('leader', 'sub_leader'):
+                    if project_data.get(key) == employee_id:
+                        project_data[f'{key}_mbti'] = {
+                            'percentages': (emp or {}).get('mbti_percentages', {})
+                        }
+                        state['dirty'].update(state['order'])
+
+    def _refresh(self, project_id):
+        """変更のあったroleだけ4次審査以降をやり直し、結果とチーム候補セットを作り直す"""
+        state = self.projects[project_id]
+        if not state['dirty'] and state['team_sets'] is not None:
+            return
         
-        candidates = []
-        for rank, emp in enumerate(sorted_employees, 1):
-            candidate_info = {
-                'rank': rank,
-                'employee_id': emp.get('employee_id'),
-                'employee_name': emp.get('name'),
-                'role': role,
-                'final_score': emp.get('final_score', 0),
-                'grade': emp.get('final_grade', 'D'),
-                'grade_description': emp.get('grade_description', ''),
-                'mbti_type': RankingEngine.determine_mbti_type(emp.get('mbti_percentages', {})),
-                'scores': {
-                    'level': emp.get('stage2_score', 0),
-                    'mbti_fitness': emp.get('stage3_score', 0),
-                    'leader_compatibility': emp.get('stage4_score', 0)
-                },
-                'details': {
-                    'motivation': emp.get('stage1_details', {}).get('motivation_level', 0),
-                    'worktime': emp.get('stage0_details', {}).get('available_time', 0),
-                    'certifications': emp.get('certifications', []),
-                    'tenure_years': emp.get('勤続年数', 0)
-                }
-            }
-            candidates.append(candidate_info)
+        project_data = state['project_data']
+        recruiting_roles = project_data.get('recruiting_roles', {})
+        leader_mbti = project_data.get('leader_mbti', {}).get('percentages', {})
+        sub_leader_mbti = project_data.get('sub_leader_mbti', {}).get('percentages', {})
+        for role in state['dirty']:
+            required_count = recruiting_roles[role]
+            if not state['order'][role]:
+                state['role_results'][role] = None
+                continue
+            # 登録順を保った安定ソートと同じ並びで上位10×募集人数を取る
+            required_count_int = int(float(required_count)) if required_count is not None else 0
+            ranked = heapq.nlargest(
+                10 * required_count_int, state['survivors'][role].values(),
+                key=lambda entry: (entry[1].get('stage3_score', 0), -entry[0]))
+            candidates = RankingEngine.select_top_candidates_stage3(
+                [emp for _, emp in ranked], 10 * required_count_int)
+            state['role_results'][role] = finalize_role_screening(
+                candidates, role, required_count, leader_mbti, sub_leader_mbti)
+        state['dirty'] = set()
         
-        return {
-            'role': role,
-            'required_count': required_count,
-            'total_candidates': len(sorted_employees),
-            'candidates': candidates
-        }
+        all_results = new_ranking_results(project_id, project_data)
+        for role, required_count in recruiting_roles.items():
+            role_result = state['role_results'].get(role)
+            if role_result is None:
+                all_results['roles'][role] = RankingEngine.create_empty_candidate_list(role, required_count)
+                continue
+            # 保持中の結果を書き換えないよう複製して氏名を埋める
+            record_role_result(all_results, role, copy.deepcopy(role_result))
+        DatabaseManager.hydrate_candidates(all_results['roles'])
+        state['ranking_results'] = all_results
+        state['team_sets'] = generate_candidate_sets(copy.deepcopy(all_results))
+
+    def ranking_results(self, project_id):
+        with self.lock:
+            self._refresh(project_id)
+            return self.projects[project_id]['ranking_results']
+
+    def team_sets(self, project_id):
+        with self.lock:
+            self._refresh(project_id)
+            return self.projects[project_id]['team_sets']
+
+
+def get_standing_rankings():
+    """登録済みプロジェクトの審査結果（初回にOPEN_PROJECT_IDSを登録、以降は索引の追従分を反映）"""
+    global standing_rankings
+    store = get_role_index_store()
+    if standing_rankings is None:
+        standing_rankings = StandingRankings(store)
+        for project_id in OPEN_PROJECT_IDS:
+            standing_rankings.register(project_id)
+    return standing_rankings
+
+
+def top_k(items, k, key):
+    """keyの降順で上位k件（sorted(items, key=key, reverse=True)[:k]と同じ並び、同点は元の順序）
+    
+    kが件数に比べて小さければ大きさkのヒープで選び、全件は並べ替えない。
+    """
+    k = max(0, int(k))
+    if k == 0:
+        return []
+    return heapq.nlargest(k, items, key=key)
 
-    @staticmethod
-    def create_empty_candidate_list(role, required_count):
-        """空の候補者リスト作成"""
-        return {
-            'role': role,
-            'required_count': required_count,
-            'total_candidates': 0,
-            'candidates': [],
-            'message': '審査を通過した候補者がいません'
-        }
+
+def top_k_indices(scores, k):
+    """NumPy配列の降順で上位k件の添字（np.argsort(-scores, kind='stable')[:k]と同じ並び）
+    
+    np.partitionでk番目の値を求めて候補を絞り、境界の同点は添字の小さい順に取ってから並べる。
+    """
+    k = max(0, int(k))
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    selected = np.sort(np.concatenate([above, ties]))
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+
+class TopKBuffer:
+    """上位k件だけを保持するヒープ（同点は投入順で、安定ソートの先頭k件と同じ並びを返す）"""
+    
+    def __init__(self, k, key):
+        self.k = max(0, int(k))
+        self.key = key
+        self.heap = []
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, item):
+        # (スコア, -投入順)で比較するため同点でもitem同士は比較されない
+        entry = (self.key(item), -self.seq, item)
+        self.seq += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif self.k and entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        """スコア降順（同点は投入順）のリスト"""
+        return [entry[2] for entry in sorted(self.heap, key=lambda e: e[:2], reverse=True)]
+
+
+class StreamingRankingPipeline:
+    """スキャンのページごとに0～3次審査を流し、role別に3次審査の上位10×募集人数だけを保持する
+    
+    ページ内・ページ間の到着順が全件取得時の社員順と同じであれば、
+    process_role_screeningと同じ候補者を同じ順位で返す。
+    """
+    
+    def __init__(self, project_data, recruiting_roles, project_category):
+        worktime = project_data.get('worktime', 20)
+        self.required_worktime = float(worktime) if worktime is not None else 20.0
+        self.project_category = project_category
+        self.roles = {}
+        for role, required_count in recruiting_roles.items():
+            # Decimal型対応：required_countを整数に変換
+            required_count_int = int(float(required_count)) if required_count is not None else 0
+            required_level, level_range = RankingEngine.level_requirement(project_data, role)
+            self.roles[role] = {
+                'required_level': required_level,
+                'level_range': level_range,
+                'counts': [0, 0, 0, 0],
+                'top': TopKBuffer(10 * required_count_int, key=lambda x: x.get('stage3_score', 0)),
+            }
+
+    def screen(self, emp, role):
+        """1名分の0～3次審査（通過した審査数と、3次審査まで進んだ場合はスコア付きの社員）"""
+        state = self.roles[role]
+        emp = RankingEngine.screen_worktime(emp, self.required_worktime)
+        if emp is None:
+            return 0, None
+        emp = RankingEngine.screen_motivation(emp, role)
+        if emp is None:
+            return 1, None
+        if not RankingEngine.match_level(emp, role, state['required_level'], state['level_range']):
+            return 2, None
+        emp['stage3_score'] = RankingEngine.mbti_fit_score(emp, self.project_category)
+        return 3, emp
+
+    def consume(self, page):
+        """1ページ分の社員を審査してroleごとのバッファに積む"""
+        for emp in page:
+            role = emp.get('role', 'Unknown')
+            state = self.roles.get(role)
+            if state is None:
+                continue
+            passed, emp = self.screen(emp, role)
+            counts = state['counts']
+            counts[0] += 1
+            for stage in range(passed):
+                counts[stage + 1] += 1
+            if emp is not None:
+                state['top'].push(emp)
+
+    def consume_all(self, pages):
+        for page in pages:
+            self.consume(page)
+        return self
+
+    def has_employees(self, role):
+        return self.roles[role]['counts'][0] > 0
+
+    def stage3_candidates(self, role):
+        """roleの3次審査通過者（上位10×募集人数、stage3_rank付き）"""
+        state = self.roles[role]
+        seen, stage0, stage1, stage2 = state['counts']
+        logger.info(f"【0次審査】{seen}名 → {stage0}名")
+        logger.info(f"【1次審査】{stage0}名 → {stage1}名")
+        logger.info(f"【2次審査】Role: {role} {stage1}名 → {stage2}名")
+        logger.info(f"【3次審査】MBTI適性評価完了 - {stage2}名")
+        return RankingEngine.select_top_candidates_stage3(state['top'], state['top'].k)
 
 
 class TeamSetGenerator:
@@ -858,36 +3720,63 @@ class TeamSetGenerator:
 
 
 def process_role_screening(employees, role, required_count, project_data, 
-                          project_category, leader_mbti, sub_leader_mbti):
-    """特定roleの完全な審査プロセス"""
+                          project_category, leader_mbti, sub_leader_mbti, page_size=None, columns=None,
+                          project_id=None):
+    """特定roleの完全な審査プロセス（columns指定時はemployeesの代わりにその列をNumPy版エンジンで審査）"""
     
     logger.info(f"\n{'='*50}")
     logger.info(f"Role: {role} の審査開始（募集: {required_count}名）")
     logger.info(f"{'='*50}")
     
-    # 0次審査: 稼働時間
-    candidates = RankingEngine.stage0_worktime_screening(employees, project_data.get('worktime', 20))
-    if not candidates:
-        return RankingEngine.create_empty_candidate_list(role, required_count)
-    
-    # 1次審査: やる気
-    candidates = RankingEngine.stage1_motivation_screening(candidates, role)
-    if not candidates:
-        return RankingEngine.create_empty_candidate_list(role, required_count)
+    if columns is not None or (RANKING_ENGINE == 'numpy' and np is not None):
+        if columns is None:
+            columns = VectorRankingEngine.load_columns(employees, role, project_category)
+        candidates = VectorRankingEngine.screen_role(
+            columns, role, required_count, project_data, project_category, leader_mbti, sub_leader_mbti)
+        if not candidates:
+            return RankingEngine.create_empty_candidate_list(role, required_count)
+        candidates = RankingEngine.calculate_final_scores(candidates)
+        return RankingEngine.create_final_candidate_list(candidates, role, required_count, page_size, project_id)
     
-    # 2次審査: レベルマッチング
-    candidates = RankingEngine.stage2_level_matching(candidates, project_data, role)
-    if not candidates:
-        return RankingEngine.create_empty_candidate_list(role, required_count)
+    if SCREENING_EVALUATOR == 'fused':
+        # 0～2次審査: 登録された審査を選択性の高い順に1名ずつ評価
+        candidates = screening_stages.fused_screening(employees, project_data, role)
+        if not candidates:
+            return RankingEngine.create_empty_candidate_list(role, required_count)
+    else:
+        # 0次審査: 稼働時間
+        candidates = RankingEngine.stage0_worktime_screening(employees, project_data.get('worktime', 20))
+        if not candidates:
+            return RankingEngine.create_empty_candidate_list(role, required_count)
+        
+        # 1次審査: やる気
+        candidates = RankingEngine.stage1_motivation_screening(candidates, role)
+        if not candidates:
+            return RankingEngine.create_empty_candidate_list(role, required_count)
+        
+        # 2次審査: レベルマッチング
+        candidates = RankingEngine.stage2_level_matching(candidates, project_data, role)
+        if not candidates:
+            return RankingEngine.create_empty_candidate_list(role, required_count)
     
     # 3次審査: MBTI適性（上位10×募集人数）
     candidates = RankingEngine.stage3_mbti_scoring(candidates, project_category)
     # Decimal型対応：required_countを整数に変換
     required_count_int = int(float(required_count)) if required_count is not None else 0
     candidates = RankingEngine.select_top_candidates_stage3(candidates, 10 * required_count_int)
+    return finalize_role_screening(
+        candidates, role, required_count, leader_mbti, sub_leader_mbti, page_size, project_id)
+
+
+def finalize_role_screening(candidates, role, required_count, leader_mbti, sub_leader_mbti, page_size=None,
+                            project_id=None):
+    """3次審査の上位候補者から4次審査・最終スコア・最終候補者リストを作成"""
     if not candidates:
         return RankingEngine.create_empty_candidate_list(role, required_count)
     
+    # Decimal型対応：required_countを整数に変換
+    required_count_int = int(float(required_count)) if required_count is not None else 0
+    
     # 4次審査: リーダー相性（上位5×募集人数）
     candidates = RankingEngine.stage4_compatibility_scoring(candidates, leader_mbti, sub_leader_mbti)
     candidates = RankingEngine.select_top_candidates_stage4(candidates, 5 * required_count_int)
@@ -896,14 +3785,27 @@ def process_role_screening(employees, role, required_count, project_data,
     candidates = RankingEngine.calculate_final_scores(candidates)
     
     # 最終候補者リスト作成
-    return RankingEngine.create_final_candidate_list(candidates, role, required_count)
+    return RankingEngine.create_final_candidate_list(candidates, role, required_count, page_size, project_id)
 
 
-def process_all_roles(project_id):
-    """全roleの審査を実施"""
+def process_all_roles(project_id, page_size=None, project_item=None):
+    """全roleの審査を実施（page_size指定時は各roleの候補者を先頭ページだけ返す）
+    
+    project_itemには取得済みのプロジェクトレコードを渡せる（バージョン確認で読んだものを読み直さない）。
+    """
+    
+    if RANKING_PIPELINE == 'streaming':
+        return process_all_roles_streaming(project_id, page_size, project_item)
     
-    # プロジェクトデータ取得
-    project_data = DatabaseManager.fetch_project_from_dynamodb(project_id)
+    columns_by_role = None
+    if RANKING_ENGINE == 'numpy' and np is not None and EMPLOYEE_FETCH_MODE == 'snapshot':
+        # スナップショットの列を社員dictに復元せず、そのままNumPy版エンジンで審査する
+        project_data = DatabaseManager.fetch_project(project_id, project_item)
+        columns_by_role = VectorRankingEngine.snapshot_columns_by_role(project_data) if project_data else {}
+        employees_by_role = columns_by_role
+    else:
+        # プロジェクトデータ・リーダーMBTI・募集roleの社員データを並行取得
+        project_data, employees_by_role = DatabaseManager.fetch_project_and_employees(project_id, project_item)
     if not project_data:
         logger.error(f"Project {project_id} not found")
         return {"error": "Project not found"}
@@ -914,10 +3816,6 @@ def process_all_roles(project_id):
     leader_mbti = project_data.get('leader_mbti', {}).get('percentages', {})
     sub_leader_mbti = project_data.get('sub_leader_mbti', {}).get('percentages', {})
     
-    # 全社員データ取得とグループ化
-    all_employees = DatabaseManager.fetch_employees_from_dynamodb()
-    employees_by_role = DatabaseManager.group_employees_by_role(all_employees)
-    
     # 結果格納
     all_results = {
         'project_info': {
@@ -943,13 +3841,16 @@ def process_all_roles(project_id):
             continue
         
         role_result = process_role_screening(
-            employees=employees_by_role[role],
+            employees=employees_by_role[role] if columns_by_role is None else None,
             role=role,
             required_count=required_count,
             project_data=project_data,
             project_category=project_category,
             leader_mbti=leader_mbti,
-            sub_leader_mbti=sub_leader_mbti
+            sub_leader_mbti=sub_leader_mbti,
+            page_size=page_size,
+            columns=columns_by_role[role] if columns_by_role is not None else None,
+            project_id=project_id
         )
         
         all_results['roles'][role] = role_result
@@ -959,6 +3860,9 @@ def process_all_roles(project_id):
             all_results['summary']['roles_with_candidates'] += 1
             all_results['summary']['total_candidates'] += role_result['total_candidates']
     
+    # 射影取得・スナップショット利用時は最終候補者の氏名だけを後から取得
+    DatabaseManager.hydrate_candidates(all_results['roles'])
+    
     logger.info("\n" + "="*60)
     logger.info("全role処理完了")
     logger.info(f"処理role数: {all_results['summary']['roles_processed']}")
@@ -968,6 +3872,84 @@ def process_all_roles(project_id):
     return all_results
 
 
+def new_ranking_results(project_id, project_data):
+    """process_all_rolesと同じ形の空の結果"""
+    recruiting_roles = project_data.get('recruiting_roles', {})
+    return {
+        'project_info': {
+            'project_id': project_id,
+            'project_name': project_data.get('name', ''),
+            'category': project_data.get('category', '新規開発'),
+            'worktime': project_data.get('worktime', 20),
+            'total_positions': sum(recruiting_roles.values())
+        },
+        'roles': {},
+        'summary': {
+            'total_candidates': 0,
+            'roles_processed': 0,
+            'roles_with_candidates': 0
+        }
+    }
+
+
+def record_role_result(all_results, role, role_result):
+    """審査したroleの結果を格納して集計に加える"""
+    all_results['roles'][role] = role_result
+    all_results['summary']['roles_processed'] += 1
+    
+    if role_result['total_candidates'] > 0:
+        all_results['summary']['roles_with_candidates'] += 1
+        all_results['summary']['total_candidates'] += role_result['total_candidates']
+
+
+def process_all_roles_streaming(project_id, page_size=None, project_item=None):
+    """全roleの審査をスキャンのページ単位で実施（RANKING_PIPELINE='streaming'）"""
+    
+    project_data = project_item if project_item is not None else DatabaseManager.fetch_project_item(project_id)
+    if not project_data:
+        logger.error(f"Project {project_id} not found")
+        return {"error": "Project not found"}
+    
+    project_category = project_data.get('category', '新規開発')
+    recruiting_roles = project_data.get('recruiting_roles', {})
+    
+    # リーダーMBTIの取得と並行して社員ページを0～3次審査に流す
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leaders_future = executor.submit(DatabaseManager.attach_leader_mbti, project_data)
+        pipeline = StreamingRankingPipeline(project_data, recruiting_roles, project_category)
+        pipeline.consume_all(DatabaseManager.iter_employee_pages_by_role(
+            recruiting_roles.keys(), project_data.get('worktime', 20)))
+        leaders_future.result()
+    
+    leader_mbti = project_data.get('leader_mbti', {}).get('percentages', {})
+    sub_leader_mbti = project_data.get('sub_leader_mbti', {}).get('percentages', {})
+    
+    all_results = new_ranking_results(project_id, project_data)
+    for role, required_count in recruiting_roles.items():
+        if not pipeline.has_employees(role):
+            logger.warning(f"No employees for role: {role}")
+            all_results['roles'][role] = RankingEngine.create_empty_candidate_list(role, required_count)
+            continue
+        
+        logger.info(f"\n{'='*50}")
+        logger.info(f"Role: {role} の審査結果（募集: {required_count}名）")
+        logger.info(f"{'='*50}")
+        role_result = finalize_role_screening(
+            pipeline.stage3_candidates(role), role, required_count, leader_mbti, sub_leader_mbti, page_size,
+            project_id)
+        record_role_result(all_results, role, role_result)
+    
+    DatabaseManager.hydrate_candidates(all_results['roles'])
+    
+    logger.info("\n" + "="*60)
+    logger.info("全role処理完了（streaming）")
+    logger.info(f"処理role数: {all_results['summary']['roles_processed']}")
+    logger.info(f"候補者ありrole: {all_results['summary']['roles_with_candidates']}")
+    logger.info("="*60)
+    
+    return all_results
+
+
 def generate_candidate_sets(ranking_results):
     """ランキング結果からチーム候補セットを生成"""
     
@@ -1037,22 +4019,78 @@ def generate_candidate_sets(ranking_results):
 def lambda_handler(event, context):
     """AWS Lambda エントリーポイント"""
     try:
+        # 社員・プロジェクトテーブルの変更イベント（DynamoDB Streams）
+        if event.get('Records') and event['Records'][0].get('eventSource') == 'aws:dynamodb':
+            if 'project_id' in event['Records'][0].get('dynamodb', {}).get('Keys', {}):
+                return process_project_change_events(event['Records'])
+            return process_employee_change_events(event['Records'])
+        
+        # 社員の審査用特徴の取り込み（employee_ids未指定なら全社員）
+        if event.get('action') == 'ingest_features':
+            return {'ingested': EmployeeFeatures.ingest(event.get('employee_ids'))}
+        
+        # 0～2次審査の評価順と観測した通過率
+        if event.get('action') == 'screening_stats':
+            return {'stages': screening_stages.report(), 'mbti_profiles': mbti_profiles.stats()}
+        
+        # 候補者リストの続きのページ（このコンテナにエントリがなければカーソルのプロジェクトを審査し直す）
+        if event.get('cursor'):
+            page = RankingEngine.candidate_page(event['cursor'])
+            if page is None:
+                return {'error': 'cursor is invalid or expired'}
+            DatabaseManager.hydrate_candidates({page['role']: page})
+            return page
+        
         project_id = event.get('project_id')
         
         if not project_id:
             return {'error': 'project_id is required'}
         
-        # ランキング処理の実行
-        ranking_results = process_all_roles(project_id)
+        # role別の候補者リストをページ単位で返す（続きは各roleのnext_cursorで取得）
+        if event.get('action') == 'candidates':
+            page_size = int(event.get('page_size', 20))
+            if page_size <= 0:
+                return {'error': 'page_size must be positive'}
+            return process_all_roles(project_id, page_size=page_size)
+        
+        # 募集中プロジェクトの登録・解除（以降は保持した結果を返す）
+        if event.get('action') == 'register_open_project':
+            return {'registered': get_standing_rankings().register(project_id)}
+        if event.get('action') == 'unregister_open_project':
+            return {'unregistered': get_standing_rankings().unregister(project_id)}
+        
+        # データのバージョンが分かればETagを付ける（呼び出し側と一致すれば審査せずに返す）
+        cache = get_result_cache()
+        versions, project_item = None, None
+        if cache is not None or RESPONSE_ETAGS:
+            versions, project_item = DatabaseManager.fetch_versioned_project(project_id)
+        etag = DatabaseManager.data_etag(versions) if versions is not None and RESPONSE_ETAGS else None
+        if etag is not None and request_etag(event) == etag:
+            return {'not_modified': True, 'etag': etag}
+        
+        def respond(team_sets):
+            # データオブジェクトを直接返す（JSON文字列ではなく、数値は取得時に変換済み）
+            if etag is None or 'error' in team_sets:
+                return team_sets
+            return dict(team_sets, etag=etag)
         
-        if 'error' in ranking_results:
-            return ranking_results
+        if OPEN_PROJECT_IDS or standing_rankings is not None:
+            standing = get_standing_rankings()
+            if standing.has(project_id):
+                return respond(standing.team_sets(project_id))
         
-        # チーム候補セット生成
-        team_sets = generate_candidate_sets(ranking_results)
+        # 同じバージョンのデータで計算済みなら結果キャッシュから返す
+        if cache is not None and versions is not None:
+            team_sets = cache.get(project_id, versions)
+            if team_sets is not None:
+                logger.info(f"Result cache hit: {project_id} {versions}")
+                return respond(team_sets)
         
-        # データオブジェクトを直接返す（JSON文字列ではなく）
-        return decimal_to_float(team_sets)
+        # ランキング処理とチーム候補セット生成の実行
+        team_sets = compute_candidate_sets(project_id, project_item)
+        if cache is not None and versions is not None and 'error' not in team_sets:
+            cache.put(project_id, versions, team_sets)
+        return respond(team_sets)
         
     except Exception as e:
         logger.error(f"処理エラー: {str(e)}")
@@ -0,0 +1,79 @@
+"""並行スキャンのページ受け渡し（iter_concurrent_pages）のテスト
+
+    uv run python -m unittest discover tests
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lambda_function import iter_concurrent_pages  # noqa: E402
+
+MAX_WORKERS = 4
+
+
+class ConcurrentPagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.produced = 0
+        self.lock = threading.Lock()
+
+    def producer(self, segment, pages=None):
+        """セグメントのページを順に返し、返した数を数える（pages=Noneなら終わらない）"""
+        def produce():
+            for number in (range(pages) if pages is not None else itertools.count()):
+                with self.lock:
+                    self.produced += 1
+                yield [(segment, number)]
+        return produce
+
+    def test_all_pages_with_bounded_buffer(self):
+        """全ページを返し、消費側が遅くても先行して作られるページはキューとスレッド数の分まで"""
+        producers = [self.producer(segment, 50) for segment in range(MAX_WORKERS)]
+        consumed = 0
+        ahead = 0
+        pages = []
+        for page in iter_concurrent_pages(producers, MAX_WORKERS):
+            consumed += 1
+            pages.extend(page)
+            time.sleep(0.001)
+            with self.lock:
+                ahead = max(ahead, self.produced - consumed)
+        self.assertEqual(sorted(pages), [(segment, n) for segment in range(MAX_WORKERS) for n in range(50)])
+        self.assertLessEqual(ahead, MAX_WORKERS * 2 + MAX_WORKERS)
+
+    def test_early_exit_stops_producers(self):
+        """途中で止めると、終わらない生成側も次のページの前に終わる"""
+        producers = [self.producer(segment) for segment in range(MAX_WORKERS)]
+        pages = iter_concurrent_pages(producers, MAX_WORKERS)
+        for _ in range(5):
+            next(pages)
+        start = time.monotonic()
+        pages.close()
+        self.assertLess(time.monotonic() - start, 2.0)
+        with self.lock:
+            produced = self.produced
+        time.sleep(0.2)
+        self.assertEqual(self.produced, produced)
+
+    def test_consumer_error_stops_producers(self):
+        """消費側の例外でも生成側が止まり、例外はそのまま伝わる"""
+        producers = [self.producer(segment) for segment in range(MAX_WORKERS)]
+        start = time.monotonic()
+        with self.assertRaises(ValueError):
+            pages = iter_concurrent_pages(producers, MAX_WORKERS)
+            try:
+                for number, _ in enumerate(pages):
+                    if number == 3:
+                        raise ValueError('consumer failed')
+            finally:
+                pages.close()
+        self.assertLess(time.monotonic() - start, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
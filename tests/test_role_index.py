@@ -0,0 +1,89 @@
+"""role別索引（RoleIndexStore）の変更イベントによる差分更新のテスト
+
+ローカルバックエンド（STORAGE_BACKEND=local）のデータで索引を構築し、変更イベントを適用した後も
+索引からの審査結果が全件スキャンでの審査結果と同じになることを確かめる。
+
+    uv run python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+
+ROLE = 'backend'
+SETTINGS = ('STORAGE_BACKEND', 'LOCAL_DATA_DIR', 'EMPLOYEE_FETCH_MODE', 'EMPLOYEE_EVENTS_PATH',
+            'repository', 'role_index_store', 'standing_rankings')
+
+
+def make_employees():
+    """稼働時間・やる気が審査を通る社員"""
+    return [
+        {
+            'employee_id': f'E{i:05d}',
+            'name': f'社員{i}',
+            'role': ROLE,
+            'time': 40,
+            'motivation_by_role': {ROLE: 4, 'frontend': 1},
+            'certifications': ['AWS SAA'] if i % 2 else [],
+            '勤続年数': 3 + i,
+            '経験': {'backend': 3},
+            'mbti_percentages': {'E': 40 + 5 * i, 'N': 60, 'T': 55, 'J': 50},
+        }
+        for i in range(5)
+    ]
+
+
+def keys_only_record(event_name, employee_id):
+    """NewImageを含まないKEYS_ONLYストリームのレコード"""
+    return {
+        'eventSource': 'aws:dynamodb',
+        'eventName': event_name,
+        'dynamodb': {'Keys': {'employee_id': {'S': employee_id}}},
+    }
+
+
+class RoleIndexStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = {name: getattr(lambda_function, name) for name in SETTINGS}
+        lambda_function.logger.disabled = True
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, 'employees.jsonl'), 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(emp, ensure_ascii=False) + '\n' for emp in make_employees()))
+        with open(os.path.join(self.tmp.name, 'projects.jsonl'), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'project_id': 'P1', 'name': '新規', 'category': '新規開発', 'worktime': 20,
+                'recruiting_roles': {ROLE: 1},
+                'role_requirements': {ROLE: {'level': 0.5, 'level_range': 1.0}},
+            }, ensure_ascii=False) + '\n')
+        lambda_function.STORAGE_BACKEND = 'local'
+        lambda_function.LOCAL_DATA_DIR = self.tmp.name
+        lambda_function.EMPLOYEE_FETCH_MODE = 'index'
+        lambda_function.EMPLOYEE_EVENTS_PATH = None
+        lambda_function.repository = None
+        lambda_function.role_index_store = None
+        lambda_function.standing_rankings = None
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(lambda_function, name, value)
+        lambda_function.logger.disabled = False
+        self.tmp.cleanup()
+
+    def ranked_ids(self):
+        result = lambda_function.process_all_roles('P1')
+        return [candidate['employee_id'] for candidate in result['roles'][ROLE]['candidates']]
+
+    def test_keys_only_modify_keeps_employee_ranked(self):
+        """KEYS_ONLYのMODIFYで取得し直した社員も、やる気を含めて審査され索引に残る"""
+        before = self.ranked_ids()
+        self.assertEqual(len(before), 5)
+
+        lambda_function.role_index_store.apply([keys_only_record('MODIFY', before[0])])
+
+        self.assertEqual(self.ranked_ids(), before)
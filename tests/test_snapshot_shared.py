@@ -0,0 +1,88 @@
+"""ウォームコンテナで使い回すスナップショット（EmployeeSnapshotFile.open_shared）のテスト
+
+ファイルが更新されて開き直したとき、差し替えた古いスナップショットのmmapが閉じられることを確かめる。
+
+    uv run python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lambda_function import EmployeeSnapshotFile, np  # noqa: E402
+
+ROLE = 'backend'
+
+
+def make_employees(count):
+    return [
+        {
+            'employee_id': f'E{i:05d}',
+            'role': ROLE,
+            'time': 40,
+            'certifications': [],
+            '勤続年数': i,
+            '経験': {'backend': 3},
+            'mbti_percentages': {'E': 50, 'I': 50, 'N': 50, 'S': 50, 'T': 50, 'F': 50, 'J': 50, 'P': 50},
+        }
+        for i in range(count)
+    ]
+
+
+class SnapshotSharedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'employees.snapshot')
+
+    def tearDown(self):
+        shared = EmployeeSnapshotFile._shared.pop(self.path, None)
+        if shared:
+            shared[1].close()
+        EmployeeSnapshotFile._retired = [s for s in EmployeeSnapshotFile._retired if s.path != self.path]
+        self.tmp.cleanup()
+
+    def rewrite(self, count, mtime_ns):
+        EmployeeSnapshotFile.write(self.path, make_employees(count))
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_reuses_unchanged_file(self):
+        """更新されていなければ同じインスタンスを返す"""
+        self.rewrite(3, 1_000_000_000)
+        first = EmployeeSnapshotFile.open_shared(self.path)
+        self.assertIs(EmployeeSnapshotFile.open_shared(self.path), first)
+        self.assertFalse(first.mm.closed)
+
+    def test_closes_replaced_snapshot(self):
+        """更新されたファイルを開き直すと、古いmmapは閉じられる"""
+        self.rewrite(3, 1_000_000_000)
+        old = EmployeeSnapshotFile.open_shared(self.path)
+        self.rewrite(4, 2_000_000_000)
+        new = EmployeeSnapshotFile.open_shared(self.path)
+        self.assertIsNot(new, old)
+        self.assertTrue(old.mm.closed)
+        self.assertEqual(len(new.role_employees(ROLE)), 4)
+
+    @unittest.skipIf(np is None, 'NumPyがないため列を参照する配列は作れない')
+    def test_defers_close_while_columns_in_use(self):
+        """審査中の列が古いmmapを参照していれば、参照がなくなった後の差し替えで閉じる"""
+        self.rewrite(3, 1_000_000_000)
+        old = EmployeeSnapshotFile.open_shared(self.path)
+        column = old.column(ROLE, 'tenure')
+        tenure = np.frombuffer(column, dtype=np.float64)
+        self.rewrite(4, 2_000_000_000)
+        EmployeeSnapshotFile.open_shared(self.path)
+        self.assertFalse(old.mm.closed)
+        self.assertEqual(tenure.tolist(), [0.0, 1.0, 2.0])
+
+        del tenure
+        column.release()
+        self.rewrite(5, 3_000_000_000)
+        EmployeeSnapshotFile.open_shared(self.path)
+        self.assertTrue(old.mm.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
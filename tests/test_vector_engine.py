@@ -0,0 +1,132 @@
+"""ループ版（RankingEngine）とNumPy版（VectorRankingEngine）の審査エンジンの一致テスト
+
+同じ社員・プロジェクトに対して、両エンジンの最終候補者リストが完全に一致することを確かめる。
+NumPy版は社員dictから列を作る場合と、列指向スナップショットの列をそのまま使う場合の両方を比べる。
+
+    uv run python -m unittest discover tests
+"""
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import lambda_function  # noqa: E402
+from lambda_function import (EmployeeFeatures, EmployeeSnapshotFile, RankingEngine,  # noqa: E402
+                             VectorRankingEngine, np, process_role_screening)
+
+ROLE = 'backend'
+CERTIFICATIONS = ['AWS SAA', 'Google Cloud ACE', 'ネットワークスペシャリスト', 'PMP Professional',
+                  '応用情報技術者', '基本情報技術者', 'TOEIC', '簿記検定']
+LEADERS = [{}, {'E': 70, 'N': 35, 'T': 55, 'J': 80}, {'E': 25, 'N': 65.5, 'T': 10, 'J': 45}]
+
+
+def make_employees(count, seed=0):
+    """審査条件の境界をまたぐ社員（一部は小数のMBTI割合、一部は取り込み済みの特徴つき）"""
+    rng = random.Random(seed)
+    employees = []
+    for i in range(count):
+        step = 2.5 if i % 4 == 0 else 5
+        emp = {
+            'employee_id': f'EMP{i:07d}',
+            'name': f'社員{i}',
+            'role': ROLE,
+            'time': rng.choice([10, 15, 20, 25, 30, 35, 40]),
+            'motivation_by_role': {ROLE: rng.randint(1, 6)},
+            'certifications': rng.sample(CERTIFICATIONS, rng.randint(0, 4)),
+            '勤続年数': rng.choice([0, 1, 1.5, 3, 5, 7, 9, 12]),
+            '経験': {k: rng.randint(0, 6) for k in rng.sample(['backend', 'infra', 'frontend'], rng.randint(0, 3))},
+            'mbti_percentages': {k: 20 + step * rng.randrange(0, int(60 / step) + 1) for k in 'ENTJ'},
+        }
+        for a, b in (('E', 'I'), ('N', 'S'), ('T', 'F'), ('J', 'P')):
+            emp['mbti_percentages'][b] = 100 - emp['mbti_percentages'][a]
+        if i % 3 == 0:
+            emp['features'] = EmployeeFeatures.compute(emp)
+        employees.append(emp)
+    return employees
+
+
+def project(category, worktime, level, leader, sub_leader):
+    return {
+        'category': category,
+        'worktime': worktime,
+        'role_requirements': {ROLE: {'level': level, 'level_range': 0.1}},
+        'leader_mbti': {'percentages': leader},
+        'sub_leader_mbti': {'percentages': sub_leader},
+    }
+
+
+def conditions():
+    """カテゴリ・稼働時間・要求レベル・リーダーMBTI・募集人数の組み合わせ"""
+    for category, worktime, level, (leader, sub_leader), required_count in itertools.product(
+            ['新規開発', '改善・保守', 'クライアント対応', 'その他'], [20, 30], [0.4, 0.6],
+            itertools.permutations(LEADERS, 2), [1, 3]):
+        yield project(category, worktime, level, leader, sub_leader), required_count
+
+
+def canonical(result):
+    return json.dumps(result, sort_keys=True, ensure_ascii=False)
+
+
+@unittest.skipIf(np is None, 'NumPyがないためNumPy版エンジンは試せない')
+class VectorEngineParityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = lambda_function.RANKING_ENGINE
+        lambda_function.logger.disabled = True
+        cls.employees = make_employees(600, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        lambda_function.RANKING_ENGINE = cls.engine
+        lambda_function.logger.disabled = False
+
+    def run_engine(self, engine, employees, project_data, required_count):
+        lambda_function.RANKING_ENGINE = engine
+        return process_role_screening(
+            employees, ROLE, required_count, project_data, project_data['category'],
+            project_data['leader_mbti']['percentages'], project_data['sub_leader_mbti']['percentages'])
+
+    def test_employee_dicts(self):
+        """社員dictから列を作るNumPy版がループ版と同じ最終候補者リストを返す"""
+        for project_data, required_count in conditions():
+            with self.subTest(project=project_data, required_count=required_count):
+                expected = self.run_engine('loop', self.employees, project_data, required_count)
+                actual = self.run_engine('numpy', self.employees, project_data, required_count)
+                self.assertEqual(canonical(expected), canonical(actual))
+
+    def test_snapshot_columns(self):
+        """スナップショットの列をそのまま審査するNumPy版が、復元した社員でのループ版と一致する"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'employees.snapshot')
+            EmployeeSnapshotFile.write(path, self.employees)
+            snapshot = EmployeeSnapshotFile(path)
+            try:
+                snapshot_employees = snapshot.role_employees(ROLE)
+                for project_data, required_count in conditions():
+                    with self.subTest(project=project_data, required_count=required_count):
+                        category = project_data['category']
+                        columns = VectorRankingEngine.load_snapshot_columns(snapshot, ROLE, category)
+                        if columns is None:
+                            # 特徴にないカテゴリは本番と同じく復元した社員から列を作る
+                            columns = VectorRankingEngine.load_columns(snapshot_employees, ROLE, category)
+                        candidates = VectorRankingEngine.screen_role(
+                            columns, ROLE, required_count, project_data, category,
+                            project_data['leader_mbti']['percentages'],
+                            project_data['sub_leader_mbti']['percentages'])
+                        actual = (RankingEngine.create_final_candidate_list(
+                            RankingEngine.calculate_final_scores(candidates), ROLE, required_count)
+                            if candidates else RankingEngine.create_empty_candidate_list(ROLE, required_count))
+                        expected = self.run_engine('loop', snapshot_employees, project_data, required_count)
+                        self.assertEqual(canonical(expected), canonical(actual))
+            finally:
+                snapshot.close()
+
+
+if __name__ == '__main__':
+    unittest.main()